@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Terminal Admission Control
+Admits terminals against host memory/CPU capacity through a fair, bounded queue
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Tuple
+
+MEMORY_UNITS = {"b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+# Capacity committed by every bridge process: terminal id -> "memory cpus
+# committed_at", and the running totals
+COMMITTED_KEY = "admission:committed"
+TOTALS_KEY = "admission:totals"
+
+# Commit a terminal's demand, stamped with time ARGV[7], if it fits (or
+# unconditionally with ARGV[6] = 1).
+# Returns 1 when committed, or already committed, and 0 when it does not fit.
+RESERVE_SCRIPT = """
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 1 then return 1 end
+local memory = tonumber(redis.call('HGET', KEYS[2], 'memory') or '0')
+local cpus = tonumber(redis.call('HGET', KEYS[2], 'cpus') or '0')
+if ARGV[6] ~= '1' and (memory + tonumber(ARGV[2]) > tonumber(ARGV[4])
+                       or cpus + tonumber(ARGV[3]) > tonumber(ARGV[5]) + 1e-9) then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2] .. ' ' .. ARGV[3] .. ' ' .. ARGV[7])
+redis.call('HINCRBY', KEYS[2], 'memory', ARGV[2])
+redis.call('HINCRBYFLOAT', KEYS[2], 'cpus', ARGV[3])
+return 1
+"""
+
+# Return a terminal's demand; 1 if it was committed
+RELEASE_SCRIPT = """
+local demand = redis.call('HGET', KEYS[1], ARGV[1])
+if not demand then return 0 end
+local memory, cpus = string.match(demand, '(%S+) (%S+)')
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('HINCRBY', KEYS[2], 'memory', '-' .. memory)
+redis.call('HINCRBYFLOAT', KEYS[2], 'cpus', '-' .. cpus)
+return 1
+"""
+
+def parse_memory(value: Any) -> int:
+    """Bytes for a Docker-style memory size such as 512m or 2g"""
+    if isinstance(value, int):
+        return value
+    value = str(value).strip().lower()
+    if value and value[-1] in MEMORY_UNITS:
+        return int(float(value[:-1]) * MEMORY_UNITS[value[-1]])
+    return int(value)
+
+def profile_demand(profile: Dict[str, Any]) -> Tuple[int, float]:
+    """(memory bytes, CPUs) that a resource profile's container may use"""
+    memory = parse_memory(profile.get("mem_limit", 0))
+    if "nano_cpus" in profile:
+        cpus = profile["nano_cpus"] / 1e9
+    elif "cpu_quota" in profile:
+        cpus = profile["cpu_quota"] / profile.get("cpu_period", 100000)
+    else:
+        cpus = 0.0
+    return memory, cpus
+
+def detect_host_capacity(memory_fraction: float = 0.9) -> Tuple[int, float]:
+    """(memory bytes, CPUs) of this host, keeping 1 - memory_fraction of RAM for everything else"""
+    memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    return int(memory * memory_fraction), float(os.cpu_count() or 1)
+
+class AdmissionRejected(Exception):
+    """A terminal could not be admitted; ``retry_after`` suggests when to try again"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class _Waiter:
+    __slots__ = ("terminal_id", "memory", "cpus", "future", "enqueued_at")
+
+    def __init__(self, terminal_id: str, memory: int, cpus: float):
+        self.terminal_id = terminal_id
+        self.memory = memory
+        self.cpus = cpus
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+
+class AdmissionController:
+    """Tracks memory and CPU committed to terminals against host capacity
+
+    A terminal is admitted immediately if its profile's limits fit in the
+    remaining capacity and nobody is waiting. Otherwise it waits in a queue
+    of at most ``queue_size`` requests. Agents take turns at the head of the
+    queue, so one agent's burst cannot starve the others. Within an agent
+    requests are served in order. Capacity freed by ``release`` is handed
+    to waiters in that order.
+
+    With a Redis client, committed capacity is kept in Redis, so every
+    bridge process on the host admits against the same totals. Queues stay
+    per process. Capacity released by another process is noticed by
+    re-checking the queue every ``poll_interval`` seconds.
+    """
+
+    def __init__(self, memory_capacity: int, cpu_capacity: float, queue_size: int = 100,
+                 redis_client=None, poll_interval: float = 1.0):
+        self.memory_capacity = memory_capacity
+        self.cpu_capacity = cpu_capacity
+        self.queue_size = queue_size
+        self.redis = redis_client
+        self.poll_interval = poll_interval
+        self._reserve_script = redis_client.register_script(RESERVE_SCRIPT) if redis_client else None
+        self._release_script = redis_client.register_script(RELEASE_SCRIPT) if redis_client else None
+        self._memory_committed = 0
+        self._cpus_committed = 0.0
+        self._admitted: Dict[str, Tuple[int, float]] = {}
+        # agent_id -> that agent's waiters, in arrival order; agents rotate
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._queued = 0
+        self.admitted_total = 0
+        self.queued_total = 0
+        self.rejected_total = 0
+        self.timed_out_total = 0
+        self.wait_seconds_total = 0.0
+
+    @property
+    def memory_committed(self) -> int:
+        if self.redis is not None:
+            return int(self.redis.hget(TOTALS_KEY, "memory") or 0)
+        return self._memory_committed
+
+    @property
+    def cpus_committed(self) -> float:
+        if self.redis is not None:
+            return float(self.redis.hget(TOTALS_KEY, "cpus") or 0)
+        return self._cpus_committed
+
+    def _commit(self, terminal_id: str, memory: int, cpus: float, force: bool) -> bool:
+        """Commit a terminal's demand if it fits, or regardless with force"""
+        if terminal_id in self._admitted:
+            return True
+        if self.redis is not None:
+            args = [terminal_id, memory, repr(float(cpus)), self.memory_capacity, repr(float(self.cpu_capacity)),
+                    1 if force else 0, repr(time.time())]
+            if not int(self._reserve_script(keys=[COMMITTED_KEY, TOTALS_KEY], args=args)):
+                return False
+        elif not force and (self._memory_committed + memory > self.memory_capacity
+                            or self._cpus_committed + cpus > self.cpu_capacity + 1e-9):
+            return False
+        else:
+            self._memory_committed += memory
+            self._cpus_committed += cpus
+        self._admitted[terminal_id] = (memory, cpus)
+        return True
+
+    def reserve(self, terminal_id: str, memory: int, cpus: float):
+        """Commit capacity for a terminal unconditionally (e.g. one adopted at startup)"""
+        self._commit(terminal_id, memory, cpus, force=True)
+
+    async def admit(self, terminal_id: str, agent_id: str, memory: int, cpus: float, timeout: float):
+        """Wait until the terminal fits, raising AdmissionRejected if the queue is full or the wait times out"""
+        if memory > self.memory_capacity or cpus > self.cpu_capacity:
+            self.rejected_total += 1
+            raise AdmissionRejected("Resource profile exceeds host capacity", retry_after=0)
+        if not self._queued and self._commit(terminal_id, memory, cpus, force=False):
+            self.admitted_total += 1
+            return
+        if self._queued >= self.queue_size:
+            self.rejected_total += 1
+            raise AdmissionRejected("Host at capacity and admission queue full", retry_after=max(int(timeout), 1))
+
+        waiter = _Waiter(terminal_id, memory, cpus)
+        self._queues.setdefault(agent_id, deque()).append(waiter)
+        self._queued += 1
+        self.queued_total += 1
+        deadline = waiter.enqueued_at + timeout
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                wait = min(remaining, self.poll_interval) if self.redis is not None else remaining
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), timeout=max(wait, 0))
+                    return
+                except asyncio.TimeoutError:
+                    if waiter.future.done():
+                        # Admitted just as the wait expired
+                        return
+                    if remaining <= wait:
+                        raise
+                    # Another process may have released capacity
+                    self._dispatch()
+        except asyncio.TimeoutError:
+            if waiter.future.done():
+                return
+            self._remove(agent_id, waiter)
+            self.timed_out_total += 1
+            raise AdmissionRejected(f"Timed out after {timeout:g}s waiting for host capacity", retry_after=max(int(timeout), 1))
+        except asyncio.CancelledError:
+            if waiter.future.done():
+                self.release(terminal_id)
+            else:
+                self._remove(agent_id, waiter)
+            raise
+        finally:
+            self.wait_seconds_total += time.monotonic() - waiter.enqueued_at
+
+    def _remove(self, agent_id: str, waiter: _Waiter):
+        queue = self._queues.get(agent_id)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                del self._queues[agent_id]
+        # Someone behind this waiter may fit now
+        self._dispatch()
+
+    def release(self, terminal_id: str):
+        """Return a terminal's capacity and admit whoever now fits"""
+        demand = self._admitted.pop(terminal_id, None)
+        if self.redis is not None:
+            # The terminal may have been admitted by another process
+            if not int(self._release_script(keys=[COMMITTED_KEY, TOTALS_KEY], args=[terminal_id])):
+                return
+        elif demand is None:
+            return
+        else:
+            self._memory_committed -= demand[0]
+            self._cpus_committed -= demand[1]
+        self._dispatch()
+
+    def reconcile(self, live_terminal_ids, grace: float) -> int:
+        """Release shared commitments of terminals that no longer exist, returning how many
+
+        Terminals that were never torn down by a bridge process (reaped at
+        startup, expired while it was down, or whose create crashed) keep
+        their commitment in Redis. Every terminal not in ``live_terminal_ids``
+        is released, except ones committed within the last ``grace`` seconds,
+        which may be creates still in flight in another process.
+        """
+        if self.redis is None:
+            return 0
+        cutoff = time.time() - grace
+        stale = []
+        for terminal_id, demand in self.redis.hgetall(COMMITTED_KEY).items():
+            terminal_id = terminal_id.decode()
+            fields = demand.split()
+            committed_at = float(fields[2]) if len(fields) > 2 else 0.0
+            if terminal_id not in live_terminal_ids and terminal_id not in self._admitted and committed_at < cutoff:
+                stale.append(terminal_id)
+        for terminal_id in stale:
+            self.release(terminal_id)
+        return len(stale)
+
+    def _dispatch(self):
+        while self._queues:
+            agent_id, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            if not self._commit(waiter.terminal_id, waiter.memory, waiter.cpus, force=False):
+                # Head-of-line blocking keeps large requests from starving
+                break
+            queue.popleft()
+            self._queued -= 1
+            # Rotate: this agent goes to the back of the line
+            del self._queues[agent_id]
+            if queue:
+                self._queues[agent_id] = queue
+            self.admitted_total += 1
+            waiter.future.set_result(True)
+
+    def stats(self) -> dict:
+        return {
+            "memory_capacity": self.memory_capacity,
+            "memory_committed": self.memory_committed,
+            "cpu_capacity": self.cpu_capacity,
+            "cpus_committed": round(self.cpus_committed, 3),
+            "terminals": len(self._admitted),
+            "queued": self._queued,
+            "queued_agents": len(self._queues),
+            "admitted_total": self.admitted_total,
+            "queued_total": self.queued_total,
+            "rejected_total": self.rejected_total,
+            "timed_out_total": self.timed_out_total,
+            "wait_seconds_total": round(self.wait_seconds_total, 3)
+        }
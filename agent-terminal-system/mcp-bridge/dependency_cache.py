@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Shared Dependency Cache
+pip wheelhouse volume mounted read-only into every terminal and filled by one writer
+"""
+
+import asyncio
+import logging
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Set
+
+from log_tail import open_log
+from metrics import DEPENDENCY_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Requirement specs handed to pip: a name plus optional extras and version
+# constraints, never an option
+REQUIREMENT_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]*(\[[A-Za-z0-9._,-]+\])?([<>=!~]=?[A-Za-z0-9.*+!_-]+,?)*")
+# Anything pip fetched from an index, and the name and version of fetched wheels
+DOWNLOADED_RE = re.compile(r"\bDownloading \S")
+DOWNLOADED_WHEEL_RE = re.compile(r"\bDownloading (?:\S*/)?([A-Za-z0-9_.]+)-([0-9][A-Za-z0-9_.+!]*)-\S+\.whl\b")
+
+class DependencyCache:
+    """A pip wheelhouse shared by all terminals
+
+    The volume is mounted read-only at ``mount_path`` and terminals get
+    ``PIP_FIND_LINKS`` pointing at it, so pip installs any wheel it finds
+    there without downloading it. Only the writer changes the volume: it
+    runs one container at a time that downloads the queued requirements
+    with ``pip download --only-binary=:all:``, so no package code runs while
+    the cache is writable. Terminals log pip activity to ``pip.log`` in
+    their log directory. When a terminal is destroyed that log is scanned:
+    wheels installed from the cache count as hits, downloads as misses,
+    and with autofill the missed packages are queued for the writer.
+    """
+
+    def __init__(self, client, run: Callable[..., Awaitable[Any]], image: str, volume: str, mount_path: str,
+                 autofill: bool = True, batch_size: int = 50):
+        self.client = client
+        self.run_docker = run
+        self.image = image
+        self.volume = volume
+        self.mount_path = mount_path
+        self.autofill = autofill
+        self.batch_size = batch_size
+        self._pending: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self.hits = 0
+        self.misses = 0
+        self.fills = 0
+        self.fill_failures = 0
+
+    def mounts(self) -> Dict[str, Dict[str, str]]:
+        """``volumes`` entry for containers.run"""
+        return {self.volume: {"bind": self.mount_path, "mode": "ro"}}
+
+    def environment(self) -> Dict[str, str]:
+        return {"PIP_FIND_LINKS": self.mount_path, "PIP_LOG": "/tmp/logs/pip.log"}
+
+    def request_fill(self, requirements: Iterable[str]) -> List[str]:
+        """Queue requirements for the writer; if any is invalid, none are queued and those are returned"""
+        requirements = list(requirements)
+        rejected = [requirement for requirement in requirements if not REQUIREMENT_RE.fullmatch(requirement)]
+        if rejected:
+            return rejected
+        self._pending.update(requirements)
+        if self._pending:
+            self._wakeup.set()
+        return []
+
+    def record_installs(self, pip_log: str, max_bytes: int):
+        """Count cache hits and misses in a terminal's pip log, queueing misses with autofill"""
+        try:
+            # The container can write its log directory: open_log refuses
+            # symlinks and FIFOs, which would otherwise block teardown
+            with os.fdopen(open_log(pip_log), "rb") as f:
+                text = f.read(max_bytes).decode("utf-8", errors="replace")
+        except FileNotFoundError:
+            return
+        hits = text.count(f"Processing {self.mount_path}/")
+        misses = len(DOWNLOADED_RE.findall(text))
+        self.hits += hits
+        self.misses += misses
+        DEPENDENCY_CACHE_REQUESTS.labels("pip", "hit").inc(hits)
+        DEPENDENCY_CACHE_REQUESTS.labels("pip", "miss").inc(misses)
+        if self.autofill and misses:
+            self.request_fill(f"{name}=={version}" for name, version in DOWNLOADED_WHEEL_RE.findall(text))
+
+    async def fill(self, requirements: List[str]):
+        """Download wheels for requirements into the volume in a short-lived container"""
+        await self.run_docker(
+            self.client.containers.run,
+            self.image,
+            command=["pip", "download", "--only-binary=:all:", "--no-deps", "--dest", self.mount_path] + requirements,
+            volumes={self.volume: {"bind": self.mount_path, "mode": "rw"}},
+            user="root",
+            labels={"mcp-bridge.managed": "true", "mcp-bridge.cache-writer": "pip"},
+            network_mode="bridge",
+            remove=True
+        )
+
+    async def run(self):
+        """The single writer: fill queued requirements in batches, one container at a time"""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                batch = sorted(self._pending)[:self.batch_size]
+                self._pending.difference_update(batch)
+                try:
+                    await self.fill(batch)
+                    self.fills += 1
+                    logger.info(f"Filled dependency cache with {len(batch)} requirements")
+                except Exception as e:
+                    # One unavailable wheel fails the batch; fall back to one at a time
+                    self.fill_failures += 1
+                    logger.warning(f"Dependency cache fill failed: {e}")
+                    if len(batch) > 1:
+                        for requirement in batch:
+                            try:
+                                await self.fill([requirement])
+                                self.fills += 1
+                            except Exception as e:
+                                self.fill_failures += 1
+                                logger.warning(f"Could not cache {requirement}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "volume": self.volume,
+            "mount_path": self.mount_path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "pending": len(self._pending),
+            "fills": self.fills,
+            "fill_failures": self.fill_failures
+        }
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Docker API Governor
+Admits docker-py calls by priority class under global and per-class concurrency limits
+"""
+
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List
+
+from metrics import DOCKER_QUEUE_DEPTH, DOCKER_QUEUE_TIMEOUTS
+
+class DockerBusy(Exception):
+    """A Docker call waited longer than its class's queue timeout"""
+
+    def __init__(self, op: str, timeout: float):
+        super().__init__(f"Docker API busy: {op} call not started within {timeout:g}s")
+        self.op = op
+        self.timeout = timeout
+
+class DockerGovernor:
+    """Bounds how many Docker API calls are in flight, letting urgent classes go first
+
+    At most ``max_concurrent`` governed calls run at once, and at most
+    ``class_limits[op]`` of one class. When a call finishes, the freed slot
+    goes to the oldest waiter of the first class in ``priorities`` that is
+    under its own limit. So interactive exec traffic overtakes a burst of
+    creates, while class limits keep any one class from taking every slot.
+    A call that waits longer than its class's queue timeout raises
+    DockerBusy. Classes without a queue timeout are not governed.
+    """
+
+    def __init__(self, max_concurrent: int, class_limits: Dict[str, int], priorities: List[str],
+                 queue_timeouts: Dict[str, float]):
+        self.max_concurrent = max_concurrent
+        self.class_limits = class_limits
+        self.priorities = [op for op in priorities if op in queue_timeouts]
+        self.priorities += [op for op in queue_timeouts if op not in self.priorities]
+        self.queue_timeouts = queue_timeouts
+        self._active = {op: 0 for op in self.priorities}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {op: deque() for op in self.priorities}
+        self._total = 0
+        self.timeouts = {op: 0 for op in self.priorities}
+
+    def governs(self, op: str) -> bool:
+        return op in self._active
+
+    def _has_room(self, op: str) -> bool:
+        return self._total < self.max_concurrent and self._active[op] < self.class_limits.get(op, self.max_concurrent)
+
+    def _start(self, op: str):
+        self._active[op] += 1
+        self._total += 1
+
+    async def acquire(self, op: str):
+        """Wait for a slot for one call of class op"""
+        if not self.governs(op):
+            return
+        # More urgent waiters only exist while there is no room for them, so
+        # only this class's own queue must be respected
+        if self._has_room(op) and not self._waiters[op]:
+            self._start(op)
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[op].append(waiter)
+        DOCKER_QUEUE_DEPTH.labels(op).set(len(self._waiters[op]))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeouts[op])
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # Granted just as the wait expired
+                return
+            self._waiters[op].remove(waiter)
+            self.timeouts[op] += 1
+            DOCKER_QUEUE_TIMEOUTS.labels(op).inc()
+            raise DockerBusy(op, self.queue_timeouts[op])
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release(op)
+            else:
+                self._waiters[op].remove(waiter)
+            raise
+        finally:
+            DOCKER_QUEUE_DEPTH.labels(op).set(len(self._waiters[op]))
+
+    def release(self, op: str):
+        """Free a slot and hand it to the most urgent waiter that fits"""
+        if not self.governs(op):
+            return
+        self._active[op] -= 1
+        self._total -= 1
+        for candidate in self.priorities:
+            queue = self._waiters[candidate]
+            while queue and self._has_room(candidate):
+                self._start(candidate)
+                queue.popleft().set_result(True)
+            if self._total >= self.max_concurrent:
+                break
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            op: {
+                "active": self._active[op],
+                "limit": self.class_limits.get(op, self.max_concurrent),
+                "queued": len(self._waiters[op]),
+                "queue_timeouts": self.timeouts[op]
+            }
+            for op in self.priorities
+        }
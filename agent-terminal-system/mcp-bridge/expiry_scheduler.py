@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Terminal Expiry Scheduler
+Min-heap of terminal deadlines that sleeps until the next one is due
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ExpiryScheduler:
+    """Fires a callback for each terminal when its epoch deadline passes
+
+    Extending a deadline only updates a dict entry; the heap entry is
+    re-pushed with the newer deadline when it comes due, so sliding TTLs
+    cost O(1) per activity and O(log n) per actual expiry.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, str]] = []
+        self._deadlines: Dict[str, float] = {}
+        self._wakeup = asyncio.Event()
+        self._expiring = set()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, terminal_id: str, deadline: float):
+        """Set a terminal's deadline (epoch seconds)"""
+        previous = self._deadlines.get(terminal_id)
+        self._deadlines[terminal_id] = deadline
+        if previous is None or deadline < previous:
+            heapq.heappush(self._heap, (deadline, terminal_id))
+            if self._heap[0][1] == terminal_id:
+                self._wakeup.set()
+
+    def extend(self, terminal_id: str, deadline: float):
+        """Push a scheduled terminal's deadline later without touching the heap"""
+        if self._deadlines.get(terminal_id, deadline) < deadline:
+            self._deadlines[terminal_id] = deadline
+
+    def cancel(self, terminal_id: str):
+        self._deadlines.pop(terminal_id, None)
+
+    def next_deadline(self) -> Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    def _pop_due(self, now: float) -> List[str]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, terminal_id = heapq.heappop(self._heap)
+            current = self._deadlines.get(terminal_id)
+            if current is None or current < deadline:
+                # Cancelled, or superseded by an earlier entry
+                continue
+            if current > deadline:
+                heapq.heappush(self._heap, (current, terminal_id))
+                continue
+            del self._deadlines[terminal_id]
+            due.append(terminal_id)
+        return due
+
+    async def run(self, on_expire: Callable[[str], Awaitable[None]]):
+        """Sleep until the earliest deadline, then expire everything due"""
+        while True:
+            self._wakeup.clear()
+            for terminal_id in self._pop_due(time.time()):
+                task = asyncio.create_task(self._expire(on_expire, terminal_id))
+                self._expiring.add(task)
+                task.add_done_callback(self._expiring.discard)
+            next_deadline = self.next_deadline()
+            timeout = None if next_deadline is None else max(next_deadline - time.time(), 0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _expire(self, on_expire: Callable[[str], Awaitable[None]], terminal_id: str):
+        try:
+            await on_expire(terminal_id)
+        except Exception as e:
+            logger.error(f"Failed to expire terminal {terminal_id}: {e}")
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Terminal File Transfer
+Streams tar archives between HTTP bodies and docker-py's blocking archive calls
+"""
+
+import asyncio
+import base64
+import json
+from typing import Any, AsyncIterator, Dict, Iterator
+
+class ArchiveTooLarge(Exception):
+    """An uploaded archive exceeded the size limit"""
+
+def iter_request_body(body: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop, max_bytes: int) -> Iterator[bytes]:
+    """Yield the chunks of an async request body to a worker thread
+
+    Each chunk is awaited on ``loop`` only when the consumer asks for it, so
+    nothing is buffered beyond one chunk and a slow daemon slows the client
+    down. Raises ArchiveTooLarge once more than ``max_bytes`` have arrived.
+    """
+    async def next_chunk() -> bytes:
+        return await body.__anext__()
+
+    total = 0
+    while True:
+        try:
+            chunk = asyncio.run_coroutine_threadsafe(next_chunk(), loop).result()
+        except StopAsyncIteration:
+            return
+        total += len(chunk)
+        if total > max_bytes:
+            raise ArchiveTooLarge(f"Archive exceeds {max_bytes} bytes")
+        if chunk:
+            yield chunk
+
+def encode_path_stat(stat: Dict[str, Any]) -> str:
+    """Encode a get_archive path stat for a response header, as Docker does"""
+    return base64.b64encode(json.dumps(stat).encode("utf-8")).decode("ascii")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Terminal Log Fan-out
+One upstream log reader per terminal, shared by all stream subscribers
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class LogSubscriber:
+    """A consumer of a terminal's log hub
+
+    Entries arrive on ``queue`` as (offset, line) tuples; None means the
+    subscription ended, with ``close_reason`` saying why.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.close_reason = None
+
+    def close(self, reason: str):
+        """End the subscription, discarding anything still queued"""
+        self.close_reason = reason
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+class LogHub:
+    """Fans one terminal's log stream out to N subscribers
+
+    Lines are numbered with monotonically increasing offsets and kept in a
+    ring buffer so late joiners can replay from an offset. The upstream
+    reader starts with the first subscriber and stops ``linger`` seconds
+    after the last one leaves; ``source`` is called with the last line seen
+    so it can resume without duplicates. A subscriber whose queue is full
+    either loses its oldest entries (``drop``) or is disconnected
+    (``disconnect``).
+    """
+
+    def __init__(self, source: Callable[[Optional[str]], AsyncIterator[str]], buffer_lines: int = 1000,
+                 queue_size: int = 1000, slow_consumer_policy: str = "drop", linger: float = 30.0):
+        self._source = source
+        self._buffer = deque(maxlen=buffer_lines)
+        self._queue_size = queue_size
+        self._policy = slow_consumer_policy
+        self._linger = linger
+        self._subscribers: List[LogSubscriber] = []
+        self._reader: Optional[asyncio.Task] = None
+        self._idle_handle = None
+        self._last_line = None
+        self.next_offset = 0
+        self.finished = False
+        self.dropped = 0
+        self.disconnected = 0
+
+    def subscribe(self, since: Optional[int] = None) -> Tuple[LogSubscriber, List[Tuple[int, str]]]:
+        """Subscribe, returning the subscriber and buffered entries at or after ``since``
+
+        With no ``since`` the whole ring buffer is replayed.
+        """
+        if self._idle_handle:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        subscriber = LogSubscriber(self._queue_size)
+        replay = [entry for entry in self._buffer if since is None or entry[0] >= since]
+        if self.finished:
+            subscriber.close("terminal exited")
+        else:
+            self._subscribers.append(subscriber)
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read())
+        return subscriber, replay
+
+    def unsubscribe(self, subscriber: LogSubscriber):
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+        if not self._subscribers and self._reader and not self._reader.done():
+            self._idle_handle = asyncio.get_running_loop().call_later(self._linger, self._stop_reader)
+
+    def _stop_reader(self):
+        self._idle_handle = None
+        if self._reader and not self._subscribers:
+            self._reader.cancel()
+
+    def _publish(self, line: str):
+        entry = (self.next_offset, line)
+        self.next_offset += 1
+        self._last_line = line
+        self._buffer.append(entry)
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                if self._policy == "disconnect":
+                    self._subscribers.remove(subscriber)
+                    subscriber.close("slow consumer")
+                    self.disconnected += 1
+                else:
+                    subscriber.queue.get_nowait()
+                    subscriber.queue.put_nowait(entry)
+                    subscriber.dropped += 1
+                    self.dropped += 1
+
+    async def _read(self):
+        try:
+            async for line in self._source(self._last_line):
+                self._publish(line)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Log reader failed: {e}")
+        # The upstream stream ended: the container has exited
+        self.finished = True
+        for subscriber in self._subscribers:
+            subscriber.close("terminal exited")
+        self._subscribers.clear()
+
+    async def close(self):
+        """Stop the reader and end all subscriptions"""
+        if self._idle_handle:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        for subscriber in self._subscribers:
+            subscriber.close("terminal destroyed")
+        self._subscribers.clear()
+        if self._reader:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "buffered": len(self._buffer),
+            "next_offset": self.next_offset,
+            "reader_running": bool(self._reader and not self._reader.done()),
+            "dropped": self.dropped,
+            "disconnected": self.disconnected
+        }
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Host-side Log Tail
+Reads terminal log files from the host bind mount with resumable byte cursors
+"""
+
+import base64
+import codecs
+import errno
+import os
+import stat
+from typing import Optional, Tuple
+
+BLOCK_SIZE = 65536
+
+class LogCursor:
+    """Position in one log file: its inode and a byte offset
+
+    Encoded as an opaque string for clients. A cursor for a different inode
+    or past the end of the file means the log was rotated or truncated, and
+    reading restarts from the beginning.
+    """
+
+    __slots__ = ("inode", "offset")
+
+    def __init__(self, inode: int, offset: int):
+        self.inode = inode
+        self.offset = offset
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(f"{self.inode}:{self.offset}".encode("ascii")).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, value: str) -> "LogCursor":
+        """Raises ValueError for a malformed cursor"""
+        try:
+            raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode("ascii")
+            inode, offset = raw.split(":")
+            return cls(int(inode), int(offset))
+        except (UnicodeDecodeError, ValueError) as e:
+            raise ValueError(f"Invalid cursor: {value}") from e
+
+def open_log(path: str) -> int:
+    """Open a log file read-only, refusing what the container could plant instead
+
+    A symlink is not followed, and anything but a regular file, such as a
+    FIFO that would block the reader forever, raises OSError. O_NONBLOCK
+    keeps the open itself from waiting for a FIFO writer; it does not
+    affect reads from a regular file.
+    """
+    fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW | os.O_NONBLOCK)
+    if not stat.S_ISREG(os.fstat(fd).st_mode):
+        os.close(fd)
+        raise OSError(errno.EINVAL, "Not a regular file", path)
+    return fd
+
+def tail_lines(path: str, lines: int, max_bytes: int) -> Tuple[str, LogCursor]:
+    """Return the last ``lines`` lines of a file and a cursor at its end
+
+    Reads whole blocks backwards from the end until enough newlines are
+    found, so the cost depends on the tail size, not the file size. At most
+    ``max_bytes`` are returned.
+    """
+    fd = open_log(path)
+    try:
+        st = os.fstat(fd)
+        end = st.st_size
+        position = end
+        chunks = []
+        newlines = 0
+        # A trailing newline terminates the last line rather than starting a new one
+        wanted = lines + 1 if end and os.pread(fd, 1, end - 1) == b"\n" else lines
+        while position > 0 and newlines < wanted and end - position < max_bytes:
+            size = min(BLOCK_SIZE, position)
+            position -= size
+            block = os.pread(fd, size, position)
+            chunks.append(block)
+            newlines += block.count(b"\n")
+        data = b"".join(reversed(chunks))
+        if newlines >= wanted:
+            cut = len(data)
+            for _ in range(wanted):
+                cut = data.rfind(b"\n", 0, cut)
+            data = data[cut + 1:]
+        data = data[-max_bytes:]
+        return data.decode("utf-8", errors="replace"), LogCursor(st.st_ino, end)
+    finally:
+        os.close(fd)
+
+def read_since(path: str, cursor: Optional[LogCursor], max_bytes: int) -> Tuple[str, LogCursor, bool, bool]:
+    """Read what was appended after ``cursor``, up to ``max_bytes``
+
+    Returns (text, next_cursor, reset, more): ``reset`` is set when the
+    cursor no longer matched the file and reading restarted at offset 0,
+    ``more`` when data remains past the returned cursor. Text never ends
+    inside a UTF-8 sequence.
+    """
+    fd = open_log(path)
+    try:
+        st = os.fstat(fd)
+        offset = cursor.offset if cursor else 0
+        reset = cursor is not None and (cursor.inode != st.st_ino or cursor.offset > st.st_size)
+        if reset:
+            offset = 0
+        data = os.pread(fd, min(max_bytes, st.st_size - offset), offset)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        text = decoder.decode(data)
+        next_offset = offset + len(data) - len(decoder.getstate()[0])
+        return text, LogCursor(st.st_ino, next_offset), reset, next_offset < st.st_size
+    finally:
+        os.close(fd)
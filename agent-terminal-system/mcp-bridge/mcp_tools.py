@@ -5,15 +5,70 @@ Provides MCP-compatible tools for managing agent terminals
 """
 
 import asyncio
+import base64
+import io
 import json
 import logging
 import os
+import tarfile
+import tempfile
 from typing import Dict, List, Any, Optional
 import aiohttp
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Archives are staged in temporary files that stay in memory up to this size
+ARCHIVE_SPOOL_BYTES = 1024 * 1024
+
+def _build_archive(files: Optional[Dict[str, str]], local_paths: Optional[List[str]]):
+    """Tar text files and local files/directories into a rewound temporary file"""
+    archive = tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_BYTES)
+    with tarfile.open(fileobj=archive, mode="w") as tar:
+        for name, content in (files or {}).items():
+            data = content.encode("utf-8")
+            info = tarfile.TarInfo(name.lstrip("/"))
+            info.size = len(data)
+            info.mode = 0o644
+            tar.addfile(info, io.BytesIO(data))
+        for path in local_paths or []:
+            tar.add(path, arcname=os.path.basename(os.path.normpath(path)))
+    archive.seek(0)
+    return archive
+
+def _extract_archive(archive, destination: str) -> List[str]:
+    """Extract an archive under destination, refusing members that would escape it"""
+    with tarfile.open(fileobj=archive, mode="r") as tar:
+        members = tar.getmembers()
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(destination, filter="data")
+        else:
+            root = os.path.realpath(destination)
+            for member in members:
+                target = os.path.realpath(os.path.join(root, member.name))
+                if member.issym() or member.islnk() or os.path.commonpath([root, target]) != root:
+                    raise ValueError(f"Refusing to extract {member.name}")
+            tar.extractall(destination)
+    return [member.name for member in members]
+
+def _read_archive(archive, max_bytes: int) -> Dict[str, Any]:
+    """Contents of an archive's regular files: text, or base64 for binary files"""
+    files = {}
+    total = 0
+    with tarfile.open(fileobj=archive, mode="r") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            total += member.size
+            if total > max_bytes:
+                raise ValueError(f"Files exceed {max_bytes} bytes; pass local_path to save them to disk")
+            data = tar.extractfile(member).read()
+            try:
+                files[member.name] = {"encoding": "text", "content": data.decode("utf-8")}
+            except UnicodeDecodeError:
+                files[member.name] = {"encoding": "base64", "content": base64.b64encode(data).decode("ascii")}
+    return files
+
 class MCPTerminalTools:
     """MCP-compatible tools for terminal management"""
     
@@ -63,6 +118,21 @@ class MCPTerminalTools:
                             "minimum": 1,
                             "maximum": 24,
                             "default": 4
+                        },
+                        "profile": {
+                            "type": "string",
+                            "description": "Resource profile for the terminal container (default: default)",
+                            "default": "default"
+                        },
+                        "wait_ready": {
+                            "type": "boolean",
+                            "description": "Return only once the terminal accepts commands (default: true)",
+                            "default": True
+                        },
+                        "workspace": {
+                            "type": "boolean",
+                            "description": "Mount the agent's persistent workspace volume, kept across terminals (default: false)",
+                            "default": False
                         }
                     },
                     "required": ["agent_id"]
@@ -93,6 +163,45 @@ class MCPTerminalTools:
                     "required": ["terminal_id", "command"]
                 }
             },
+            {
+                "name": "execute_batch",
+                "description": "Execute a list of commands in an existing terminal in one request",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "terminal_id": {
+                            "type": "string",
+                            "description": "Terminal identifier returned from create_terminal"
+                        },
+                        "commands": {
+                            "type": "array",
+                            "description": "Commands to execute, in order",
+                            "items": {"type": "string"},
+                            "minItems": 1,
+                            "maxItems": 100
+                        },
+                        "mode": {
+                            "type": "string",
+                            "description": "Run commands one after another or concurrently (default: sequential)",
+                            "enum": ["sequential", "parallel"],
+                            "default": "sequential"
+                        },
+                        "stop_on_error": {
+                            "type": "boolean",
+                            "description": "Skip remaining commands after one fails (default: true)",
+                            "default": True
+                        },
+                        "timeout": {
+                            "type": "integer",
+                            "description": "Per-command timeout in seconds (default: 30)",
+                            "minimum": 1,
+                            "maximum": 300,
+                            "default": 30
+                        }
+                    },
+                    "required": ["terminal_id", "commands"]
+                }
+            },
             {
                 "name": "get_logs",
                 "description": "Retrieve logs from a terminal",
@@ -114,11 +223,108 @@ class MCPTerminalTools:
                             "type": "boolean",
                             "description": "Whether to stream logs in real-time (default: false)",
                             "default": false
+                        },
+                        "since": {
+                            "type": "string",
+                            "description": "Cursor from a previous get_logs call; returns only newer log data"
                         }
                     },
                     "required": ["terminal_id"]
                 }
             },
+            {
+                "name": "get_output",
+                "description": "Read a page of a large command output that was returned truncated",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "terminal_id": {
+                            "type": "string",
+                            "description": "Terminal identifier"
+                        },
+                        "output_id": {
+                            "type": "string",
+                            "description": "output_id returned by execute_command or execute_batch"
+                        },
+                        "stream": {
+                            "type": "string",
+                            "description": "Which stream to read (default: stdout)",
+                            "enum": ["stdout", "stderr"],
+                            "default": "stdout"
+                        },
+                        "offset": {
+                            "type": "integer",
+                            "description": "Byte offset to start reading from (default: 0)",
+                            "minimum": 0,
+                            "default": 0
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "description": "Maximum number of bytes to read (default: 65536)",
+                            "minimum": 1,
+                            "maximum": 1048576,
+                            "default": 65536
+                        }
+                    },
+                    "required": ["terminal_id", "output_id"]
+                }
+            },
+            {
+                "name": "upload_files",
+                "description": "Upload files into a directory in a terminal as one streamed archive",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "terminal_id": {
+                            "type": "string",
+                            "description": "Terminal identifier"
+                        },
+                        "path": {
+                            "type": "string",
+                            "description": "Existing absolute directory in the terminal to upload into"
+                        },
+                        "files": {
+                            "type": "object",
+                            "description": "Text files to create, as relative path -> content",
+                            "additionalProperties": {"type": "string"}
+                        },
+                        "local_paths": {
+                            "type": "array",
+                            "description": "Local files or directories to upload",
+                            "items": {"type": "string"}
+                        }
+                    },
+                    "required": ["terminal_id", "path"]
+                }
+            },
+            {
+                "name": "download_files",
+                "description": "Download a file or directory from a terminal",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "terminal_id": {
+                            "type": "string",
+                            "description": "Terminal identifier"
+                        },
+                        "path": {
+                            "type": "string",
+                            "description": "Absolute path of the file or directory in the terminal"
+                        },
+                        "local_path": {
+                            "type": "string",
+                            "description": "Local directory to extract into; without it file contents are returned"
+                        },
+                        "max_bytes": {
+                            "type": "integer",
+                            "description": "Most bytes of file contents to return when local_path is not given (default: 1048576)",
+                            "minimum": 1,
+                            "default": 1048576
+                        }
+                    },
+                    "required": ["terminal_id", "path"]
+                }
+            },
             {
                 "name": "destroy_terminal",
                 "description": "Destroy a terminal and clean up its resources",
@@ -159,7 +365,8 @@ class MCPTerminalTools:
 
     async def create_terminal(self, agent_id: str, command: str = "bash", 
                             environment: Optional[Dict[str, str]] = None, 
-                            timeout_hours: int = 4) -> Dict[str, Any]:
+                            timeout_hours: int = 4, profile: str = "default",
+                            wait_ready: bool = True, workspace: bool = False) -> Dict[str, Any]:
         """Create a new agent terminal"""
         if not self.session:
             raise RuntimeError("Tools not initialized. Use async context manager.")
@@ -168,7 +375,10 @@ class MCPTerminalTools:
             "agent_id": agent_id,
             "command": command,
             "environment": environment or {},
-            "timeout_hours": timeout_hours
+            "timeout_hours": timeout_hours,
+            "profile": profile,
+            "wait_ready": wait_ready,
+            "workspace": workspace
         }
         
         try:
@@ -183,7 +393,9 @@ class MCPTerminalTools:
                         "status": result["status"],
                         "created_at": result["created_at"],
                         "container_id": result["container_id"],
-                        "log_path": result["log_path"]
+                        "log_path": result["log_path"],
+                        "ready": result.get("ready", False),
+                        "workspace_path": result.get("workspace_path")
                     }
                 else:
                     error_detail = await response.text()
@@ -219,7 +431,9 @@ class MCPTerminalTools:
                         "output": result["output"],
                         "error": result["error"],
                         "exit_code": result["exit_code"],
-                        "execution_time": result["execution_time"]
+                        "execution_time": result["execution_time"],
+                        "truncated": result.get("truncated", False),
+                        "output_id": result.get("output_id")
                     }
                 else:
                     error_detail = await response.text()
@@ -235,7 +449,48 @@ class MCPTerminalTools:
                 "error": str(e)
             }
 
-    async def get_logs(self, terminal_id: str, lines: int = 100, stream: bool = False) -> Dict[str, Any]:
+    async def execute_batch(self, terminal_id: str, commands: List[str], mode: str = "sequential",
+                            stop_on_error: bool = True, timeout: int = 30) -> Dict[str, Any]:
+        """Execute several commands in a terminal with one request"""
+        if not self.session:
+            raise RuntimeError("Tools not initialized. Use async context manager.")
+            
+        payload = {
+            "commands": commands,
+            "mode": mode,
+            "stop_on_error": stop_on_error,
+            "timeout": timeout
+        }
+        
+        try:
+            async with self.session.post(f"{self.base_url}/terminals/{terminal_id}/execute-batch", json=payload) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    logger.info(f"Executed batch of {len(commands)} commands in terminal {terminal_id}")
+                    return {
+                        "success": result["failed"] == 0 and result["skipped"] == 0,
+                        "results": result["results"],
+                        "succeeded": result["succeeded"],
+                        "failed": result["failed"],
+                        "skipped": result["skipped"],
+                        "execution_time": result["execution_time"]
+                    }
+                else:
+                    error_detail = await response.text()
+                    logger.error(f"Failed to execute batch: {response.status} - {error_detail}")
+                    return {
+                        "success": False,
+                        "error": f"HTTP {response.status}: {error_detail}"
+                    }
+        except Exception as e:
+            logger.error(f"Exception executing batch: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    async def get_logs(self, terminal_id: str, lines: int = 100, stream: bool = False,
+                       since: Optional[str] = None) -> Dict[str, Any]:
         """Get logs from a terminal"""
         if not self.session:
             raise RuntimeError("Tools not initialized. Use async context manager.")
@@ -246,13 +501,16 @@ class MCPTerminalTools:
         
         try:
             params = {"lines": lines}
+            if since:
+                params["since"] = since
             async with self.session.get(f"{self.base_url}/terminals/{terminal_id}/logs", params=params) as response:
                 if response.status == 200:
                     result = await response.json()
                     return {
                         "success": True,
                         "logs": result["logs"],
-                        "lines_returned": len(result["logs"].split('\n'))
+                        "lines_returned": len(result["logs"].split('\n')),
+                        "cursor": result.get("cursor")
                     }
                 else:
                     error_detail = await response.text()
@@ -268,6 +526,39 @@ class MCPTerminalTools:
                 "error": str(e)
             }
 
+    async def get_output(self, terminal_id: str, output_id: str, stream: str = "stdout",
+                         offset: int = 0, limit: int = 65536) -> Dict[str, Any]:
+        """Read a page of a truncated command output"""
+        if not self.session:
+            raise RuntimeError("Tools not initialized. Use async context manager.")
+            
+        try:
+            params = {"stream": stream, "offset": offset, "limit": limit}
+            url = f"{self.base_url}/terminals/{terminal_id}/output/{output_id}"
+            async with self.session.get(url, params=params) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    return {
+                        "success": True,
+                        "data": result["data"],
+                        "next_offset": result["next_offset"],
+                        "total_bytes": result["total_bytes"],
+                        "eof": result["eof"]
+                    }
+                else:
+                    error_detail = await response.text()
+                    logger.error(f"Failed to get output: {response.status} - {error_detail}")
+                    return {
+                        "success": False,
+                        "error": f"HTTP {response.status}: {error_detail}"
+                    }
+        except Exception as e:
+            logger.error(f"Exception getting output: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
     async def _stream_logs(self, terminal_id: str) -> Dict[str, Any]:
         """Stream logs from a terminal using WebSocket"""
         try:
@@ -307,6 +598,85 @@ class MCPTerminalTools:
                 "error": str(e)
             }
 
+    async def upload_files(self, terminal_id: str, path: str, files: Optional[Dict[str, str]] = None,
+                           local_paths: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Upload text files and/or local files and directories into a terminal directory"""
+        if not self.session:
+            raise RuntimeError("Tools not initialized. Use async context manager.")
+            
+        try:
+            loop = asyncio.get_running_loop()
+            archive = await loop.run_in_executor(None, _build_archive, files, local_paths)
+            try:
+                url = f"{self.base_url}/terminals/{terminal_id}/files"
+                headers = {"Content-Type": "application/x-tar"}
+                # aiohttp streams the file body in chunks
+                async with self.session.put(url, params={"path": path}, data=archive, headers=headers) as response:
+                    if response.status == 200:
+                        return {
+                            "success": True,
+                            "terminal_id": terminal_id,
+                            "path": path,
+                            "uploaded": sorted(files or {}) + [os.path.basename(os.path.normpath(p)) for p in local_paths or []]
+                        }
+                    else:
+                        error_detail = await response.text()
+                        logger.error(f"Failed to upload files: {response.status} - {error_detail}")
+                        return {
+                            "success": False,
+                            "error": f"HTTP {response.status}: {error_detail}"
+                        }
+            finally:
+                archive.close()
+        except Exception as e:
+            logger.error(f"Exception uploading files: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    async def download_files(self, terminal_id: str, path: str, local_path: Optional[str] = None,
+                             max_bytes: int = 1048576) -> Dict[str, Any]:
+        """Download a file or directory, extracting it locally or returning file contents"""
+        if not self.session:
+            raise RuntimeError("Tools not initialized. Use async context manager.")
+            
+        try:
+            url = f"{self.base_url}/terminals/{terminal_id}/files"
+            with tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_BYTES) as archive:
+                async with self.session.get(url, params={"path": path}) as response:
+                    if response.status != 200:
+                        error_detail = await response.text()
+                        logger.error(f"Failed to download files: {response.status} - {error_detail}")
+                        return {
+                            "success": False,
+                            "error": f"HTTP {response.status}: {error_detail}"
+                        }
+                    async for chunk in response.content.iter_chunked(65536):
+                        archive.write(chunk)
+                archive.seek(0)
+                loop = asyncio.get_running_loop()
+                if local_path:
+                    extracted = await loop.run_in_executor(None, _extract_archive, archive, local_path)
+                    return {
+                        "success": True,
+                        "terminal_id": terminal_id,
+                        "local_path": local_path,
+                        "extracted": extracted
+                    }
+                contents = await loop.run_in_executor(None, _read_archive, archive, max_bytes)
+                return {
+                    "success": True,
+                    "terminal_id": terminal_id,
+                    "files": contents
+                }
+        except Exception as e:
+            logger.error(f"Exception downloading files: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
     async def destroy_terminal(self, terminal_id: str) -> Dict[str, Any]:
         """Destroy a terminal"""
         if not self.session:
@@ -391,7 +761,11 @@ class MCPTerminalTools:
         tool_methods = {
             "create_terminal": self.create_terminal,
             "execute_command": self.execute_command,
+            "execute_batch": self.execute_batch,
             "get_logs": self.get_logs,
+            "get_output": self.get_output,
+            "upload_files": self.upload_files,
+            "download_files": self.download_files,
             "destroy_terminal": self.destroy_terminal,
             "list_terminals": self.list_terminals,
             "get_terminal_status": self.get_terminal_status
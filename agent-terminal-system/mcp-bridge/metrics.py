@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Bridge Metrics
+Prometheus metrics for terminal operations, Docker and Redis calls and the event loop
+"""
+
+import asyncio
+import functools
+import time
+
+import redis
+from prometheus_client import Counter, Gauge, Histogram
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (0, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+OPERATION_SECONDS = Histogram(
+    "mcp_bridge_operation_seconds",
+    "Latency of terminal operations (create, exec, logs, destroy)",
+    ["operation", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+DOCKER_CALL_SECONDS = Histogram(
+    "mcp_bridge_docker_call_seconds",
+    "Time spent in docker-py calls, by executor pool and call",
+    ["op", "call"],
+    buckets=LATENCY_BUCKETS
+)
+DOCKER_QUEUE_SECONDS = Histogram(
+    "mcp_bridge_docker_queue_seconds",
+    "Time docker-py calls waited for a free executor thread",
+    ["op"],
+    buckets=LATENCY_BUCKETS
+)
+REDIS_COMMAND_SECONDS = Histogram(
+    "mcp_bridge_redis_command_seconds",
+    "Latency of Redis commands issued by the bridge",
+    ["command"],
+    buckets=LATENCY_BUCKETS
+)
+EXEC_OUTPUT_BYTES = Histogram(
+    "mcp_bridge_exec_output_bytes",
+    "Bytes of command output per exec, by stream",
+    ["stream"],
+    buckets=BYTES_BUCKETS
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "mcp_bridge_event_loop_lag_seconds",
+    "How late the event loop ran a scheduled wakeup",
+    buckets=LATENCY_BUCKETS
+)
+RATE_LIMITED_REQUESTS = Counter(
+    "mcp_bridge_rate_limited_requests",
+    "Requests rejected with 429 by the per-agent rate limiter, by route class",
+    ["route_class"]
+)
+DEPENDENCY_CACHE_REQUESTS = Counter(
+    "mcp_bridge_dependency_cache_requests",
+    "Packages installed in terminals, by cache and whether the shared cache served them",
+    ["cache", "result"]
+)
+DOCKER_QUEUE_TIMEOUTS = Counter(
+    "mcp_bridge_docker_queue_timeouts",
+    "docker-py calls rejected after waiting too long for a governor slot, by class",
+    ["op"]
+)
+WARM_POOL_CLAIMS = Counter(
+    "mcp_bridge_warm_pool_claims",
+    "Terminal creates that tried the warm pool, by profile and whether an idle container was there (hit, miss)",
+    ["profile", "result"]
+)
+DOCKER_QUEUE_DEPTH = Gauge("mcp_bridge_docker_queue_depth", "docker-py calls waiting for a governor slot, by class", ["op"])
+TERMINALS = Gauge("mcp_bridge_terminals", "Terminals known to this worker, by status", ["status"])
+WARM_POOL_IDLE = Gauge("mcp_bridge_warm_pool_idle", "Idle pre-created containers, by profile", ["profile"])
+DOCKER_IN_FLIGHT = Gauge("mcp_bridge_docker_in_flight", "docker-py calls queued or running, by executor pool", ["op"])
+ADMISSION_COMMITTED = Gauge(
+    "mcp_bridge_admission_committed",
+    "Host capacity committed to admitted terminals, by resource (memory bytes, cpus)",
+    ["resource"]
+)
+ADMISSION_QUEUED = Gauge("mcp_bridge_admission_queued", "Create requests waiting for host capacity")
+LOG_STREAM_SUBSCRIBERS = Gauge("mcp_bridge_log_stream_subscribers", "WebSocket log stream subscribers")
+
+def timed_operation(operation: str):
+    """Decorate a coroutine function to observe its duration, labelled ok or error"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await func(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                OPERATION_SECONDS.labels(operation, outcome).observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+class InstrumentedRedis(redis.Redis):
+    """Redis client that records the latency of every command it sends
+
+    Pipelines are timed as a single ``PIPELINE`` command.
+    """
+
+    def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_SECONDS.labels(str(args[0]).upper()).observe(time.perf_counter() - start)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+class InstrumentedPipeline(redis.client.Pipeline):
+    def execute(self, raise_on_error=True):
+        start = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            REDIS_COMMAND_SECONDS.labels("PIPELINE").observe(time.perf_counter() - start)
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Sleep for interval and record how much later than that the loop woke us"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(loop.time() - start - interval, 0))
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Command Output Spooling
+Bounds the memory held per command by spilling large outputs to disk
+"""
+
+import os
+import uuid
+from typing import Dict, Optional, Tuple
+
+STREAM_NAMES = ("stdout", "stderr")
+
+class OutputSpool:
+    """Collects one stream of a command's output
+
+    Output up to ``threshold`` bytes stays in memory. Past that, everything
+    is written to ``path`` and only the first and last ``excerpt_bytes`` are
+    kept, so memory per command stays bounded however much it prints.
+    """
+
+    def __init__(self, path: str, threshold: int, excerpt_bytes: int):
+        self.path = path
+        self.threshold = threshold
+        self.excerpt_bytes = excerpt_bytes
+        self.size = 0
+        self._buffer = bytearray()
+        self._tail = bytearray()
+        self._file = None
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self._file is None:
+            self._buffer += data
+            if len(self._buffer) <= self.threshold:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, "wb")
+            self._file.write(self._buffer)
+            self._tail = self._buffer[-self.excerpt_bytes:]
+            del self._buffer[self.excerpt_bytes:]
+            return
+        self._file.write(data)
+        self._tail += data
+        if len(self._tail) > 2 * self.excerpt_bytes:
+            del self._tail[:-self.excerpt_bytes]
+
+    def spill(self):
+        """Write the output to ``path`` even though it stayed under the threshold"""
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "wb") as f:
+                f.write(self._buffer)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def text(self) -> str:
+        """The whole output, or head and tail around an omission marker once spilled"""
+        if self._file is None:
+            return bytes(self._buffer).decode("utf-8", errors="replace")
+        tail_size = min(self.excerpt_bytes, self.size - len(self._buffer))
+        tail = bytes(self._tail[len(self._tail) - tail_size:])
+        omitted = self.size - len(self._buffer) - len(tail)
+        return (
+            bytes(self._buffer).decode("utf-8", errors="replace")
+            + f"\n... [{omitted} bytes omitted] ...\n"
+            + tail.decode("utf-8", errors="replace")
+        )
+
+class CommandOutput:
+    """Spools for the stdout and stderr of one command
+
+    Spilled streams are written to ``{spool_dir}/{output_id}.stdout`` and
+    ``.stderr``; at most ``max_outputs`` spilled commands are kept per
+    spool directory, oldest removed first.
+    """
+
+    def __init__(self, spool_dir: str, threshold: int, excerpt_bytes: int, max_outputs: int):
+        self.spool_dir = spool_dir
+        self.max_outputs = max_outputs
+        self.output_id = uuid.uuid4().hex
+        self.streams: Dict[str, OutputSpool] = {
+            name: OutputSpool(os.path.join(spool_dir, f"{self.output_id}.{name}"), threshold, excerpt_bytes)
+            for name in STREAM_NAMES
+        }
+
+    @property
+    def spilled(self) -> bool:
+        return any(spool.spilled for spool in self.streams.values())
+
+    def close(self):
+        """Finish spooling; if either stream spilled, both become readable by range"""
+        spilled = self.spilled
+        for spool in self.streams.values():
+            spool.close()
+            if spilled:
+                spool.spill()
+        if spilled:
+            prune_spool_dir(self.spool_dir, self.max_outputs)
+
+def prune_spool_dir(spool_dir: str, max_outputs: int):
+    """Delete the oldest spilled outputs beyond max_outputs"""
+    outputs: Dict[str, Tuple[float, list]] = {}
+    try:
+        entries = list(os.scandir(spool_dir))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        output_id = entry.name.split(".", 1)[0]
+        outputs.setdefault(output_id, (entry.stat().st_mtime, []))[1].append(entry.path)
+    for output_id in sorted(outputs, key=lambda key: outputs[key][0])[:-max_outputs or None]:
+        for path in outputs[output_id][1]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def read_spooled(spool_dir: str, output_id: str, stream: str, offset: int, limit: int) -> Optional[Tuple[bytes, int]]:
+    """Read up to limit bytes of a spilled stream from offset
+
+    Returns (data, total_size), or None if the output is unknown.
+    """
+    if stream not in STREAM_NAMES or not output_id.isalnum():
+        return None
+    path = os.path.join(spool_dir, f"{output_id}.{stream}")
+    try:
+        with open(path, "rb") as f:
+            total = os.fstat(f.fileno()).st_size
+            f.seek(offset)
+            return f.read(limit), total
+    except FileNotFoundError:
+        return None
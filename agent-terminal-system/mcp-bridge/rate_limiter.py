@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Agent Rate Limiting
+Token buckets per agent and route class, in process or shared through Redis
+"""
+
+import time
+from typing import Dict, Tuple
+
+# Refill a bucket stored as a Redis hash and take one token.
+# Returns 0 when allowed, otherwise the milliseconds until a token is available.
+TAKE_TOKEN_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+local wait = 0
+if tokens < 1 then
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+else
+    tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+class TokenBucket:
+    """Allows ``burst`` requests at once, refilled at ``rate`` per second"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token; returns 0 if one was available, else seconds until one is"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        self.tokens -= 1
+        return 0.0
+
+    def idle(self, now: float) -> bool:
+        """True once the bucket would have refilled completely"""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+class RateLimiter:
+    """Per-agent token buckets, one per route class
+
+    ``limits`` maps each route class to (requests per minute, burst). With
+    a Redis client the buckets live in Redis so every worker shares them;
+    otherwise they are kept in this process and full (idle) buckets are
+    dropped once more than ``max_buckets`` exist.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, int]], redis_client=None, max_buckets: int = 100000):
+        self.limits = limits
+        self.redis = redis_client
+        self.max_buckets = max_buckets
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._take_token = redis_client.register_script(TAKE_TOKEN_SCRIPT) if redis_client else None
+
+    def check(self, agent_id: str, route_class: str) -> float:
+        """Count a request; returns 0 if allowed, else seconds to wait before retrying"""
+        per_minute, burst = self.limits.get(route_class, self.limits["default"])
+        rate = per_minute / 60.0
+        if self.redis is not None:
+            wait_ms = self._take_token(
+                keys=[f"ratelimit:{agent_id}:{route_class}"],
+                args=[rate, burst, int(time.time() * 1000)]
+            )
+            return int(wait_ms) / 1000.0
+        now = time.monotonic()
+        key = (agent_id, route_class)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                self._prune(now)
+            bucket = self._buckets[key] = TokenBucket(rate, burst, now)
+        return bucket.take(now)
+
+    def _prune(self, now: float):
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if not bucket.idle(now)}
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis" if self.redis is not None else "local",
+            "buckets": len(self._buckets),
+            "limits": {route_class: {"per_minute": limit[0], "burst": limit[1]} for route_class, limit in self.limits.items()}
+        }
@@ -5,22 +5,51 @@ Provides an MCP-compatible interface for agent terminal management
 """
 
 import asyncio
+import base64
+import calendar
+import codecs
+import functools
 import json
 import logging
+import math
 import os
+import shutil
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
 import jwt
 import docker
-import redis
+import redis.asyncio as aioredis
 import websockets
-from fastapi import FastAPI, HTTPException, Depends, WebSocket
+from fastapi import FastAPI, HTTPException, Depends, Request, WebSocket
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
 import uvicorn
-from contextlib import asynccontextmanager
+from contextlib import aclosing, asynccontextmanager, contextmanager
+from admission import AdmissionController, AdmissionRejected, detect_host_capacity, parse_memory, profile_demand
+from dependency_cache import DependencyCache
+from docker_governor import DockerBusy, DockerGovernor
+from expiry_scheduler import ExpiryScheduler
+from file_transfer import ArchiveTooLarge, encode_path_stat, iter_request_body
+from log_hub import LogHub
+from log_tail import LogCursor, read_since, tail_lines
+from metrics import (
+    ADMISSION_COMMITTED, ADMISSION_QUEUED, DOCKER_CALL_SECONDS, DOCKER_IN_FLIGHT, DOCKER_QUEUE_SECONDS, EXEC_OUTPUT_BYTES, LOG_STREAM_SUBSCRIBERS,
+    RATE_LIMITED_REQUESTS, TERMINALS, WARM_POOL_CLAIMS, WARM_POOL_IDLE, InstrumentedRedis, monitor_event_loop_lag, timed_operation
+)
+from output_spool import CommandOutput, read_spooled
+from rate_limiter import RateLimiter
+from shared_state import INVALIDATION_CHANNEL, SharedTerminalState
+from shell_session import EXIT, STDERR, STDOUT, ShellSession
+from terminal_backend import DockerBackend, FakeBackend, TerminalBackend, parse_latencies
+from terminal_registry import TerminalRecord, TerminalRegistry
+from token_cache import TokenCache
+from workspace_volumes import WorkspaceManager, WorkspaceQuotaExceeded
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -31,12 +60,143 @@ class Config:
     JWT_SECRET = os.getenv("JWT_SECRET", "mcp-terminal-bridge-secret")
     JWT_ALGORITHM = "HS256"
     JWT_EXPIRE_HOURS = 24
+    # Verified tokens are cached until their exp, but re-verified at least this often
+    JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+    JWT_CACHE_TTL_SECONDS = int(os.getenv("JWT_CACHE_TTL_SECONDS", "300"))
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
     ELASTICSEARCH_URL = os.getenv("ELASTICSEARCH_URL", "http://localhost:9200")
     TERMINAL_IMAGE = "minimal-agent-terminal:latest"
     LOG_BASE_DIR = "/tmp/agent-logs"
     MAX_TERMINALS_PER_AGENT = 5
     TERMINAL_TIMEOUT_HOURS = 4
+    TERMINAL_MAX_TIMEOUT_HOURS = 24
+    # Longest a create with wait_ready blocks for the terminal to accept commands
+    TERMINAL_READY_TIMEOUT = int(os.getenv("TERMINAL_READY_TIMEOUT", "30"))
+    # Push a terminal's expiry out by its full timeout on every exec/logs/stream call
+    TERMINAL_SLIDING_TTL = os.getenv("TERMINAL_SLIDING_TTL", "false").lower() == "true"
+    # Freeze a terminal's processes (docker pause) after this long without an
+    # exec, logs or stream call; the next such call unpauses it
+    IDLE_PAUSE_ENABLED = os.getenv("IDLE_PAUSE_ENABLED", "false").lower() == "true"
+    IDLE_PAUSE_SECONDS = int(os.getenv("IDLE_PAUSE_SECONDS", "600"))
+    # Seconds a destroyed terminal gets to exit after SIGTERM before it is killed
+    TERMINAL_STOP_TIMEOUT = int(os.getenv("TERMINAL_STOP_TIMEOUT", "10"))
+    # Failed teardowns are retried after this many seconds, doubling up to 5 minutes
+    DESTROY_RETRY_SECONDS = int(os.getenv("DESTROY_RETRY_SECONDS", "10"))
+    # Expired terminals are killed outright ("kill") or stopped gracefully ("stop")
+    EXPIRED_TERMINAL_POLICY = os.getenv("EXPIRED_TERMINAL_POLICY", "kill")
+    # Thread pool size per Docker operation class; blocking docker-py calls
+    # never run on the event loop
+    DOCKER_POOL_SIZES = {
+        "create": int(os.getenv("DOCKER_CREATE_WORKERS", "8")),
+        "exec": int(os.getenv("DOCKER_EXEC_WORKERS", "32")),
+        "logs": int(os.getenv("DOCKER_LOGS_WORKERS", "16")),
+        "destroy": int(os.getenv("DOCKER_DESTROY_WORKERS", "8")),
+        # Long-lived readers: log follows, exec output, events, archive transfers
+        "stream": int(os.getenv("DOCKER_STREAM_WORKERS", "64")),
+    }
+    # Governor over all Docker API calls except long-lived "stream" readers: at
+    # most DOCKER_MAX_CONCURRENT in flight (and a pool's size per class), queued
+    # calls start in DOCKER_PRIORITIES order and give 503 after their class's
+    # queue timeout
+    DOCKER_MAX_CONCURRENT = int(os.getenv("DOCKER_MAX_CONCURRENT", "48"))
+    DOCKER_PRIORITIES = os.getenv("DOCKER_PRIORITIES", "exec,logs,destroy,create").split(",")
+    DOCKER_QUEUE_TIMEOUTS = {
+        "create": float(os.getenv("DOCKER_CREATE_QUEUE_TIMEOUT", "30")),
+        "exec": float(os.getenv("DOCKER_EXEC_QUEUE_TIMEOUT", "10")),
+        "logs": float(os.getenv("DOCKER_LOGS_QUEUE_TIMEOUT", "10")),
+        "destroy": float(os.getenv("DOCKER_DESTROY_QUEUE_TIMEOUT", "60")),
+    }
+    # Container resource limits by profile name
+    RESOURCE_PROFILES = {
+        "default": {"mem_limit": "512m", "cpu_quota": 50000},  # 50% CPU
+    }
+    # Warm pool of idle, pre-started containers per (image, profile)
+    WARM_POOL_ENABLED = os.getenv("WARM_POOL_ENABLED", "true").lower() == "true"
+    WARM_POOL_PROFILES = os.getenv("WARM_POOL_PROFILES", "default").split(",")
+    WARM_POOL_LOW_WATERMARK = int(os.getenv("WARM_POOL_LOW_WATERMARK", "2"))
+    WARM_POOL_HIGH_WATERMARK = int(os.getenv("WARM_POOL_HIGH_WATERMARK", "5"))
+    # Admit terminals only while their profiles' memory/CPU limits fit in host
+    # capacity ("auto": 90% of physical RAM and all CPUs); others wait in a queue
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    HOST_MEMORY_CAPACITY = os.getenv("HOST_MEMORY_CAPACITY", "auto")
+    HOST_CPU_CAPACITY = os.getenv("HOST_CPU_CAPACITY", "auto")
+    ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "100"))
+    ADMISSION_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_TIMEOUT_SECONDS", "30"))
+    # Run commands in a persistent per-terminal shell instead of one exec each
+    SHELL_SESSIONS_ENABLED = os.getenv("SHELL_SESSIONS_ENABLED", "true").lower() == "true"
+    # uvicorn workers on one port; requests spread across them with no
+    # per-terminal affinity, so shell sessions are forced off when > 1
+    BRIDGE_WORKERS = int(os.getenv("BRIDGE_WORKERS", "1"))
+    if BRIDGE_WORKERS > 1:
+        SHELL_SESSIONS_ENABLED = False
+    # Shared per-terminal log stream for WebSocket subscribers
+    LOG_HUB_BUFFER_LINES = int(os.getenv("LOG_HUB_BUFFER_LINES", "1000"))
+    LOG_HUB_QUEUE_SIZE = int(os.getenv("LOG_HUB_QUEUE_SIZE", "1000"))
+    LOG_HUB_SLOW_CONSUMER_POLICY = os.getenv("LOG_HUB_SLOW_CONSUMER_POLICY", "drop")  # drop | disconnect
+    LOG_HUB_LINGER_SECONDS = float(os.getenv("LOG_HUB_LINGER_SECONDS", "30"))
+    # Most bytes returned by one read of a terminal's log files
+    LOG_READ_MAX_BYTES = int(os.getenv("LOG_READ_MAX_BYTES", str(1024 * 1024)))
+    # How long destroyed terminals stay listed before eviction
+    TOMBSTONE_TTL_SECONDS = int(os.getenv("TOMBSTONE_TTL_SECONDS", "3600"))
+    MAX_TOMBSTONES = int(os.getenv("MAX_TOMBSTONES", "10000"))
+    # Containers younger than this are never reaped as orphans at startup;
+    # another worker may not have recorded them yet
+    ORPHAN_GRACE_SECONDS = 60
+    # Keep terminal ownership, limits and expiry in Redis so several workers
+    # or nodes (sharing one Docker daemon) can serve any terminal
+    SHARED_STATE_ENABLED = os.getenv("SHARED_STATE_ENABLED", "false").lower() == "true"
+    # Follow Docker container events to track terminals that exit or are OOM-killed
+    CONTAINER_EVENTS_ENABLED = os.getenv("CONTAINER_EVENTS_ENABLED", "true").lower() == "true"
+    NODE_HEARTBEAT_SECONDS = 10
+    # Per-agent token buckets: (requests per minute, burst) for each route class
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMITS = {
+        route_class: (
+            int(os.getenv(f"RATE_LIMIT_{route_class.upper()}_PER_MINUTE", str(per_minute))),
+            int(os.getenv(f"RATE_LIMIT_{route_class.upper()}_BURST", str(burst)))
+        )
+        for route_class, (per_minute, burst) in {
+            "create": (10, 5),
+            "exec": (100, 20),
+            "logs": (300, 50),
+            "default": (100, 20)
+        }.items()
+    }
+    # Share buckets across workers through Redis (defaults to on in shared state mode)
+    RATE_LIMIT_REDIS = os.getenv("RATE_LIMIT_REDIS", str(SHARED_STATE_ENABLED)).lower() == "true"
+    # Batch execution limits
+    BATCH_MAX_COMMANDS = int(os.getenv("BATCH_MAX_COMMANDS", "100"))
+    BATCH_MAX_PARALLEL = int(os.getenv("BATCH_MAX_PARALLEL", "8"))
+    # Prometheus metrics at /metrics
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    # Command output above this many bytes per stream is spooled to disk under
+    # LOG_BASE_DIR/.spool and returned as head/tail excerpts plus an output_id
+    OUTPUT_SPOOL_THRESHOLD_BYTES = int(os.getenv("OUTPUT_SPOOL_THRESHOLD_BYTES", str(256 * 1024)))
+    OUTPUT_EXCERPT_BYTES = int(os.getenv("OUTPUT_EXCERPT_BYTES", str(16 * 1024)))
+    OUTPUT_SPOOL_MAX_OUTPUTS = int(os.getenv("OUTPUT_SPOOL_MAX_OUTPUTS", "20"))
+    OUTPUT_PAGE_MAX_BYTES = 1024 * 1024
+    # Opt-in named volume per agent, mounted in every terminal that asks for it;
+    # measured usage above the quota blocks mounting, and volumes unused for
+    # WORKSPACE_EVICT_AFTER_HOURS or beyond WORKSPACE_MAX_VOLUMES are evicted
+    WORKSPACE_VOLUMES_ENABLED = os.getenv("WORKSPACE_VOLUMES_ENABLED", "false").lower() == "true"
+    WORKSPACE_MOUNT_PATH = os.getenv("WORKSPACE_MOUNT_PATH", "/home/agent/workspace")
+    WORKSPACE_QUOTA = os.getenv("WORKSPACE_QUOTA", "10g")
+    WORKSPACE_MAX_VOLUMES = int(os.getenv("WORKSPACE_MAX_VOLUMES", "100"))
+    WORKSPACE_EVICT_AFTER_HOURS = int(os.getenv("WORKSPACE_EVICT_AFTER_HOURS", "168"))
+    # Shared pip wheelhouse mounted read-only into every terminal; one writer
+    # fills it, with autofill from packages terminals had to download
+    DEPENDENCY_CACHE_ENABLED = os.getenv("DEPENDENCY_CACHE_ENABLED", "false").lower() == "true"
+    DEPENDENCY_CACHE_VOLUME = os.getenv("DEPENDENCY_CACHE_VOLUME", "mcp-dependency-cache-pip")
+    DEPENDENCY_CACHE_PATH = os.getenv("DEPENDENCY_CACHE_PATH", "/opt/dependency-cache/pip")
+    DEPENDENCY_CACHE_AUTOFILL = os.getenv("DEPENDENCY_CACHE_AUTOFILL", "true").lower() == "true"
+    # Largest tar archive accepted by a file upload
+    FILE_UPLOAD_MAX_BYTES = int(os.getenv("FILE_UPLOAD_MAX_BYTES", str(1024 ** 3)))
+    # Where terminals run: "docker", or "fake" to benchmark the bridge without Docker
+    TERMINAL_BACKEND = os.getenv("TERMINAL_BACKEND", "docker")
+    FAKE_BACKEND_MODE = os.getenv("FAKE_BACKEND_MODE", "echo")  # echo | subprocess
+    # Injected per-operation latency, e.g. "create=800:200,exec=5" (base:jitter ms)
+    FAKE_BACKEND_LATENCY_MS = os.getenv("FAKE_BACKEND_LATENCY_MS", "")
+    FAKE_BACKEND_SEED = int(os.getenv("FAKE_BACKEND_SEED", "0"))
 
 config = Config()
 
@@ -46,10 +206,14 @@ class TerminalCreateRequest(BaseModel):
     command: Optional[str] = "bash"
     environment: Optional[Dict[str, str]] = None
     timeout_hours: Optional[int] = 4
+    profile: Optional[str] = "default"
+    wait_ready: Optional[bool] = False
+    workspace: Optional[bool] = False
 
 class TerminalExecuteRequest(BaseModel):
     command: str
     timeout: Optional[int] = 30
+    session: Optional[bool] = None
 
 class TerminalResponse(BaseModel):
     terminal_id: str
@@ -58,35 +222,279 @@ class TerminalResponse(BaseModel):
     created_at: str
     container_id: str
     log_path: str
+    ready: bool = False
+    workspace_path: Optional[str] = None
 
 class ExecuteResponse(BaseModel):
     output: str
     error: str
     exit_code: int
     execution_time: float
+    output_bytes: int = 0
+    error_bytes: int = 0
+    truncated: bool = False
+    output_id: Optional[str] = None
+
+class CacheFillRequest(BaseModel):
+    packages: List[str]
+
+class TerminalBatchExecuteRequest(BaseModel):
+    commands: List[str]
+    mode: Optional[str] = "sequential"  # sequential | parallel
+    stop_on_error: Optional[bool] = True
+    timeout: Optional[int] = 30
+    session: Optional[bool] = None
+
+class BatchCommandResult(BaseModel):
+    index: int
+    command: str
+    status: str  # ok | failed | timeout | error | skipped
+    output: str = ""
+    error: str = ""
+    exit_code: Optional[int] = None
+    execution_time: float = 0.0
+    output_bytes: int = 0
+    error_bytes: int = 0
+    truncated: bool = False
+    output_id: Optional[str] = None
+
+class BatchExecuteResponse(BaseModel):
+    results: List[BatchCommandResult]
+    succeeded: int
+    failed: int
+    skipped: int
+    execution_time: float
+
+class DockerExecutor:
+    """Runs blocking docker-py calls on bounded per-operation thread pools
+
+    With a governor, each call first waits for a governor slot, so queued
+    calls wait (and time out) in priority order rather than in a thread
+    pool's FIFO queue.
+    """
+
+    def __init__(self, pool_sizes: Dict[str, int], governor: Optional[DockerGovernor] = None):
+        self.governor = governor
+        self._pools = {
+            op: ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"docker-{op}")
+            for op, size in pool_sizes.items()
+        }
+        self._stats = {
+            op: {"workers": size, "calls": 0, "errors": 0, "in_flight": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            for op, size in pool_sizes.items()
+        }
+
+    async def run(self, op: str, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on the pool for op without blocking the event loop"""
+        stats = self._stats[op]
+        stats["calls"] += 1
+        stats["in_flight"] += 1
+        start = time.perf_counter()
+        call_name = getattr(func, "__name__", type(func).__name__)
+        
+        def call():
+            started = time.perf_counter()
+            DOCKER_QUEUE_SECONDS.labels(op).observe(started - start)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                DOCKER_CALL_SECONDS.labels(op, call_name).observe(time.perf_counter() - started)
+        
+        try:
+            if self.governor:
+                await self.governor.acquire(op)
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._pools[op], call)
+            finally:
+                if self.governor:
+                    self.governor.release(op)
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            stats["in_flight"] -= 1
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-operation call counts and latency, plus governor queueing"""
+        governed = self.governor.stats() if self.governor else {}
+        return {
+            op: {
+                **s,
+                "avg_seconds": s["total_seconds"] / s["calls"] if s["calls"] else 0.0,
+                **({"governor": governed[op]} if op in governed else {})
+            }
+            for op, s in self._stats.items()
+        }
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+class WarmPool:
+    """Idle, pre-started terminal containers for one image and resource profile
+
+    Pooled containers idle on ``tail -f /dev/null`` with a bind-mounted log
+    directory under ``LOG_BASE_DIR/.pool``. Claiming one renames the container
+    and moves the host log directory into place; the agent's environment is
+    applied per exec, since it cannot be changed on a running container.
+    """
+
+    def __init__(self, image: str, profile: str, low: int, high: int):
+        self.image = image
+        self.profile = profile
+        self.low = low
+        self.high = high
+        self._idle = []
+        self._refill_needed = asyncio.Event()
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.failures = 0
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Take an idle container, or None on a pool miss"""
+        entry = self._idle.pop() if self._idle else None
+        if entry:
+            self.hits += 1
+        else:
+            self.misses += 1
+        WARM_POOL_CLAIMS.labels(self.profile, "hit" if entry else "miss").inc()
+        if len(self._idle) <= self.low:
+            self._refill_needed.set()
+        return entry
+
+    async def _create_idle(self):
+        pool_id = str(uuid.uuid4())
+        pool_dir = os.path.join(config.LOG_BASE_DIR, ".pool", pool_id)
+        os.makedirs(pool_dir, exist_ok=True)
+        volumes = {pool_dir: {"bind": "/tmp/logs", "mode": "rw"}}
+        if dependency_cache:
+            volumes.update(dependency_cache.mounts())
+        container = await docker_ops.run(
+            "create",
+            docker_client.containers.run,
+            self.image,
+            command="tail -f /dev/null",
+            environment={"LOG_DIR": "/tmp/logs"},
+            volumes=volumes,
+            detach=True,
+            name=f"mcp-terminal-pool-{pool_id}",
+            labels={"mcp-bridge.managed": "true", "mcp-bridge.pool": self.profile, "mcp-bridge.node": node_id},
+            network_mode="bridge",
+            remove=False,
+            **config.RESOURCE_PROFILES[self.profile]
+        )
+        self._idle.append({"container": container, "pool_dir": pool_dir})
+        self.created += 1
+
+    async def run(self):
+        """Refill to the high watermark whenever the pool drops to the low one"""
+        self._refill_needed.set()
+        while True:
+            await self._refill_needed.wait()
+            self._refill_needed.clear()
+            while len(self._idle) < self.high:
+                try:
+                    await self._create_idle()
+                except Exception as e:
+                    self.failures += 1
+                    logger.error(f"Failed to refill warm pool {self.profile}: {e}")
+                    await asyncio.sleep(5)
+                    break
+
+    async def drain(self):
+        """Remove all idle containers"""
+        while self._idle:
+            entry = self._idle.pop()
+            try:
+                await docker_ops.run("destroy", entry["container"].remove, force=True)
+            except Exception as e:
+                logger.error(f"Failed to remove pooled container {entry['container'].id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        claims = self.hits + self.misses
+        return {
+            "image": self.image,
+            "profile": self.profile,
+            "idle": len(self._idle),
+            "low_watermark": self.low,
+            "high_watermark": self.high,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / claims if claims else 0.0,
+            "created": self.created,
+            "failures": self.failures
+        }
 
 # Global state
-terminals: Dict[str, Dict] = {}
+terminals = TerminalRegistry(config.TOMBSTONE_TTL_SECONDS, config.MAX_TOMBSTONES)
 docker_client = None
+backend: Optional[TerminalBackend] = None
+docker_ops = DockerExecutor(
+    config.DOCKER_POOL_SIZES,
+    DockerGovernor(
+        config.DOCKER_MAX_CONCURRENT,
+        config.DOCKER_POOL_SIZES,
+        config.DOCKER_PRIORITIES,
+        config.DOCKER_QUEUE_TIMEOUTS
+    )
+)
+warm_pools: Dict[tuple, WarmPool] = {}
+shell_sessions: Dict[str, ShellSession] = {}
+log_hubs: Dict[str, LogHub] = {}
+teardown_tasks = set()
+expiry = ExpiryScheduler()
+idle_pauses = ExpiryScheduler()
+active_operations: Dict[str, int] = {}
+pending_creates: Dict[str, int] = {}
+destroy_failures: Dict[str, int] = {}
+pause_locks: Dict[str, asyncio.Lock] = {}
+node_id = str(uuid.uuid4())
+shared_state: Optional[SharedTerminalState] = None
+rate_limiter: Optional[RateLimiter] = None
+admission: Optional[AdmissionController] = None
+workspaces: Optional[WorkspaceManager] = None
+dependency_cache: Optional[DependencyCache] = None
 redis_client = None
 security = HTTPBearer()
+token_cache = TokenCache(config.JWT_CACHE_SIZE, config.JWT_CACHE_TTL_SECONDS)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
-    global docker_client, redis_client
+    global docker_client, backend, redis_client, shared_state, rate_limiter, admission, workspaces, dependency_cache
     
-    # Initialize Docker client
-    try:
-        docker_client = docker.from_env()
-        logger.info("Docker client initialized")
-    except Exception as e:
-        logger.error(f"Failed to initialize Docker client: {e}")
-        raise
+    if config.TERMINAL_BACKEND == "fake":
+        backend = FakeBackend(
+            config.FAKE_BACKEND_MODE, parse_latencies(config.FAKE_BACKEND_LATENCY_MS), config.FAKE_BACKEND_SEED
+        )
+        # Everything below that talks to Docker directly stays off
+        config.SHELL_SESSIONS_ENABLED = False
+        config.WARM_POOL_ENABLED = False
+        config.CONTAINER_EVENTS_ENABLED = False
+        config.IDLE_PAUSE_ENABLED = False
+        config.WORKSPACE_VOLUMES_ENABLED = False
+        config.DEPENDENCY_CACHE_ENABLED = False
+        logger.warning(f"Using the fake terminal backend ({config.FAKE_BACKEND_MODE}); terminals do not run in Docker")
+    elif config.TERMINAL_BACKEND == "docker":
+        # Initialize Docker client
+        try:
+            docker_client = docker.from_env()
+            backend = DockerBackend(docker_client, docker_ops)
+            logger.info("Docker client initialized")
+        except Exception as e:
+            logger.error(f"Failed to initialize Docker client: {e}")
+            raise
+    else:
+        raise ValueError(f"Unknown TERMINAL_BACKEND: {config.TERMINAL_BACKEND}")
     
     # Initialize Redis client
     try:
-        redis_client = redis.from_url(config.REDIS_URL)
+        redis_client = InstrumentedRedis.from_url(config.REDIS_URL)
         redis_client.ping()
         logger.info("Redis client initialized")
     except Exception as e:
@@ -96,17 +504,88 @@ async def lifespan(app: FastAPI):
     # Create log directory
     os.makedirs(config.LOG_BASE_DIR, exist_ok=True)
     
-    # Start cleanup task
-    cleanup_task = asyncio.create_task(cleanup_expired_terminals())
+    background_tasks = []
+    if config.IDLE_PAUSE_ENABLED and (config.SHARED_STATE_ENABLED or config.BRIDGE_WORKERS > 1):
+        # Activity only extends the idle deadline on the process that saw
+        # it, so another one could pause a terminal that is in use
+        config.IDLE_PAUSE_ENABLED = False
+        logger.warning("Idle pause is disabled with shared state or BRIDGE_WORKERS > 1")
+    if config.SHARED_STATE_ENABLED:
+        shared_state = SharedTerminalState(redis_client, node_id)
+        shared_state.heartbeat(config.NODE_HEARTBEAT_SECONDS * 3)
+        background_tasks.append(asyncio.create_task(node_heartbeat()))
+        background_tasks.append(asyncio.create_task(listen_for_invalidations()))
+        logger.info(f"Shared state mode enabled (node {node_id})")
+    
+    if config.RATE_LIMIT_ENABLED:
+        rate_limiter = RateLimiter(config.RATE_LIMITS, redis_client if config.RATE_LIMIT_REDIS else None)
+    
+    if config.METRICS_ENABLED:
+        background_tasks.append(asyncio.create_task(monitor_event_loop_lag()))
+    
+    if config.ADMISSION_ENABLED:
+        memory_capacity, cpu_capacity = detect_host_capacity()
+        if config.HOST_MEMORY_CAPACITY != "auto":
+            memory_capacity = parse_memory(config.HOST_MEMORY_CAPACITY)
+        if config.HOST_CPU_CAPACITY != "auto":
+            cpu_capacity = float(config.HOST_CPU_CAPACITY)
+        # Several processes share one host, so they must commit against shared totals
+        shared_admission = config.SHARED_STATE_ENABLED or config.BRIDGE_WORKERS > 1
+        admission = AdmissionController(
+            memory_capacity, cpu_capacity, config.ADMISSION_QUEUE_SIZE, redis_client if shared_admission else None
+        )
+        logger.info(f"Admission control: {memory_capacity / 1024 ** 3:.1f} GiB, {cpu_capacity:g} CPUs")
+    
+    if config.WORKSPACE_VOLUMES_ENABLED:
+        workspaces = WorkspaceManager(
+            docker_client.api,
+            redis_client,
+            functools.partial(docker_ops.run, "create"),
+            config.WORKSPACE_MOUNT_PATH,
+            parse_memory(config.WORKSPACE_QUOTA),
+            config.WORKSPACE_MAX_VOLUMES,
+            config.WORKSPACE_EVICT_AFTER_HOURS * 3600
+        )
+    
+    if config.DEPENDENCY_CACHE_ENABLED:
+        dependency_cache = DependencyCache(
+            docker_client,
+            functools.partial(docker_ops.run, "create"),
+            config.TERMINAL_IMAGE,
+            config.DEPENDENCY_CACHE_VOLUME,
+            config.DEPENDENCY_CACHE_PATH,
+            config.DEPENDENCY_CACHE_AUTOFILL
+        )
+        background_tasks.append(asyncio.create_task(dependency_cache.run()))
+    
+    # Re-adopt terminals that survived a restart, then start expiring them
+    if docker_client:
+        await recover_terminals()
+    background_tasks.append(asyncio.create_task(expiry.run(expire_terminal)))
+    if config.IDLE_PAUSE_ENABLED:
+        background_tasks.append(asyncio.create_task(idle_pauses.run(pause_idle_terminal)))
+    if config.CONTAINER_EVENTS_ENABLED:
+        background_tasks.append(asyncio.create_task(watch_container_events()))
+    
+    # Start warm pools
+    if config.WARM_POOL_ENABLED:
+        for profile in config.WARM_POOL_PROFILES:
+            pool = WarmPool(config.TERMINAL_IMAGE, profile, config.WARM_POOL_LOW_WATERMARK, config.WARM_POOL_HIGH_WATERMARK)
+            warm_pools[(config.TERMINAL_IMAGE, profile)] = pool
+            background_tasks.append(asyncio.create_task(pool.run()))
     
     yield
     
     # Cleanup
-    cleanup_task.cancel()
-    try:
-        await cleanup_task
-    except asyncio.CancelledError:
-        pass
+    for task in background_tasks:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    for pool in warm_pools.values():
+        await pool.drain()
+    docker_ops.shutdown()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -125,6 +604,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(DockerBusy)
+async def docker_busy_handler(request: Request, exc: DockerBusy):
+    """Shed load with 503 when a Docker call could not get a governor slot in time"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 # Authentication utilities
 def create_access_token(data: Dict[str, Any]) -> str:
     """Create a JWT access token"""
@@ -133,128 +617,653 @@ def create_access_token(data: Dict[str, Any]) -> str:
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, config.JWT_SECRET, algorithm=config.JWT_ALGORITHM)
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
-    """Verify JWT token"""
-    try:
-        payload = jwt.decode(credentials.credentials, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM])
+def decode_token(token: str) -> Dict[str, Any]:
+    """Return a token's verified payload, from the cache when it was verified recently"""
+    digest = TokenCache.digest(token)
+    payload = token_cache.get(digest)
+    if payload is not None:
         return payload
+    if token_cache.is_revoked(digest) or redis_client.exists(f"token:revoked:{digest}"):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    try:
+        payload = jwt.decode(token, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
+    except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    token_cache.put(digest, payload)
+    return payload
+
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
+    """Verify JWT token"""
+    return decode_token(credentials.credentials)
+
+def check_rate_limit(agent_id: str, route_class: str):
+    """Raise 429 with Retry-After if the agent is over its limit for this route class"""
+    if rate_limiter is None:
+        return
+    retry_after = rate_limiter.check(agent_id, route_class)
+    if retry_after:
+        RATE_LIMITED_REQUESTS.labels(route_class).inc()
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded for {route_class} requests",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+def rate_limited(route_class: str):
+    """Dependency that verifies the token, then charges the agent's bucket for route_class"""
+    async def dependency(token_data: Dict = Depends(verify_token)) -> Dict[str, Any]:
+        check_rate_limit(token_data.get("agent_id"), route_class)
+        return token_data
+    return dependency
+
+def revoke_token(token: str, payload: Dict[str, Any]):
+    """Refuse a token from now until its expiry, on every worker"""
+    digest = TokenCache.digest(token)
+    until = payload.get("exp", time.time() + config.JWT_EXPIRE_HOURS * 3600)
+    token_cache.revoke(digest, until)
+    ttl = int(until - time.time()) + 1
+    if ttl > 0:
+        redis_client.setex(f"token:revoked:{digest}", ttl, "1")
+    if shared_state:
+        shared_state.publish_revocation(digest, until)
 
 # Terminal management functions
-def create_agent_terminal(agent_id: str, command: str = "bash", environment: Dict[str, str] = None) -> Dict[str, Any]:
-    """Create a new agent terminal container"""
+def base_environment(agent_id: str, terminal_id: str) -> Dict[str, str]:
+    """Variables the bridge sets in every terminal; an agent's own are only in the container"""
+    env_vars = {
+        "AGENT_ID": agent_id,
+        "TERMINAL_ID": terminal_id,
+        "LOG_DIR": "/tmp/logs"
+    }
+    if dependency_cache:
+        env_vars.update(dependency_cache.environment())
+    return env_vars
+
+@contextmanager
+def pending_create(agent_id: str):
+    """Count a create in flight against the agent's limit until its record is registered"""
+    pending_creates[agent_id] = pending_creates.get(agent_id, 0) + 1
+    try:
+        yield
+    finally:
+        pending = pending_creates.pop(agent_id) - 1
+        if pending:
+            pending_creates[agent_id] = pending
+
+@timed_operation("create")
+async def create_agent_terminal(agent_id: str, command: str = "bash", environment: Dict[str, str] = None,
+                                profile: str = "default", timeout_hours: int = None,
+                                workspace: bool = False) -> TerminalRecord:
+    """Create a new agent terminal container, claiming a warm one when possible
+
+    With workspace, the agent's persistent workspace volume is mounted at
+    WORKSPACE_MOUNT_PATH; such terminals always start a new container.
+    """
     terminal_id = str(uuid.uuid4())
     
+    if profile not in config.RESOURCE_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown resource profile: {profile}")
+    if workspace and not workspaces:
+        raise HTTPException(status_code=400, detail="Workspace volumes are not enabled")
+    
+    timeout_hours = timeout_hours or config.TERMINAL_TIMEOUT_HOURS
+    if not 1 <= timeout_hours <= config.TERMINAL_MAX_TIMEOUT_HOURS:
+        raise HTTPException(status_code=400, detail=f"timeout_hours must be between 1 and {config.TERMINAL_MAX_TIMEOUT_HOURS}")
+    ttl_seconds = timeout_hours * 3600
+    
     # Check terminal limits
-    agent_terminals = [t for t in terminals.values() if t["agent_id"] == agent_id and t["status"] == "running"]
-    if len(agent_terminals) >= config.MAX_TERMINALS_PER_AGENT:
+    if shared_state:
+        if not shared_state.reserve(agent_id, terminal_id, config.MAX_TERMINALS_PER_AGENT):
+            raise HTTPException(status_code=429, detail=f"Maximum terminals ({config.MAX_TERMINALS_PER_AGENT}) reached for agent")
+    elif terminals.running_count(agent_id) + pending_creates.get(agent_id, 0) >= config.MAX_TERMINALS_PER_AGENT:
         raise HTTPException(status_code=429, detail=f"Maximum terminals ({config.MAX_TERMINALS_PER_AGENT}) reached for agent")
     
-    # Create log directory
+    with pending_create(agent_id):
+        return await start_agent_terminal(
+            terminal_id, agent_id, command, environment, profile, ttl_seconds, workspace
+        )
+
+async def start_agent_terminal(terminal_id: str, agent_id: str, command: str, environment: Optional[Dict[str, str]],
+                               profile: str, ttl_seconds: int, workspace: bool) -> TerminalRecord:
+    """Admit and start a terminal whose per-agent slot create_agent_terminal has reserved"""
+    # Wait for host capacity
+    if admission:
+        memory, cpus = profile_demand(config.RESOURCE_PROFILES[profile])
+        try:
+            await admission.admit(terminal_id, agent_id, memory, cpus, config.ADMISSION_TIMEOUT_SECONDS)
+        except AdmissionRejected as e:
+            if shared_state:
+                shared_state.release(agent_id, terminal_id)
+            if not e.retry_after:
+                raise HTTPException(status_code=400, detail=str(e))
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
     log_dir = os.path.join(config.LOG_BASE_DIR, agent_id, terminal_id)
-    os.makedirs(log_dir, exist_ok=True)
     
     # Prepare environment variables
-    env_vars = {
-        "AGENT_ID": agent_id,
-        "TERMINAL_ID": terminal_id,
-        "LOG_DIR": "/tmp/logs"
-    }
+    env_vars = base_environment(agent_id, terminal_id)
     if environment:
         env_vars.update(environment)
     
+    # Only plain shells without extra mounts or environment can be served
+    # from the warm pool: custom variables are not persisted, so they must
+    # be baked into the container
+    pool = None
+    if command == "bash" and not workspace and not environment:
+        pool = warm_pools.get((config.TERMINAL_IMAGE, profile))
+    pooled = pool.claim() if pool else None
+    volumes = {log_dir: {"bind": "/tmp/logs", "mode": "rw"}}
+    if dependency_cache:
+        volumes.update(dependency_cache.mounts())
+    workspace_volume = None
+    
     try:
-        # Create and start container
-        container = docker_client.containers.run(
-            config.TERMINAL_IMAGE,
-            command=f'bash -c "echo \\"=== Agent Terminal Started ===\\" && echo \\"Agent ID: {agent_id}\\" && echo \\"Terminal ID: {terminal_id}\\" && echo \\"Timestamp: $(date)\\" && echo \\"Working Directory: $(pwd)\\" && echo \\"User: $(whoami)\\" && echo && echo \\"Terminal ready for commands\\" && echo \\"$(date): Terminal {terminal_id} started\\" > /tmp/logs/session.log && {command}"',
+        if workspace:
+            try:
+                workspace_mount = await workspaces.acquire(agent_id)
+            except WorkspaceQuotaExceeded as e:
+                raise HTTPException(status_code=507, detail=str(e))
+            volumes.update(workspace_mount)
+            workspace_volume = next(iter(workspace_mount))
+        if pooled:
+            # Bind the pooled container to this terminal: the bind mount
+            # follows its host directory across the rename
+            container = pooled["container"]
+            os.makedirs(os.path.dirname(log_dir), exist_ok=True)
+            os.rename(pooled["pool_dir"], log_dir)
+            with open(os.path.join(log_dir, "session.log"), "w") as f:
+                f.write(f"{datetime.utcnow().isoformat()}: Terminal {terminal_id} started\n")
+            # Pooled containers are already up; mark ready as a cold start would
+            open(os.path.join(log_dir, ".ready"), "w").close()
+            await docker_ops.run("create", container.rename, f"mcp-terminal-{terminal_id}")
+            container_id = container.id
+        else:
+            # Create and start container
+            os.makedirs(log_dir, exist_ok=True)
+            container_id = await backend.create(
+                terminal_id,
+                config.TERMINAL_IMAGE,
+                f'bash -c "echo \\"=== Agent Terminal Started ===\\" && echo \\"Agent ID: {agent_id}\\" && echo \\"Terminal ID: {terminal_id}\\" && echo \\"Timestamp: $(date)\\" && echo \\"Working Directory: $(pwd)\\" && echo \\"User: $(whoami)\\" && echo && echo \\"Terminal ready for commands\\" && echo \\"$(date): Terminal {terminal_id} started\\" > /tmp/logs/session.log && touch /tmp/logs/.ready && {command}"',
+                env_vars,
+                volumes,
+                {"mcp-bridge.managed": "true"},
+                config.RESOURCE_PROFILES[profile]
+            )
+        
+        record = TerminalRecord(
+            terminal_id=terminal_id,
+            agent_id=agent_id,
+            container_id=container_id,
+            status="running",
+            created_at=datetime.utcnow().isoformat(),
+            log_dir=log_dir,
+            command=command,
+            profile=profile,
             environment=env_vars,
-            volumes={log_dir: {"bind": "/tmp/logs", "mode": "rw"}},
-            detach=True,
-            name=f"mcp-terminal-{terminal_id}",
-            network_mode="bridge",
-            mem_limit="512m",
-            cpu_quota=50000,  # 50% CPU
-            remove=False
+            pooled=pooled is not None,
+            ttl_seconds=ttl_seconds,
+            workspace=workspace_volume
         )
+        set_deadline(record, time.time() + ttl_seconds)
         
-        terminal_info = {
-            "terminal_id": terminal_id,
-            "agent_id": agent_id,
-            "container_id": container.id,
-            "status": "running",
-            "created_at": datetime.utcnow().isoformat(),
-            "log_dir": log_dir,
-            "command": command,
-            "expires_at": (datetime.utcnow() + timedelta(hours=config.TERMINAL_TIMEOUT_HOURS)).isoformat()
-        }
-        
-        terminals[terminal_id] = terminal_info
+        terminals.add(record)
+        expiry.schedule(terminal_id, record.deadline)
+        if config.IDLE_PAUSE_ENABLED:
+            idle_pauses.schedule(terminal_id, time.time() + config.IDLE_PAUSE_SECONDS)
         
         # Store in Redis for persistence
         redis_client.setex(
             f"terminal:{terminal_id}",
-            config.TERMINAL_TIMEOUT_HOURS * 3600,
-            json.dumps(terminal_info)
+            ttl_seconds,
+            json.dumps(record.to_dict())
         )
+        if shared_state:
+            shared_state.schedule_expiry(terminal_id, record.deadline)
+            shared_state.publish("update", terminal_id, record.deadline)
         
         logger.info(f"Created terminal {terminal_id} for agent {agent_id}")
-        return terminal_info
+        return record
         
     except Exception as e:
         logger.error(f"Failed to create terminal for agent {agent_id}: {e}")
+        if shared_state:
+            shared_state.release(agent_id, terminal_id)
+        if admission:
+            admission.release(terminal_id)
+        if pooled:
+            try:
+                await docker_ops.run("destroy", pooled["container"].remove, force=True)
+            except Exception:
+                pass
+        if isinstance(e, (HTTPException, DockerBusy)):
+            raise
         raise HTTPException(status_code=500, detail=f"Failed to create terminal: {str(e)}")
 
-def execute_command_in_terminal(terminal_id: str, command: str, timeout: int = 30) -> ExecuteResponse:
+async def wait_terminal_ready(terminal_id: str, timeout: int):
+    """Return once the terminal accepts commands
+
+    Waits for the container's ``.ready`` sentinel through one exec round
+    trip. With shell sessions enabled this also starts the terminal's
+    session, so its first command does not pay for that.
+    """
+    # Without shell sessions the command is exec'd directly, so wrap the loop in bash
+    probe = "bash -c 'until [ -e /tmp/logs/.ready ]; do sleep 0.01; done'"
+    exit_code = None
+    try:
+        async for stream, data in stream_command_output(terminal_id, probe, timeout):
+            if stream == EXIT:
+                exit_code = data
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Terminal {terminal_id} not ready after {timeout}s")
+    except DockerBusy as e:
+        raise HTTPException(status_code=503, detail=f"Terminal {terminal_id} readiness probe failed: {e}",
+                            headers={"Retry-After": "1"})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Terminal {terminal_id} readiness probe failed: {str(e)}")
+    if exit_code != 0:
+        raise HTTPException(
+            status_code=500, detail=f"Terminal {terminal_id} readiness probe failed with exit code {exit_code}"
+        )
+
+async def discard_unready_terminal(terminal_id: str):
+    """Destroy a terminal whose readiness probe failed, so it does not hold the agent's slot and host capacity
+
+    A failed teardown is retried by the expiry loop (see reschedule_failed_destroy).
+    """
+    try:
+        await destroy_terminal(terminal_id, force=True)
+    except Exception as e:
+        logger.error(f"Failed to destroy unready terminal {terminal_id}: {e}")
+
+def ensure_running(terminal: TerminalRecord):
+    """Raise 400 unless the terminal is running, saying how it exited if it did"""
+    if terminal.status in ("running", "paused"):
+        # touch_terminal resumes paused terminals
+        return
+    detail = "Terminal not running"
+    if terminal.status == "exited":
+        detail = f"Terminal exited with code {terminal.exit_code}"
+        if terminal.oom_killed:
+            detail += " (killed: out of memory)"
+    raise HTTPException(status_code=400, detail=detail)
+
+def set_deadline(terminal: TerminalRecord, deadline: float):
+    """Set a terminal's epoch deadline and its ISO expires_at"""
+    terminal.deadline = deadline
+    terminal.expires_at = datetime.utcfromtimestamp(deadline).isoformat()
+
+async def touch_terminal(terminal: TerminalRecord):
+    """Record agent activity
+
+    Resumes the terminal if it was paused for being idle, pushes back its
+    next idle pause and slides its expiry if enabled.
+    """
+    if terminal.status == "paused":
+        await resume_terminal(terminal)
+    if terminal.status != "running":
+        return
+    if config.IDLE_PAUSE_ENABLED:
+        idle_pauses.schedule(terminal.terminal_id, time.time() + config.IDLE_PAUSE_SECONDS)
+    if not config.TERMINAL_SLIDING_TTL:
+        return
+    set_deadline(terminal, time.time() + terminal.ttl_seconds)
+    expiry.extend(terminal.terminal_id, terminal.deadline)
+    redis_client.expire(f"terminal:{terminal.terminal_id}", terminal.ttl_seconds)
+    if shared_state:
+        shared_state.extend_expiry(terminal.terminal_id, terminal.deadline)
+
+@contextmanager
+def terminal_activity(terminal_id: str):
+    """Mark a command or file transfer in flight so idle pausing skips the terminal"""
+    active_operations[terminal_id] = active_operations.get(terminal_id, 0) + 1
+    try:
+        yield
+    finally:
+        in_flight = active_operations.pop(terminal_id) - 1
+        if in_flight:
+            active_operations[terminal_id] = in_flight
+
+def pause_lock(terminal_id: str) -> asyncio.Lock:
+    """Lock serializing a terminal's pause and resume"""
+    lock = pause_locks.get(terminal_id)
+    if lock is None:
+        lock = pause_locks[terminal_id] = asyncio.Lock()
+    return lock
+
+async def pause_idle_terminal(terminal_id: str):
+    """Freeze an idle terminal's processes until its next exec, logs or stream call
+
+    Terminals with commands or file transfers in flight or log stream
+    subscribers count as active and are checked again a full idle period
+    later.
+    """
+    terminal = terminals.get(terminal_id)
+    if terminal is None or terminal.status != "running":
+        return
+    hub = log_hubs.get(terminal_id)
+    if active_operations.get(terminal_id) or (hub and hub.stats()["subscribers"]):
+        idle_pauses.schedule(terminal_id, time.time() + config.IDLE_PAUSE_SECONDS)
+        return
+    async with pause_lock(terminal_id):
+        if terminal.status != "running":
+            return
+        # Paused first, so requests arriving meanwhile wait to resume it
+        terminals.set_status(terminal_id, "paused")
+        try:
+            await docker_ops.run("destroy", docker_client.api.pause, terminal.container_id)
+        except Exception:
+            terminals.set_status(terminal_id, "running")
+            raise
+    redis_client.set(f"terminal:{terminal_id}", json.dumps(terminal.to_dict()), keepttl=True)
+    logger.info(f"Paused idle terminal {terminal_id}")
+
+async def resume_terminal(terminal: TerminalRecord):
+    """Unpause a terminal paused for being idle"""
+    terminal_id = terminal.terminal_id
+    async with pause_lock(terminal_id):
+        if terminal.status != "paused":
+            return
+        try:
+            await docker_ops.run("exec", docker_client.api.unpause, terminal.container_id)
+        except docker.errors.APIError as e:
+            # 409: not paused any more, e.g. unpaused by hand
+            if e.status_code != 409:
+                raise HTTPException(status_code=500, detail=f"Failed to resume terminal: {str(e)}")
+        terminals.set_status(terminal_id, "running")
+    redis_client.set(f"terminal:{terminal_id}", json.dumps(terminal.to_dict()), keepttl=True)
+    logger.info(f"Resumed terminal {terminal_id}")
+
+def lookup_terminal(terminal_id: str) -> Optional[TerminalRecord]:
+    """Find a terminal, reading through to Redis in shared-state mode"""
+    terminal = terminals.get(terminal_id)
+    if terminal is None and shared_state:
+        data = shared_state.load(terminal_id)
+        if data:
+            terminal = TerminalRecord.from_dict(data)
+            terminal.environment = base_environment(terminal.agent_id, terminal_id)
+            terminals.add(terminal)
+            expiry.schedule(terminal_id, terminal.deadline)
+    return terminal
+
+def get_shell_session(terminal_id: str) -> ShellSession:
+    """Get the persistent shell session for a terminal, creating it if needed"""
+    session = shell_sessions.get(terminal_id)
+    if session is None:
+        terminal = terminals[terminal_id]
+        session = ShellSession(
+            docker_client.api,
+            terminal.container_id,
+            terminal.environment,
+            functools.partial(docker_ops.run, "exec")
+        )
+        shell_sessions[terminal_id] = session
+    return session
+
+def record_command(terminal_id: str, command: str, exit_code: int, execution_time: float):
+    """Log a command execution to the terminal's Redis history"""
+    log_entry = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "terminal_id": terminal_id,
+        "agent_id": terminals[terminal_id].agent_id,
+        "command": command,
+        "exit_code": exit_code,
+        "execution_time": execution_time
+    }
+    
+    redis_client.lpush(f"terminal:{terminal_id}:commands", json.dumps(log_entry))
+    redis_client.expire(f"terminal:{terminal_id}:commands", config.TERMINAL_TIMEOUT_HOURS * 3600)
+
+def spool_dir(terminal_id: str) -> str:
+    """Host directory for a terminal's spooled command output (not mounted into the container)"""
+    return os.path.join(config.LOG_BASE_DIR, ".spool", terminal_id)
+
+@timed_operation("exec")
+async def execute_command_in_terminal(terminal_id: str, command: str, timeout: int = 30,
+                                      session: Optional[bool] = None) -> ExecuteResponse:
     """Execute a command in an existing terminal"""
     if terminal_id not in terminals:
         raise HTTPException(status_code=404, detail="Terminal not found")
     
     terminal = terminals[terminal_id]
-    if terminal["status"] != "running":
-        raise HTTPException(status_code=400, detail="Terminal not running")
+    ensure_running(terminal)
+    
+    output = CommandOutput(
+        spool_dir(terminal_id),
+        config.OUTPUT_SPOOL_THRESHOLD_BYTES,
+        config.OUTPUT_EXCERPT_BYTES,
+        config.OUTPUT_SPOOL_MAX_OUTPUTS
+    )
+    spools = {STDOUT: output.streams["stdout"], STDERR: output.streams["stderr"]}
     
     try:
-        container = docker_client.containers.get(terminal["container_id"])
-        
         start_time = datetime.now()
-        result = container.exec_run(
-            command,
-            stdout=True,
-            stderr=True,
-            stream=False,
-            timeout=timeout
-        )
+        exit_code = None
+        try:
+            async for stream, data in stream_command_output(terminal_id, command, timeout, session):
+                if stream == EXIT:
+                    exit_code = data
+                else:
+                    spools[stream].write(data)
+        finally:
+            output.close()
+            for name, spool in output.streams.items():
+                EXEC_OUTPUT_BYTES.labels(name).observe(spool.size)
         execution_time = (datetime.now() - start_time).total_seconds()
         
-        # Log the command execution
-        log_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "terminal_id": terminal_id,
-            "agent_id": terminal["agent_id"],
-            "command": command,
-            "exit_code": result.exit_code,
-            "execution_time": execution_time
-        }
-        
-        redis_client.lpush(f"terminal:{terminal_id}:commands", json.dumps(log_entry))
-        redis_client.expire(f"terminal:{terminal_id}:commands", config.TERMINAL_TIMEOUT_HOURS * 3600)
+        record_command(terminal_id, command, exit_code, execution_time)
         
         return ExecuteResponse(
-            output=result.output.decode('utf-8') if result.output else "",
-            error="",
-            exit_code=result.exit_code,
-            execution_time=execution_time
+            output=spools[STDOUT].text(),
+            error=spools[STDERR].text(),
+            exit_code=exit_code if exit_code is not None else -1,
+            execution_time=execution_time,
+            output_bytes=spools[STDOUT].size,
+            error_bytes=spools[STDERR].size,
+            truncated=output.spilled,
+            output_id=output.output_id if output.spilled else None
         )
         
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Command timed out after {timeout}s")
+    except (HTTPException, DockerBusy):
+        raise
     except Exception as e:
         logger.error(f"Failed to execute command in terminal {terminal_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Command execution failed: {str(e)}")
 
-def get_terminal_logs(terminal_id: str, lines: int = 100) -> str:
+def read_output_page(terminal_id: str, output_id: str, stream: str, offset: int, limit: int,
+                     encoding: str) -> Optional[Dict[str, Any]]:
+    """Read one page of a spooled command output
+
+    Text pages never end inside a UTF-8 sequence; ``next_offset`` points at
+    the first byte not returned.
+    """
+    result = read_spooled(spool_dir(terminal_id), output_id, stream, offset, limit)
+    if result is None:
+        return None
+    data, total = result
+    eof = offset + len(data) >= total
+    if encoding == "base64":
+        text = base64.b64encode(data).decode("ascii")
+        consumed = len(data)
+    else:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        text = decoder.decode(data, final=eof)
+        consumed = len(data) - len(decoder.getstate()[0])
+    return {
+        "output_id": output_id,
+        "stream": stream,
+        "encoding": encoding,
+        "offset": offset,
+        "next_offset": offset + consumed,
+        "total_bytes": total,
+        "eof": eof,
+        "data": text
+    }
+
+async def execute_batch_in_terminal(terminal_id: str, commands: List[str], mode: str = "sequential",
+                                    stop_on_error: bool = True, timeout: int = 30,
+                                    session: Optional[bool] = None) -> BatchExecuteResponse:
+    """Execute several commands in a terminal and collect per-command results
+
+    Sequential batches run in order (in the shell session by default, so
+    state carries over). Parallel batches always use separate execs, at most
+    BATCH_MAX_PARALLEL at a time. With stop_on_error, commands that have not
+    started when one fails are skipped.
+    """
+    start_time = datetime.now()
+    use_session = session if mode == "sequential" else False
+    results: List[Optional[BatchCommandResult]] = [None] * len(commands)
+    stopped = False
+
+    async def run_one(index: int, command: str):
+        nonlocal stopped
+        if stopped:
+            results[index] = BatchCommandResult(index=index, command=command, status="skipped")
+            return
+        try:
+            response = await execute_command_in_terminal(terminal_id, command, timeout, use_session)
+            status = "ok" if response.exit_code == 0 else "failed"
+            results[index] = BatchCommandResult(index=index, command=command, status=status, **response.dict())
+        except HTTPException as e:
+            status = "timeout" if e.status_code == 504 else "error"
+            results[index] = BatchCommandResult(index=index, command=command, status=status, error=e.detail)
+        except Exception as e:
+            # e.g. DockerBusy: fail this command, not the results of the others
+            results[index] = BatchCommandResult(index=index, command=command, status="error", error=str(e))
+        if results[index].status != "ok" and stop_on_error:
+            stopped = True
+
+    if mode == "parallel":
+        semaphore = asyncio.Semaphore(config.BATCH_MAX_PARALLEL)
+
+        async def run_bounded(index: int, command: str):
+            async with semaphore:
+                await run_one(index, command)
+
+        await asyncio.gather(*(run_bounded(index, command) for index, command in enumerate(commands)))
+    else:
+        for index, command in enumerate(commands):
+            await run_one(index, command)
+
+    statuses = [result.status for result in results]
+    return BatchExecuteResponse(
+        results=results,
+        succeeded=statuses.count("ok"),
+        failed=len(statuses) - statuses.count("ok") - statuses.count("skipped"),
+        skipped=statuses.count("skipped"),
+        execution_time=(datetime.now() - start_time).total_seconds()
+    )
+
+async def stream_command_output(terminal_id: str, command: str, timeout: int = 30,
+                                session: Optional[bool] = None) -> AsyncIterator[Tuple[int, Any]]:
+    """Run a command, yielding (STDOUT|STDERR, bytes) chunks and finally (EXIT, exit_code)"""
+    with terminal_activity(terminal_id):
+        terminal = terminals[terminal_id]
+        use_session = config.SHELL_SESSIONS_ENABLED if session is None else session
+    
+        if use_session:
+            require_docker("Shell sessions")
+            if config.BRIDGE_WORKERS > 1:
+                raise HTTPException(status_code=400, detail="Shell sessions are not available with BRIDGE_WORKERS > 1")
+            async for item in get_shell_session(terminal_id).stream(command, timeout):
+                yield item
+            return
+    
+        async with aclosing(backend.exec(terminal.container_id, command, terminal.environment, timeout)) as output:
+            async for item in output:
+                yield item
+
+def require_docker(feature: str):
+    """Reject features that talk to Docker directly when another backend is in use"""
+    if docker_client is None:
+        raise HTTPException(status_code=501, detail=f"{feature} requires the docker terminal backend")
+
+async def upload_archive(terminal_id: str, path: str, body: AsyncIterator[bytes]):
+    """Extract a tar archive streamed from ``body`` into directory ``path`` in the terminal
+
+    The body is passed to the daemon chunk by chunk as it arrives.
+    """
+    require_docker("File transfer")
+    terminal = terminals[terminal_id]
+    data = iter_request_body(body, asyncio.get_running_loop(), config.FILE_UPLOAD_MAX_BYTES)
+    with terminal_activity(terminal_id):
+        try:
+            await docker_ops.run("stream", docker_client.api.put_archive, terminal.container_id, path, data)
+        except ArchiveTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except docker.errors.NotFound:
+            raise HTTPException(status_code=404, detail=f"Directory not found in terminal: {path}")
+        except docker.errors.APIError as e:
+            raise HTTPException(status_code=400, detail=f"Failed to extract archive: {e.explanation or e}")
+
+async def download_archive(terminal_id: str, path: str) -> Tuple[AsyncIterator[bytes], Dict[str, Any]]:
+    """Open ``path`` in the terminal as a tar stream, returning its chunks and the path's stat"""
+    require_docker("File transfer")
+    terminal = terminals[terminal_id]
+    try:
+        chunks, stat = await docker_ops.run("stream", docker_client.api.get_archive, terminal.container_id, path)
+    except docker.errors.NotFound:
+        raise HTTPException(status_code=404, detail=f"Path not found in terminal: {path}")
+    
+    async def body() -> AsyncIterator[bytes]:
+        with terminal_activity(terminal_id):
+            try:
+                while True:
+                    chunk = await docker_ops.run("stream", next, chunks, None)
+                    if chunk is None:
+                        break
+                    yield chunk
+            finally:
+                try:
+                    chunks.close()
+                except ValueError:
+                    # Still being read by a worker thread
+                    pass
+    return body(), stat
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def command_event_stream(terminal_id: str, command: str, timeout: int = 30,
+                               session: Optional[bool] = None) -> AsyncIterator[str]:
+    """Server-Sent Events for a command: stdout/stderr chunks, then exit or error"""
+    names = {STDOUT: "stdout", STDERR: "stderr"}
+    decoders = {stream: codecs.getincrementaldecoder("utf-8")(errors="replace") for stream in names}
+    sizes = {stream: 0 for stream in names}
+    start_time = datetime.now()
+    try:
+        async for stream, data in stream_command_output(terminal_id, command, timeout, session):
+            if stream == EXIT:
+                for pending_stream, decoder in decoders.items():
+                    text = decoder.decode(b"", final=True)
+                    if text:
+                        yield sse_event(names[pending_stream], {"data": text})
+                execution_time = (datetime.now() - start_time).total_seconds()
+                record_command(terminal_id, command, data, execution_time)
+                for size_stream, size in sizes.items():
+                    EXEC_OUTPUT_BYTES.labels(names[size_stream]).observe(size)
+                yield sse_event("exit", {"exit_code": data, "execution_time": execution_time})
+            else:
+                sizes[stream] += len(data)
+                text = decoders[stream].decode(data)
+                if text:
+                    yield sse_event(names[stream], {"data": text})
+    except asyncio.TimeoutError:
+        yield sse_event("error", {"error": f"Command timed out after {timeout}s"})
+    except HTTPException as e:
+        yield sse_event("error", {"error": e.detail})
+    except Exception as e:
+        logger.error(f"Failed to stream command in terminal {terminal_id}: {e}")
+        yield sse_event("error", {"error": f"Command execution failed: {str(e)}"})
+
+@timed_operation("logs")
+async def get_terminal_logs(terminal_id: str, lines: int = 100) -> str:
     """Get logs from a terminal"""
     if terminal_id not in terminals:
         raise HTTPException(status_code=404, detail="Terminal not found")
@@ -262,65 +1271,476 @@ def get_terminal_logs(terminal_id: str, lines: int = 100) -> str:
     terminal = terminals[terminal_id]
     
     try:
-        container = docker_client.containers.get(terminal["container_id"])
-        logs = container.logs(tail=lines, timestamps=True)
+        logs = await backend.logs(terminal.container_id, lines)
         return logs.decode('utf-8')
+    except DockerBusy:
+        raise
     except Exception as e:
         logger.error(f"Failed to get logs for terminal {terminal_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get logs: {str(e)}")
 
-def destroy_terminal(terminal_id: str) -> bool:
-    """Destroy a terminal and its container"""
+@timed_operation("logs")
+async def read_terminal_log(terminal_id: str, lines: int = 100, since: Optional[str] = None,
+                            file: str = "session.log") -> Dict[str, Any]:
+    """Read a terminal's log file from its host log directory
+
+    Without ``since`` the last ``lines`` lines are returned; with it, only
+    what was appended after that cursor. Either way the response carries
+    the cursor to pass next time. Works after the container is gone.
+    """
+    terminal = terminals[terminal_id]
+    if not file or "/" in file or file.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid log file name")
+    path = os.path.join(terminal.log_dir, file)
+    try:
+        cursor = LogCursor.decode(since) if since else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    loop = asyncio.get_running_loop()
+    try:
+        if cursor is None:
+            text, next_cursor = await loop.run_in_executor(None, tail_lines, path, lines, config.LOG_READ_MAX_BYTES)
+            reset, more = False, False
+        else:
+            text, next_cursor, reset, more = await loop.run_in_executor(
+                None, read_since, path, cursor, config.LOG_READ_MAX_BYTES
+            )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Log file not found")
+    except OSError as e:
+        logger.error(f"Failed to read log {path}: {e}")
+        raise HTTPException(status_code=400, detail="Log file not readable")
+    return {"logs": text, "cursor": next_cursor.encode(), "reset": reset, "more": more}
+
+def docker_log_source(container_id: str):
+    """Log source for a LogHub: follows the container's Docker log stream"""
+    async def source(after: Optional[str]) -> AsyncIterator[str]:
+        # Resuming after the last line seen: restart from its second and skip
+        # lines up to its (fixed-width RFC3339Nano) timestamp
+        after_ts = after.split(" ", 1)[0] if after else None
+        since = calendar.timegm(time.strptime(after_ts[:19], "%Y-%m-%dT%H:%M:%S")) if after_ts else None
+        log_stream = await docker_ops.run(
+            "logs", docker_client.api.logs, container_id, stream=True, follow=True, timestamps=True, since=since
+        )
+        try:
+            while True:
+                chunk = await docker_ops.run("stream", next, log_stream, None)
+                if chunk is None:
+                    break
+                line = chunk.decode('utf-8', errors='replace')
+                if after_ts and line.split(" ", 1)[0] <= after_ts:
+                    continue
+                yield line
+        finally:
+            # Unblocks the worker thread still waiting on the stream
+            log_stream.close()
+    return source
+
+def get_log_hub(terminal_id: str) -> LogHub:
+    """Get the shared log hub for a terminal, creating it if needed"""
+    hub = log_hubs.get(terminal_id)
+    if hub is None:
+        hub = LogHub(
+            docker_log_source(terminals[terminal_id].container_id),
+            buffer_lines=config.LOG_HUB_BUFFER_LINES,
+            queue_size=config.LOG_HUB_QUEUE_SIZE,
+            slow_consumer_policy=config.LOG_HUB_SLOW_CONSUMER_POLICY,
+            linger=config.LOG_HUB_LINGER_SECONDS
+        )
+        log_hubs[terminal_id] = hub
+    return hub
+
+async def release_local_resources(terminal_id: str):
+    """Drop this worker's expiry entry, shell session and log hub for a terminal"""
+    expiry.cancel(terminal_id)
+    idle_pauses.cancel(terminal_id)
+    pause_locks.pop(terminal_id, None)
+    session = shell_sessions.pop(terminal_id, None)
+    if session:
+        await session.close()
+    hub = log_hubs.pop(terminal_id, None)
+    if hub:
+        await hub.close()
+
+def reschedule_failed_destroy(terminal: TerminalRecord, previous_status: str):
+    """Restore the timers of a terminal whose teardown failed
+
+    Teardown cancels them first, and the expiry that triggered it has
+    already been consumed, so without this the terminal would never expire.
+    It is retried at its deadline, or with backoff if that has passed.
+    """
+    terminal_id = terminal.terminal_id
+    failures = destroy_failures[terminal_id] = destroy_failures.get(terminal_id, 0) + 1
+    retry_at = time.time() + min(config.DESTROY_RETRY_SECONDS * 2 ** (failures - 1), 300)
+    deadline = max(terminal.deadline or 0, retry_at)
+    expiry.schedule(terminal_id, deadline)
+    if shared_state:
+        shared_state.schedule_expiry(terminal_id, deadline)
+    if config.IDLE_PAUSE_ENABLED and previous_status == "running":
+        idle_pauses.schedule(terminal_id, time.time() + config.IDLE_PAUSE_SECONDS)
+
+@timed_operation("destroy")
+async def destroy_terminal(terminal_id: str, force: bool = False) -> bool:
+    """Destroy a terminal and its container
+
+    With force the container is killed and removed in one call instead of
+    being given TERMINAL_STOP_TIMEOUT seconds to exit.
+    """
     if terminal_id not in terminals:
         raise HTTPException(status_code=404, detail="Terminal not found")
     
     terminal = terminals[terminal_id]
+    if terminal.status in ("stopping", "destroyed"):
+        # Already being (or been) torn down by another request or the expiry loop
+        return True
+    previous_status = terminal.status
+    terminals.set_status(terminal_id, "stopping")
     
     try:
+        await release_local_resources(terminal_id)
+        
+        if terminal.workspace and workspaces and previous_status == "running":
+            # Measure while the container still mounts the volume
+            try:
+                await workspaces.measure(terminal.workspace, terminal.container_id)
+            except Exception as e:
+                logger.warning(f"Failed to measure workspace of terminal {terminal_id}: {e}")
+        
         # Stop and remove container
-        container = docker_client.containers.get(terminal["container_id"])
-        container.stop(timeout=10)
-        container.remove()
+        # A paused container cannot act on SIGTERM, so stopping it would
+        # only wait out the timeout
+        stop = not force and previous_status != "paused"
+        if not await backend.destroy(terminal.container_id, not stop, config.TERMINAL_STOP_TIMEOUT):
+            logger.warning(f"Container for terminal {terminal_id} was already gone")
         
         # Update status
-        terminals[terminal_id]["status"] = "destroyed"
+        terminals.set_status(terminal_id, "destroyed")
+        if admission:
+            admission.release(terminal_id)
+        await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(shutil.rmtree, spool_dir(terminal_id), ignore_errors=True)
+        )
+        if dependency_cache:
+            # Best effort: the log is container-written and must not hold up teardown
+            try:
+                await asyncio.wait_for(
+                    asyncio.get_running_loop().run_in_executor(
+                        None,
+                        dependency_cache.record_installs,
+                        os.path.join(terminal.log_dir, "pip.log"),
+                        config.LOG_READ_MAX_BYTES
+                    ),
+                    timeout=5
+                )
+            except Exception as e:
+                logger.warning(f"Failed to read pip log of terminal {terminal_id}: {e!r}")
         
         # Remove from Redis
         redis_client.delete(f"terminal:{terminal_id}")
         redis_client.delete(f"terminal:{terminal_id}:commands")
+        if shared_state:
+            shared_state.release(terminal.agent_id, terminal_id)
+            shared_state.cancel_expiry(terminal_id)
+            shared_state.publish("delete", terminal_id)
         
+        destroy_failures.pop(terminal_id, None)
         logger.info(f"Destroyed terminal {terminal_id}")
         return True
         
     except Exception as e:
+        terminals.set_status(terminal_id, previous_status)
         logger.error(f"Failed to destroy terminal {terminal_id}: {e}")
+        reschedule_failed_destroy(terminal, previous_status)
+        if isinstance(e, DockerBusy):
+            raise
         raise HTTPException(status_code=500, detail=f"Failed to destroy terminal: {str(e)}")
 
-async def cleanup_expired_terminals():
-    """Background task to cleanup expired terminals"""
+async def destroy_terminals(terminal_ids: List[str], force: bool = False) -> AsyncIterator[Dict[str, Any]]:
+    """Destroy terminals concurrently, yielding a progress entry as each finishes
+
+    At most DOCKER_DESTROY_WORKERS teardowns run at once.
+    """
+    slots = asyncio.Semaphore(config.DOCKER_POOL_SIZES["destroy"])
+    
+    async def destroy_one(terminal_id: str) -> Dict[str, Any]:
+        async with slots:
+            try:
+                if lookup_terminal(terminal_id) is None:
+                    raise HTTPException(status_code=404, detail="Terminal not found")
+                await destroy_terminal(terminal_id, force)
+                return {"terminal_id": terminal_id, "success": True}
+            except HTTPException as e:
+                return {"terminal_id": terminal_id, "success": False, "error": e.detail}
+            except DockerBusy as e:
+                return {"terminal_id": terminal_id, "success": False, "error": str(e)}
+    
+    # Teardowns keep going if the caller stops listening for progress
+    tasks = [asyncio.create_task(destroy_one(terminal_id)) for terminal_id in terminal_ids]
+    for task in tasks:
+        teardown_tasks.add(task)
+        task.add_done_callback(teardown_tasks.discard)
+    for completed, task in enumerate(asyncio.as_completed(tasks), 1):
+        result = await task
+        yield {**result, "completed": completed, "total": len(tasks)}
+
+async def expire_terminal(terminal_id: str):
+    """Destroy a terminal whose deadline has passed"""
+    if shared_state:
+        # Exactly one worker claims each expiry; others may have extended it
+        claim = shared_state.claim_expiry(terminal_id, time.time())
+        if claim > 0:
+            expiry.schedule(terminal_id, claim)
+        if claim != 0:
+            return
+    terminal = lookup_terminal(terminal_id)
+    if terminal is None or terminal.status in ("stopping", "destroyed"):
+        return
+    await destroy_terminal(terminal_id, force=config.EXPIRED_TERMINAL_POLICY == "kill")
+    logger.info(f"Cleaned up expired terminal {terminal_id}")
+
+async def handle_container_event(event: Dict[str, Any]):
+    """Apply a Docker container event to the terminal that owns the container"""
+    terminal = terminals.by_container(event.get("id", ""))
+    if terminal is None or terminal.status in ("stopping", "destroyed"):
+        # Not ours, or our own teardown
+        return
+    terminal_id = terminal.terminal_id
+    action = event.get("Action") or event.get("status")
+    if action == "oom":
+        terminal.oom_killed = True
+    elif action == "die":
+        terminal.exit_code = int(event.get("Actor", {}).get("Attributes", {}).get("exitCode", -1))
+        terminals.set_status(terminal_id, "exited")
+        if admission:
+            admission.release(terminal_id)
+        session = shell_sessions.pop(terminal_id, None)
+        if session:
+            await session.close()
+        logger.warning(
+            f"Terminal {terminal_id} exited with code {terminal.exit_code}"
+            + (" (OOM killed)" if terminal.oom_killed else "")
+        )
+    elif action == "start" and terminal.status == "exited":
+        terminal.exit_code = None
+        terminal.oom_killed = False
+        terminals.set_status(terminal_id, "running")
+        if admission:
+            profile = config.RESOURCE_PROFILES.get(terminal.profile, config.RESOURCE_PROFILES["default"])
+            admission.reserve(terminal_id, *profile_demand(profile))
+    elif action == "pause" and terminal.status == "running" and not pause_lock(terminal_id).locked():
+        # Paused behind the bridge's back; the next call resumes it
+        terminals.set_status(terminal_id, "paused")
+    elif action == "unpause" and terminal.status == "paused" and not pause_lock(terminal_id).locked():
+        terminals.set_status(terminal_id, "running")
+    elif action == "destroy" and terminal.status in ("running", "paused"):
+        # Removed behind the bridge's back without a die event we saw
+        terminals.set_status(terminal_id, "exited")
+        if admission:
+            admission.release(terminal_id)
+    else:
+        return
+    redis_client.set(f"terminal:{terminal_id}", json.dumps(terminal.to_dict()), keepttl=True)
+
+async def watch_container_events():
+    """Keep terminal status in sync with the Docker event stream for bridge containers
+
+    Reconnects after errors, resuming from the last event seen.
+    """
+    since = None
     while True:
+        events = None
         try:
-            current_time = datetime.utcnow()
-            expired_terminals = []
-            
-            for terminal_id, terminal in terminals.items():
-                if terminal["status"] == "running":
-                    expires_at = datetime.fromisoformat(terminal["expires_at"])
-                    if current_time > expires_at:
-                        expired_terminals.append(terminal_id)
-            
-            for terminal_id in expired_terminals:
+            events = await docker_ops.run(
+                "stream",
+                docker_client.api.events,
+                since=since,
+                decode=True,
+                filters={
+                    "type": "container",
+                    "label": "mcp-bridge.managed=true",
+                    "event": ["start", "die", "oom", "destroy", "pause", "unpause"]
+                }
+            )
+            while True:
+                event = await docker_ops.run("stream", next, events, None)
+                if event is None:
+                    break
+                since = event.get("time", since)
                 try:
-                    destroy_terminal(terminal_id)
-                    logger.info(f"Cleaned up expired terminal {terminal_id}")
+                    await handle_container_event(event)
                 except Exception as e:
-                    logger.error(f"Failed to cleanup terminal {terminal_id}: {e}")
-            
-            await asyncio.sleep(300)  # Check every 5 minutes
-            
+                    logger.error(f"Failed to apply container event {event.get('Action')}: {e}")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.error(f"Error in cleanup task: {e}")
-            await asyncio.sleep(60)
+            logger.error(f"Docker event stream disconnected: {e}")
+            await asyncio.sleep(1)
+        finally:
+            if events is not None:
+                # Unblocks the worker thread still waiting on the stream
+                events.close()
+
+async def node_heartbeat():
+    """Keep this worker's liveness key fresh so its pool containers are not reaped"""
+    while True:
+        await asyncio.sleep(config.NODE_HEARTBEAT_SECONDS)
+        try:
+            shared_state.heartbeat(config.NODE_HEARTBEAT_SECONDS * 3)
+        except Exception as e:
+            logger.error(f"Failed to refresh node heartbeat: {e}")
+
+async def handle_invalidation(message: Dict[str, Any]):
+    """Apply another worker's terminal change to the local cache"""
+    if message["origin"] == node_id:
+        return
+    if message["op"] == "revoke_token":
+        token_cache.revoke(message["digest"], message["until"])
+        return
+    terminal_id = message["terminal_id"]
+    terminals.remove(terminal_id)
+    if message["op"] == "delete":
+        await release_local_resources(terminal_id)
+    elif message.get("deadline"):
+        expiry.schedule(terminal_id, message["deadline"])
+
+async def listen_for_invalidations():
+    """Subscribe to terminal changes published by other workers"""
+    while True:
+        client = aioredis.from_url(config.REDIS_URL)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                try:
+                    await handle_invalidation(json.loads(message["data"]))
+                except Exception as e:
+                    logger.error(f"Failed to apply terminal invalidation: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Invalidation listener disconnected: {e}")
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.close()
+            await client.close()
+
+def load_terminal_state() -> Dict[str, Dict[str, Any]]:
+    """Bulk-load persisted terminal records from Redis via SCAN and pipelined MGET"""
+    keys = [
+        key for key in redis_client.scan_iter(match="terminal:*", count=1000)
+        if key.count(b":") == 1
+    ]
+    pipe = redis_client.pipeline(transaction=False)
+    for i in range(0, len(keys), 500):
+        pipe.mget(keys[i:i + 500])
+    state = {}
+    for values in pipe.execute():
+        for value in values:
+            if value:
+                data = json.loads(value)
+                state[data["terminal_id"]] = data
+    return state
+
+async def recover_terminals():
+    """Reconcile persisted terminal state with the bridge's containers after a restart
+
+    Running containers with a Redis record are re-adopted. Containers without
+    one, stopped containers and warm-pool containers of dead workers (or,
+    without shared state, ones older than ORPHAN_GRACE_SECONDS) are removed,
+    as are Redis records whose container is gone; admission capacity
+    committed to terminals that were not re-adopted is released. In
+    shared-state mode this also primes the local cache with other workers'
+    terminals.
+    """
+    start_time = time.perf_counter()
+    state = load_terminal_state()
+    # sparse avoids an inspect call per container
+    containers = await docker_ops.run(
+        "create", docker_client.containers.list, all=True, sparse=True, filters={"label": "mcp-bridge.managed"}
+    )
+    
+    reap = []
+    reaped_terminal_ids = []
+    adopted = set()
+    for container in containers:
+        name = container.attrs["Names"][0].lstrip("/")
+        if name.startswith("mcp-terminal-pool-"):
+            owner = (container.attrs.get("Labels") or {}).get("mcp-bridge.node")
+            if shared_state and owner:
+                orphaned = not shared_state.node_alive(owner)
+            else:
+                # No heartbeats to go on: another worker may have just created it
+                orphaned = container.attrs.get("Created", 0) < time.time() - config.ORPHAN_GRACE_SECONDS
+            if orphaned:
+                reap.append(container)
+            continue
+        terminal_id = name[len("mcp-terminal-"):]
+        data = state.pop(terminal_id, None)
+        if data is None or container.attrs["State"] not in ("running", "paused"):
+            if data:
+                state[terminal_id] = data
+            if container.attrs.get("Created", 0) < time.time() - config.ORPHAN_GRACE_SECONDS:
+                reap.append(container)
+                reaped_terminal_ids.append(terminal_id)
+            continue
+        record = TerminalRecord.from_dict(data)
+        record.environment = base_environment(record.agent_id, terminal_id)
+        record.status = container.attrs["State"]
+        record.container_id = container.id
+        if record.ttl_seconds is None:
+            record.ttl_seconds = config.TERMINAL_TIMEOUT_HOURS * 3600
+        if record.deadline is None:
+            record.deadline = calendar.timegm(datetime.fromisoformat(record.expires_at).timetuple())
+        terminals.add(record)
+        expiry.schedule(terminal_id, record.deadline)
+        if config.IDLE_PAUSE_ENABLED and record.status == "running":
+            idle_pauses.schedule(terminal_id, time.time() + config.IDLE_PAUSE_SECONDS)
+        if admission:
+            profile = config.RESOURCE_PROFILES.get(record.profile, config.RESOURCE_PROFILES["default"])
+            admission.reserve(terminal_id, *profile_demand(profile))
+        if shared_state:
+            shared_state.schedule_expiry(terminal_id, record.deadline, only_new=True)
+            redis_client.sadd(f"agent:{record.agent_id}:terminals", terminal_id)
+        adopted.add(terminal_id)
+    
+    # Anything left in state has no live container
+    if state:
+        pipe = redis_client.pipeline(transaction=False)
+        for terminal_id, data in state.items():
+            pipe.delete(f"terminal:{terminal_id}", f"terminal:{terminal_id}:commands")
+            if shared_state:
+                pipe.srem(f"agent:{data['agent_id']}:terminals", terminal_id)
+                pipe.zrem("terminals:expiry", terminal_id)
+        pipe.execute()
+    
+    if shared_state:
+        # Reaped containers without a record, and terminals whose record
+        # expired while their container went away, would otherwise hold
+        # their agent's slot and inflate the shared running count for good
+        shared_state.forget(set(reaped_terminal_ids) | set(shared_state.orphaned_expiries(adopted)))
+    
+    if admission:
+        # Terminals that were never torn down still hold capacity, in Redis
+        # for good: release what was reaped or dropped, then anything else
+        # committed but not adopted (expired while down, crashed creates)
+        for terminal_id in reaped_terminal_ids + list(state):
+            admission.release(terminal_id)
+        admission.reconcile(adopted, config.ORPHAN_GRACE_SECONDS)
+    
+    async def remove(container):
+        try:
+            await docker_ops.run("destroy", docker_client.api.remove_container, container.id, force=True)
+        except Exception as e:
+            logger.error(f"Failed to remove orphaned container {container.id}: {e}")
+    await asyncio.gather(*(remove(container) for container in reap))
+    
+    logger.info(
+        f"Recovered {len(adopted)} terminals, reaped {len(reap)} containers and dropped "
+        f"{len(state)} stale records in {time.perf_counter() - start_time:.2f}s"
+    )
 
 # API Routes
 @app.post("/auth/token")
@@ -330,80 +1750,305 @@ async def create_token(agent_id: str):
     token = create_access_token(token_data)
     return {"access_token": token, "token_type": "bearer", "expires_in": config.JWT_EXPIRE_HOURS * 3600}
 
+@app.post("/auth/revoke")
+async def revoke_current_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Revoke the token used to make this request"""
+    payload = decode_token(credentials.credentials)
+    revoke_token(credentials.credentials, payload)
+    return {"success": True, "message": "Token revoked"}
+
 @app.post("/terminals", response_model=TerminalResponse)
-async def create_terminal(request: TerminalCreateRequest, token_data: Dict = Depends(verify_token)):
+async def create_terminal(request: TerminalCreateRequest, token_data: Dict = Depends(rate_limited("create"))):
     """Create a new agent terminal"""
     # Verify agent_id matches token
     if request.agent_id != token_data.get("agent_id"):
         raise HTTPException(status_code=403, detail="Agent ID mismatch")
     
-    terminal_info = create_agent_terminal(
+    record = await create_agent_terminal(
         request.agent_id,
         request.command or "bash",
-        request.environment or {}
+        request.environment or {},
+        request.profile or "default",
+        request.timeout_hours,
+        bool(request.workspace)
     )
+    if request.wait_ready:
+        try:
+            await wait_terminal_ready(record.terminal_id, config.TERMINAL_READY_TIMEOUT)
+        except HTTPException:
+            await discard_unready_terminal(record.terminal_id)
+            raise
     
     return TerminalResponse(
-        terminal_id=terminal_info["terminal_id"],
-        agent_id=terminal_info["agent_id"],
-        status=terminal_info["status"],
-        created_at=terminal_info["created_at"],
-        container_id=terminal_info["container_id"],
-        log_path=terminal_info["log_dir"]
+        terminal_id=record.terminal_id,
+        agent_id=record.agent_id,
+        status=record.status,
+        created_at=record.created_at,
+        container_id=record.container_id,
+        log_path=record.log_dir,
+        ready=bool(request.wait_ready),
+        workspace_path=config.WORKSPACE_MOUNT_PATH if record.workspace else None
     )
 
 @app.post("/terminals/{terminal_id}/execute", response_model=ExecuteResponse)
-async def execute_command(terminal_id: str, request: TerminalExecuteRequest, token_data: Dict = Depends(verify_token)):
+async def execute_command(terminal_id: str, request: TerminalExecuteRequest, token_data: Dict = Depends(rate_limited("exec"))):
     """Execute a command in a terminal"""
     # Verify the agent owns this terminal
-    if terminal_id not in terminals:
+    terminal = lookup_terminal(terminal_id)
+    if terminal is None:
         raise HTTPException(status_code=404, detail="Terminal not found")
+    if terminal.agent_id != token_data.get("agent_id"):
+        raise HTTPException(status_code=403, detail="Access denied")
     
-    terminal = terminals[terminal_id]
-    if terminal["agent_id"] != token_data.get("agent_id"):
+    await touch_terminal(terminal)
+    return await execute_command_in_terminal(terminal_id, request.command, request.timeout or 30, request.session)
+
+@app.post("/terminals/{terminal_id}/execute-batch", response_model=BatchExecuteResponse)
+async def execute_command_batch(terminal_id: str, request: TerminalBatchExecuteRequest,
+                                token_data: Dict = Depends(rate_limited("exec"))):
+    """Execute a list of commands in a terminal in one request"""
+    # Verify the agent owns this terminal
+    terminal = lookup_terminal(terminal_id)
+    if terminal is None:
+        raise HTTPException(status_code=404, detail="Terminal not found")
+    if terminal.agent_id != token_data.get("agent_id"):
+        raise HTTPException(status_code=403, detail="Access denied")
+    ensure_running(terminal)
+    if request.mode not in ("sequential", "parallel"):
+        raise HTTPException(status_code=400, detail="mode must be 'sequential' or 'parallel'")
+    if not request.commands or len(request.commands) > config.BATCH_MAX_COMMANDS:
+        raise HTTPException(status_code=400, detail=f"Batch must contain 1-{config.BATCH_MAX_COMMANDS} commands")
+    
+    await touch_terminal(terminal)
+    return await execute_batch_in_terminal(
+        terminal_id,
+        request.commands,
+        request.mode,
+        request.stop_on_error,
+        request.timeout or 30,
+        request.session
+    )
+
+@app.post("/terminals/{terminal_id}/execute/stream")
+async def execute_command_stream(terminal_id: str, request: TerminalExecuteRequest, token_data: Dict = Depends(rate_limited("exec"))):
+    """Execute a command, streaming output as Server-Sent Events"""
+    # Verify the agent owns this terminal
+    terminal = lookup_terminal(terminal_id)
+    if terminal is None:
+        raise HTTPException(status_code=404, detail="Terminal not found")
+    if terminal.agent_id != token_data.get("agent_id"):
         raise HTTPException(status_code=403, detail="Access denied")
+    ensure_running(terminal)
     
-    return execute_command_in_terminal(terminal_id, request.command, request.timeout or 30)
+    await touch_terminal(terminal)
+    return StreamingResponse(
+        command_event_stream(terminal_id, request.command, request.timeout or 30, request.session),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/terminals/{terminal_id}/logs")
-async def get_logs(terminal_id: str, lines: int = 100, token_data: Dict = Depends(verify_token)):
-    """Get terminal logs"""
+async def get_logs(terminal_id: str, lines: int = 100, since: Optional[str] = None, file: str = "session.log",
+                   source: str = "file", token_data: Dict = Depends(rate_limited("logs"))):
+    """Get terminal logs
+
+    ``source=file`` (default) reads the terminal's log directory on the host
+    and supports incremental reads with ``since``; ``source=docker`` returns
+    the container's stdout from the Docker API.
+    """
     # Verify the agent owns this terminal
-    if terminal_id not in terminals:
+    terminal = lookup_terminal(terminal_id)
+    if terminal is None:
         raise HTTPException(status_code=404, detail="Terminal not found")
-    
-    terminal = terminals[terminal_id]
-    if terminal["agent_id"] != token_data.get("agent_id"):
+    if terminal.agent_id != token_data.get("agent_id"):
         raise HTTPException(status_code=403, detail="Access denied")
     
-    logs = get_terminal_logs(terminal_id, lines)
+    await touch_terminal(terminal)
+    if source == "file":
+        return await read_terminal_log(terminal_id, lines, since, file)
+    if source != "docker":
+        raise HTTPException(status_code=400, detail="source must be 'file' or 'docker'")
+    logs = await get_terminal_logs(terminal_id, lines)
     return {"logs": logs}
 
+@app.get("/terminals/{terminal_id}/output/{output_id}")
+async def get_output_page(terminal_id: str, output_id: str, stream: str = "stdout", offset: int = 0,
+                          limit: int = 65536, encoding: str = "text", token_data: Dict = Depends(rate_limited("logs"))):
+    """Read a page of a command's spooled output"""
+    # Verify the agent owns this terminal
+    terminal = lookup_terminal(terminal_id)
+    if terminal is None:
+        raise HTTPException(status_code=404, detail="Terminal not found")
+    if terminal.agent_id != token_data.get("agent_id"):
+        raise HTTPException(status_code=403, detail="Access denied")
+    if encoding not in ("text", "base64"):
+        raise HTTPException(status_code=400, detail="encoding must be 'text' or 'base64'")
+    if offset < 0 or not 0 < limit <= config.OUTPUT_PAGE_MAX_BYTES:
+        raise HTTPException(status_code=400, detail=f"offset must be >= 0 and limit 1-{config.OUTPUT_PAGE_MAX_BYTES}")
+    
+    page = await asyncio.get_running_loop().run_in_executor(
+        None, read_output_page, terminal_id, output_id, stream, offset, limit, encoding
+    )
+    if page is None:
+        raise HTTPException(status_code=404, detail="Output not found")
+    return page
+
+@app.put("/terminals/{terminal_id}/files")
+async def upload_files(terminal_id: str, path: str, request: Request, token_data: Dict = Depends(rate_limited("exec"))):
+    """Extract a tar archive (optionally gzip, bzip2 or xz compressed) sent as the body into a directory"""
+    # Verify the agent owns this terminal
+    terminal = lookup_terminal(terminal_id)
+    if terminal is None:
+        raise HTTPException(status_code=404, detail="Terminal not found")
+    if terminal.agent_id != token_data.get("agent_id"):
+        raise HTTPException(status_code=403, detail="Access denied")
+    ensure_running(terminal)
+    if not path.startswith("/"):
+        raise HTTPException(status_code=400, detail="path must be absolute")
+    
+    await touch_terminal(terminal)
+    await upload_archive(terminal_id, path, request.stream())
+    return {"terminal_id": terminal_id, "path": path, "uploaded": True}
+
+@app.get("/terminals/{terminal_id}/files")
+async def download_files(terminal_id: str, path: str, token_data: Dict = Depends(rate_limited("exec"))):
+    """Stream a file or directory from the terminal as a tar archive"""
+    # Verify the agent owns this terminal
+    terminal = lookup_terminal(terminal_id)
+    if terminal is None:
+        raise HTTPException(status_code=404, detail="Terminal not found")
+    if terminal.agent_id != token_data.get("agent_id"):
+        raise HTTPException(status_code=403, detail="Access denied")
+    ensure_running(terminal)
+    if not path.startswith("/"):
+        raise HTTPException(status_code=400, detail="path must be absolute")
+    
+    await touch_terminal(terminal)
+    body, stat = await download_archive(terminal_id, path)
+    name = os.path.basename(path.rstrip("/")) or "root"
+    return StreamingResponse(
+        body,
+        media_type="application/x-tar",
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.tar"',
+            "X-Path-Stat": encode_path_stat(stat)
+        }
+    )
+
 @app.delete("/terminals/{terminal_id}")
-async def delete_terminal(terminal_id: str, token_data: Dict = Depends(verify_token)):
+async def delete_terminal(terminal_id: str, token_data: Dict = Depends(rate_limited("default"))):
     """Destroy a terminal"""
     # Verify the agent owns this terminal
-    if terminal_id not in terminals:
+    terminal = lookup_terminal(terminal_id)
+    if terminal is None:
         raise HTTPException(status_code=404, detail="Terminal not found")
-    
-    terminal = terminals[terminal_id]
-    if terminal["agent_id"] != token_data.get("agent_id"):
+    if terminal.agent_id != token_data.get("agent_id"):
         raise HTTPException(status_code=403, detail="Access denied")
     
-    success = destroy_terminal(terminal_id)
+    success = await destroy_terminal(terminal_id)
     return {"success": success}
 
+@app.delete("/terminals")
+async def delete_terminals(agent_id: str, force: bool = False, stream: bool = False,
+                           token_data: Dict = Depends(rate_limited("default"))):
+    """Destroy all of an agent's terminals
+
+    Returns a summary with destroyed and failed counts, or with stream=true
+    Server-Sent Events: one ``progress`` event per terminal, then ``done``.
+    """
+    if agent_id != token_data.get("agent_id"):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if shared_state:
+        terminal_ids = [record["terminal_id"] for record in shared_state.list_agent(agent_id)]
+    else:
+        terminal_ids = [t.terminal_id for t in terminals.by_agent(agent_id) if t.status != "destroyed"]
+    
+    async def run() -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        failures = []
+        async for progress in destroy_terminals(terminal_ids, force):
+            if not progress["success"]:
+                failures.append({"terminal_id": progress["terminal_id"], "error": progress["error"]})
+            yield "progress", progress
+        logger.info(f"Bulk destroy for agent {agent_id}: {len(terminal_ids) - len(failures)} destroyed, {len(failures)} failed")
+        yield "done", {
+            "requested": len(terminal_ids),
+            "destroyed": len(terminal_ids) - len(failures),
+            "failed": len(failures),
+            "failures": failures
+        }
+    
+    if stream:
+        async def events() -> AsyncIterator[str]:
+            async for event, data in run():
+                yield sse_event(event, data)
+        
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    async for event, data in run():
+        if event == "done":
+            return data
+
 @app.get("/terminals")
-async def list_terminals(token_data: Dict = Depends(verify_token)):
+async def list_terminals(token_data: Dict = Depends(rate_limited("default"))):
     """List agent's terminals"""
     agent_id = token_data.get("agent_id")
-    agent_terminals = [t for t in terminals.values() if t["agent_id"] == agent_id]
-    return {"terminals": agent_terminals}
+    if shared_state:
+        return {"terminals": shared_state.list_agent(agent_id)}
+    agent_terminals = sorted(terminals.by_agent(agent_id), key=lambda t: t.created_at)
+    return {"terminals": [t.to_dict() for t in agent_terminals]}
+
+@app.get("/workspace")
+async def get_workspace(token_data: Dict = Depends(rate_limited("default"))):
+    """Show the agent's workspace volume and its last measured size"""
+    if not workspaces:
+        raise HTTPException(status_code=404, detail="Workspace volumes are not enabled")
+    return workspaces.usage(token_data.get("agent_id"))
+
+@app.delete("/workspace")
+async def delete_workspace(token_data: Dict = Depends(rate_limited("default"))):
+    """Delete the agent's workspace volume; fails with 409 while a terminal mounts it"""
+    if not workspaces:
+        raise HTTPException(status_code=404, detail="Workspace volumes are not enabled")
+    try:
+        await workspaces.delete(token_data.get("agent_id"))
+    except docker.errors.APIError as e:
+        if e.status_code == 409:
+            raise HTTPException(status_code=409, detail="Workspace is mounted by a terminal; destroy it first")
+        raise HTTPException(status_code=500, detail=f"Failed to delete workspace: {str(e)}")
+    return {"success": True}
+
+@app.get("/caches")
+async def get_caches(token_data: Dict = Depends(rate_limited("default"))):
+    """Shared dependency cache hit rate and writer queue"""
+    if not dependency_cache:
+        raise HTTPException(status_code=404, detail="Dependency cache is not enabled")
+    return {"pip": dependency_cache.stats()}
+
+@app.post("/caches/pip/fill")
+async def fill_pip_cache(request: CacheFillRequest, token_data: Dict = Depends(rate_limited("default"))):
+    """Queue pip requirements (e.g. ``requests==2.31.0``) for download into the shared cache"""
+    if not dependency_cache:
+        raise HTTPException(status_code=404, detail="Dependency cache is not enabled")
+    rejected = dependency_cache.request_fill(request.packages)
+    if rejected:
+        raise HTTPException(status_code=400, detail=f"Invalid requirements: {', '.join(rejected)}")
+    return {"queued": len(request.packages)}
 
 # WebSocket for real-time streaming
 @app.websocket("/terminals/{terminal_id}/stream")
-async def terminal_stream(websocket: WebSocket, terminal_id: str, token: str = None):
-    """WebSocket endpoint for real-time terminal streaming"""
+async def terminal_stream(websocket: WebSocket, terminal_id: str, token: str = None,
+                          since: Optional[int] = None, format: str = "text"):
+    """WebSocket endpoint for real-time terminal streaming
+
+    All subscribers of a terminal share one upstream log reader. ``since``
+    replays buffered lines from that offset; ``format=json`` sends
+    ``{"offset", "line"}`` objects so clients can track offsets.
+    """
     await websocket.accept()
     
     try:
@@ -414,34 +2059,65 @@ async def terminal_stream(websocket: WebSocket, terminal_id: str, token: str = N
             return
         
         try:
-            payload = jwt.decode(token, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM])
-            agent_id = payload.get("agent_id")
-        except jwt.JWTError:
-            await websocket.send_json({"error": "Invalid token"})
+            agent_id = decode_token(token).get("agent_id")
+            check_rate_limit(agent_id, "logs")
+        except HTTPException as e:
+            await websocket.send_json({"error": e.detail})
             await websocket.close()
             return
         
         # Verify terminal ownership
-        if terminal_id not in terminals:
+        terminal = lookup_terminal(terminal_id)
+        if terminal is None:
             await websocket.send_json({"error": "Terminal not found"})
             await websocket.close()
             return
         
-        terminal = terminals[terminal_id]
-        if terminal["agent_id"] != agent_id:
+        if terminal.agent_id != agent_id:
             await websocket.send_json({"error": "Access denied"})
             await websocket.close()
             return
         
-        # Stream logs
-        container = docker_client.containers.get(terminal["container_id"])
-        log_stream = container.logs(stream=True, follow=True, timestamps=True)
+        if docker_client is None:
+            await websocket.send_json({"error": "Log streaming requires the docker terminal backend"})
+            await websocket.close()
+            return
         
-        for log_line in log_stream:
-            try:
-                await websocket.send_text(log_line.decode('utf-8'))
-            except:
-                break
+        # Stream logs from the terminal's shared hub
+        await touch_terminal(terminal)
+        hub = get_log_hub(terminal_id)
+        subscriber, replay = hub.subscribe(since)
+        
+        async def send(offset: int, line: str):
+            if format == "json":
+                await websocket.send_json({"offset": offset, "line": line})
+            else:
+                await websocket.send_text(line)
+        
+        # Watch for the client going away while the hub is quiet
+        disconnect = asyncio.create_task(websocket.receive())
+        try:
+            for offset, line in replay:
+                await send(offset, line)
+            while True:
+                next_entry = asyncio.create_task(subscriber.queue.get())
+                await asyncio.wait([next_entry, disconnect], return_when=asyncio.FIRST_COMPLETED)
+                if not next_entry.done():
+                    next_entry.cancel()
+                    if disconnect.result()["type"] == "websocket.disconnect":
+                        break
+                    disconnect = asyncio.create_task(websocket.receive())
+                    continue
+                entry = next_entry.result()
+                if entry is None:
+                    if format == "json":
+                        await websocket.send_json({"closed": subscriber.close_reason})
+                    await websocket.close()
+                    break
+                await send(*entry)
+        finally:
+            disconnect.cancel()
+            hub.unsubscribe(subscriber)
                 
     except Exception as e:
         logger.error(f"WebSocket error for terminal {terminal_id}: {e}")
@@ -454,16 +2130,54 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "terminals": len([t for t in terminals.values() if t["status"] == "running"]),
+        "terminals": shared_state.running_count() if shared_state else terminals.running_count(),
+        "terminal_states": terminals.status_counts(),
         "docker_status": "connected" if docker_client else "disconnected",
-        "redis_status": "connected" if redis_client else "disconnected"
+        "redis_status": "connected" if redis_client else "disconnected",
+        "docker_ops": docker_ops.stats(),
+        "backend": backend.stats() if backend else None,
+        "warm_pools": [pool.stats() for pool in warm_pools.values()],
+        "token_cache": token_cache.stats(),
+        "rate_limiter": rate_limiter.stats() if rate_limiter else None,
+        "admission": admission.stats() if admission else None,
+        "workspaces": workspaces.stats() if workspaces else None,
+        "dependency_cache": dependency_cache.stats() if dependency_cache else None,
+        "log_streams": {
+            "terminals": len(log_hubs),
+            "subscribers": sum(hub.stats()["subscribers"] for hub in log_hubs.values())
+        }
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    if not config.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    TERMINALS.clear()
+    for status, count in terminals.status_counts().items():
+        TERMINALS.labels(status).set(count)
+    for pool in warm_pools.values():
+        WARM_POOL_IDLE.labels(pool.profile).set(pool.stats()["idle"])
+    for op, stats in docker_ops.stats().items():
+        DOCKER_IN_FLIGHT.labels(op).set(stats["in_flight"])
+    LOG_STREAM_SUBSCRIBERS.set(sum(hub.stats()["subscribers"] for hub in log_hubs.values()))
+    if admission:
+        ADMISSION_COMMITTED.labels("memory").set(admission.memory_committed)
+        ADMISSION_COMMITTED.labels("cpus").set(admission.cpus_committed)
+        ADMISSION_QUEUED.set(admission.stats()["queued"])
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
+    workers = config.BRIDGE_WORKERS
+    if workers > 1 and not config.SHARED_STATE_ENABLED:
+        logger.warning("BRIDGE_WORKERS > 1 without SHARED_STATE_ENABLED: workers will not see each other's terminals")
+    if workers > 1:
+        logger.warning("BRIDGE_WORKERS > 1: shell sessions are disabled, commands run in fresh execs")
     uvicorn.run(
         "server:app",
         host="0.0.0.0",
-        port=8000,
+        port=int(os.getenv("BRIDGE_PORT", "8000")),
+        workers=workers,
         reload=False,
         log_level="info"
     )
\ No newline at end of file
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Shared Terminal State
+Redis-backed terminal ownership, limits and expiry for multi-worker bridges
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "mcp-bridge:terminals"
+EXPIRY_KEY = "terminals:expiry"
+
+# Remove a terminal from the expiry set if its deadline has passed.
+# Returns 0 when claimed, -1 when it is no longer scheduled, otherwise
+# the later deadline it was extended to.
+CLAIM_EXPIRY_SCRIPT = """
+local deadline = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not deadline then return -1 end
+if tonumber(deadline) > tonumber(ARGV[2]) then return deadline end
+redis.call('ZREM', KEYS[1], ARGV[1])
+return 0
+"""
+
+class SharedTerminalState:
+    """Terminal state shared by every bridge worker through Redis
+
+    Records live at ``terminal:{id}`` (as in single-worker mode), each
+    agent's terminal ids in ``agent:{agent_id}:terminals`` and deadlines in
+    the ``terminals:expiry`` sorted set. Workers cache records locally and
+    drop them when another worker publishes a change.
+    """
+
+    def __init__(self, redis_client, node_id: str):
+        self.redis = redis_client
+        self.node_id = node_id
+        self._claim_expiry = redis_client.register_script(CLAIM_EXPIRY_SCRIPT)
+
+    def load(self, terminal_id: str) -> Optional[Dict[str, Any]]:
+        value = self.redis.get(f"terminal:{terminal_id}")
+        return json.loads(value) if value else None
+
+    def reserve(self, agent_id: str, terminal_id: str, limit: int) -> bool:
+        """Atomically claim one of the agent's terminal slots"""
+        key = f"agent:{agent_id}:terminals"
+        pipe = self.redis.pipeline()
+        pipe.sadd(key, terminal_id)
+        pipe.scard(key)
+        _, count = pipe.execute()
+        if count > limit:
+            self.redis.srem(key, terminal_id)
+            return False
+        return True
+
+    def release(self, agent_id: str, terminal_id: str):
+        self.redis.srem(f"agent:{agent_id}:terminals", terminal_id)
+
+    def list_agent(self, agent_id: str) -> List[Dict[str, Any]]:
+        terminal_ids = sorted(member.decode() for member in self.redis.smembers(f"agent:{agent_id}:terminals"))
+        if not terminal_ids:
+            return []
+        values = self.redis.mget([f"terminal:{terminal_id}" for terminal_id in terminal_ids])
+        return [json.loads(value) for value in values if value]
+
+    def schedule_expiry(self, terminal_id: str, deadline: float, only_new: bool = False):
+        self.redis.zadd(EXPIRY_KEY, {terminal_id: deadline}, nx=only_new)
+
+    def extend_expiry(self, terminal_id: str, deadline: float):
+        self.redis.zadd(EXPIRY_KEY, {terminal_id: deadline}, xx=True, gt=True)
+
+    def cancel_expiry(self, terminal_id: str):
+        self.redis.zrem(EXPIRY_KEY, terminal_id)
+
+    def claim_expiry(self, terminal_id: str, now: float) -> float:
+        """0 if this worker should expire the terminal, -1 if it is gone, else its new deadline"""
+        return float(self._claim_expiry(keys=[EXPIRY_KEY], args=[terminal_id, now]))
+
+    def orphaned_expiries(self, live_terminal_ids) -> List[str]:
+        """Scheduled terminals that are not in ``live_terminal_ids`` and have no record left"""
+        candidates = [
+            member.decode() for member, _ in self.redis.zscan_iter(EXPIRY_KEY, count=1000)
+            if member.decode() not in live_terminal_ids
+        ]
+        pipe = self.redis.pipeline(transaction=False)
+        for i in range(0, len(candidates), 500):
+            pipe.mget([f"terminal:{terminal_id}" for terminal_id in candidates[i:i + 500]])
+        records = [value for values in pipe.execute() for value in values]
+        return [terminal_id for terminal_id, value in zip(candidates, records) if value is None]
+
+    def forget(self, terminal_ids):
+        """Drop terminals from the expiry set and from every agent's set
+
+        For terminals whose record, and with it their agent id, is gone.
+        """
+        terminal_ids = list(terminal_ids)
+        if not terminal_ids:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrem(EXPIRY_KEY, *terminal_ids)
+        for key in self.redis.scan_iter(match="agent:*:terminals", count=1000):
+            pipe.srem(key, *terminal_ids)
+        pipe.execute()
+
+    def running_count(self) -> int:
+        return self.redis.zcard(EXPIRY_KEY)
+
+    def heartbeat(self, ttl: int):
+        """Mark this worker alive for ttl seconds"""
+        self.redis.setex(f"mcp-bridge:node:{self.node_id}", ttl, "1")
+
+    def node_alive(self, node_id: str) -> bool:
+        return bool(self.redis.exists(f"mcp-bridge:node:{node_id}"))
+
+    def publish(self, op: str, terminal_id: str, deadline: Optional[float] = None):
+        """Tell other workers a terminal changed ("update") or is gone ("delete")"""
+        message = {"op": op, "terminal_id": terminal_id, "deadline": deadline, "origin": self.node_id}
+        self.redis.publish(INVALIDATION_CHANNEL, json.dumps(message))
+
+    def publish_revocation(self, digest: str, until: float):
+        """Tell other workers to stop accepting a revoked token"""
+        message = {"op": "revoke_token", "digest": digest, "until": until, "origin": self.node_id}
+        self.redis.publish(INVALIDATION_CHANNEL, json.dumps(message))
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Persistent Shell Sessions
+Keeps one long-lived bash per terminal attached over a Docker exec socket
+"""
+
+import asyncio
+import base64
+import logging
+import struct
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Stream ids in Docker's multiplexed (non-tty) attach protocol
+STDOUT = 1
+STDERR = 2
+# Pseudo stream id for the final (EXIT, exit_code) item of a command
+EXIT = 0
+
+class SessionClosed(Exception):
+    """The session shell exited while a command was running"""
+
+async def read_frame(sock, pending: bytearray) -> Optional[Tuple[int, bytes]]:
+    """Read one (stream, data) frame from a non-blocking exec socket; None at EOF
+
+    ``pending`` holds bytes received past the previous frame.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        if len(pending) >= 8:
+            stream, size = struct.unpack(">BxxxL", pending[:8])
+            if len(pending) >= 8 + size:
+                data = bytes(pending[8:8 + size])
+                del pending[:8 + size]
+                return stream, data
+        chunk = await loop.sock_recv(sock, 65536)
+        if not chunk:
+            return None
+        pending += chunk
+
+class ShellSession:
+    """A long-lived bash inside a terminal container
+
+    Commands are written to the shell's stdin and framed by a per-command
+    sentinel printed on both stdout and stderr, so working directory,
+    exported variables and other shell state carry over between commands.
+    Commands run one at a time; the shell is (re)started on first use.
+    """
+
+    def __init__(self, api, container_id: str, environment: Optional[Dict[str, str]],
+                 run_blocking: Callable[..., Any]):
+        self.api = api
+        self.container_id = container_id
+        self.environment = environment or {}
+        self._run_blocking = run_blocking
+        self._exec_id = None
+        self._sock = None
+        self._pending = bytearray()
+        self._lock = asyncio.Lock()
+        self.pid = None
+        self.commands_run = 0
+
+    @property
+    def alive(self) -> bool:
+        return self._sock is not None
+
+    async def _start(self):
+        # setsid makes the shell a process group leader so a timed-out
+        # command can be killed together with its children
+        exec_info = await self._run_blocking(
+            self.api.exec_create,
+            self.container_id,
+            ["setsid", "-w", "bash"],
+            stdin=True,
+            stdout=True,
+            stderr=True,
+            tty=False,
+            environment=self.environment
+        )
+        self._exec_id = exec_info["Id"]
+        raw = await self._run_blocking(self.api.exec_start, self._exec_id, socket=True)
+        self._sock = getattr(raw, "_sock", raw)
+        self._sock.setblocking(False)
+        self._pending = bytearray()
+        stdout = bytearray()
+        async for stream, data in self._frames("echo $$"):
+            if stream == STDOUT:
+                stdout += data
+        self.pid = int(stdout.strip())
+        logger.info(f"Started shell session {self.pid} in container {self.container_id[:12]}")
+
+    async def _read_frame(self) -> Tuple[int, bytes]:
+        frame = await read_frame(self._sock, self._pending)
+        if frame is None:
+            raise SessionClosed()
+        return frame
+
+    async def _frames(self, command: str) -> AsyncIterator[Tuple[int, Any]]:
+        """Send a command and yield (STDOUT|STDERR, bytes) chunks, then (EXIT, exit_code)
+
+        Output is forwarded as it arrives, minus a trailing newline-led tail
+        held back in case it is the start of the sentinel.
+        """
+        marker = f"__MCP_DONE_{uuid.uuid4().hex}__"
+        encoded = base64.b64encode(command.encode("utf-8")).decode("ascii")
+        # eval keeps cd/export in this shell; stdin is detached so the
+        # command cannot swallow the sentinel lines that follow it
+        script = (
+            f'eval "$(printf %s {encoded} | base64 -d)" </dev/null\n'
+            f"printf '\\n{marker}:%d\\n' $?\n"
+            f"printf '\\n{marker}\\n' >&2\n"
+        )
+        markers = {
+            STDOUT: f"\n{marker}:".encode("ascii"),
+            STDERR: f"\n{marker}\n".encode("ascii"),
+        }
+        buffers = {STDOUT: bytearray(), STDERR: bytearray()}
+        done = {STDOUT: False, STDERR: False}
+        exit_code = None
+        await asyncio.get_running_loop().sock_sendall(self._sock, script.encode("ascii"))
+
+        while not (done[STDOUT] and done[STDERR]):
+            try:
+                stream, data = await self._read_frame()
+            except SessionClosed:
+                # The command exited the shell itself, e.g. `exit 3`
+                for stream, buf in buffers.items():
+                    if buf:
+                        yield stream, bytes(buf)
+                raise
+            if stream not in buffers or done[stream]:
+                continue
+            buf, stream_marker = buffers[stream], markers[stream]
+            buf += data
+            idx = buf.find(stream_marker)
+            if idx == -1:
+                # Hold back only a trailing partial sentinel (it starts with a newline)
+                nl = buf.rfind(b"\n", max(0, len(buf) - len(stream_marker) + 1))
+                hold = nl if nl != -1 and stream_marker.startswith(bytes(buf[nl:])) else len(buf)
+                if hold:
+                    yield stream, bytes(buf[:hold])
+                    del buf[:hold]
+                continue
+            if stream == STDOUT:
+                end = buf.find(b"\n", idx + len(stream_marker))
+                if end == -1:
+                    # Exit code line not complete yet
+                    if idx:
+                        yield stream, bytes(buf[:idx])
+                        del buf[:idx]
+                    continue
+                exit_code = int(buf[idx + len(stream_marker):end])
+            if idx:
+                yield stream, bytes(buf[:idx])
+            buf.clear()
+            done[stream] = True
+
+        self.commands_run += 1
+        yield EXIT, exit_code
+
+    async def stream(self, command: str, timeout: int = 30) -> AsyncIterator[Tuple[int, Any]]:
+        """Run a command, yielding (STDOUT|STDERR, bytes) chunks and finally (EXIT, exit_code)
+
+        Raises asyncio.TimeoutError after killing the session if the command
+        does not finish in time. A consumer that stops early also kills the
+        session, since the command would otherwise keep writing into the
+        next command's output. The next call starts a fresh shell.
+        """
+        async with self._lock:
+            if not self.alive:
+                await self._start()
+            deadline = asyncio.get_running_loop().time() + timeout
+            frames = self._frames(command)
+            finished = False
+            try:
+                while True:
+                    remaining = deadline - asyncio.get_running_loop().time()
+                    try:
+                        stream, data = await asyncio.wait_for(frames.__anext__(), timeout=max(remaining, 0))
+                    except StopAsyncIteration:
+                        break
+                    except SessionClosed:
+                        exec_id = self._exec_id
+                        await self.close()
+                        info = await self._run_blocking(self.api.exec_inspect, exec_id)
+                        exit_code = info.get("ExitCode")
+                        finished = True
+                        yield EXIT, exit_code if exit_code is not None else -1
+                        return
+                    if stream == EXIT:
+                        finished = True
+                    yield stream, data
+            finally:
+                await frames.aclose()
+                if not finished:
+                    await self.kill()
+
+    async def run(self, command: str, timeout: int = 30) -> Tuple[bytes, bytes, int]:
+        """Run a command in the session and return (stdout, stderr, exit_code)"""
+        output = {STDOUT: bytearray(), STDERR: bytearray()}
+        exit_code = None
+        async for stream, data in self.stream(command, timeout):
+            if stream == EXIT:
+                exit_code = data
+            else:
+                output[stream] += data
+        return bytes(output[STDOUT]), bytes(output[STDERR]), exit_code
+
+    async def kill(self):
+        """Kill the shell's process group and close the session"""
+        if self.pid:
+            try:
+                exec_info = await self._run_blocking(
+                    self.api.exec_create, self.container_id, ["kill", "-KILL", "--", f"-{self.pid}"]
+                )
+                await self._run_blocking(self.api.exec_start, exec_info["Id"])
+            except Exception as e:
+                logger.error(f"Failed to kill shell session {self.pid}: {e}")
+        await self.close()
+
+    async def close(self):
+        """Detach from the shell; it exits on stdin EOF"""
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._exec_id = None
+        self.pid = None
@@ -5,7 +5,7 @@ Integrates with your existing terminal system
 """
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
-import subprocess
+import asyncio
 import json
 import uuid
 import time
@@ -17,13 +17,18 @@ app = FastAPI(title="MCP Terminal Bridge", version="1.0.0")
 # In-memory storage for active terminals
 active_terminals: Dict[str, Dict[str, Any]] = {}
 
-def run_command(cmd: str, timeout: int = 30) -> tuple:
-    """Execute a shell command"""
+async def run_command(cmd: str, timeout: int = 30) -> tuple:
+    """Execute a shell command without blocking the event loop"""
+    process = await asyncio.create_subprocess_shell(
+        cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=timeout)
-        return result.returncode == 0, result.stdout, result.stderr
-    except subprocess.TimeoutExpired:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
         return False, "", "Command timed out"
+    return process.returncode == 0, stdout.decode(errors="replace"), stderr.decode(errors="replace")
 
 @app.get("/")
 async def root():
@@ -40,7 +45,8 @@ async def create_terminal(agent_id: str):
     
     # Use your existing script to create terminal
     cmd = f"/home/loke/create-agent-terminal.sh {agent_id}-{terminal_id[:8]}"
-    success, stdout, stderr = run_command(cmd)
+    # The script waits up to 30s for the terminal to become ready
+    success, stdout, stderr = await run_command(cmd, timeout=60)
     
     if not success:
         raise HTTPException(status_code=500, detail=f"Failed to create terminal: {stderr}")
@@ -74,7 +80,7 @@ async def execute_command(terminal_id: str, command: str):
     
     # Execute command in the container
     cmd = f"docker exec {container_name} bash -c '{command}'"
-    success, stdout, stderr = run_command(cmd)
+    success, stdout, stderr = await run_command(cmd)
     
     return {
         "terminal_id": terminal_id,
@@ -96,7 +102,7 @@ async def get_logs(terminal_id: str, lines: int = 50):
     
     # Get container logs
     cmd = f"docker logs --tail {lines} {container_name}"
-    success, stdout, stderr = run_command(cmd)
+    success, stdout, stderr = await run_command(cmd)
     
     return {
         "terminal_id": terminal_id,
@@ -121,7 +127,7 @@ async def destroy_terminal(terminal_id: str):
     
     # Stop and remove the container
     cmd = f"docker stop {container_name} && docker rm {container_name}"
-    success, stdout, stderr = run_command(cmd)
+    success, stdout, stderr = await run_command(cmd)
     
     # Remove from active terminals
     del active_terminals[terminal_id]
@@ -143,7 +149,7 @@ async def get_terminal_status(terminal_id: str):
     
     # Check if container is running
     cmd = f"docker ps --filter name={container_name} --format '{{{{.Status}}}}'"
-    success, stdout, stderr = run_command(cmd)
+    success, stdout, stderr = await run_command(cmd)
     
     is_running = success and stdout.strip() != ""
     
@@ -166,10 +172,8 @@ async def demo_test_integration():
     terminal = await create_terminal(agent_id)
     terminal_id = terminal["terminal_id"]
     
-    # 2. Wait a moment for container to start
-    time.sleep(2)
-    
-    # 3. Execute test commands
+    # 2. Execute test commands (create-agent-terminal.sh returns once the
+    #    terminal has signalled it is ready)
     commands = [
         "echo 'MCP Bridge Integration Test'",
         "python3 --version",
@@ -183,10 +187,10 @@ async def demo_test_integration():
         result = await execute_command(terminal_id, cmd)
         results.append({"command": cmd, "output": result["stdout"]})
     
-    # 4. Get logs
+    # 3. Get logs
     logs = await get_logs(terminal_id)
     
-    # 5. Clean up
+    # 4. Clean up
     await destroy_terminal(terminal_id)
     
     return {
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Terminal Backends
+Where terminals run: Docker, or an in-process fake for benchmarking the bridge
+"""
+
+import asyncio
+import os
+import random
+import shlex
+import signal
+import time
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import docker
+
+from shell_session import EXIT, STDERR, STDOUT, read_frame
+
+class TerminalBackend(ABC):
+    """Creates terminals, runs commands in them, reads their logs and destroys them
+
+    Terminals are addressed by the container id ``create`` returns.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def create(self, terminal_id: str, image: str, command: str, environment: Dict[str, str],
+                     volumes: Dict[str, Dict[str, str]], labels: Dict[str, str], limits: Dict[str, Any]) -> str:
+        """Start a terminal, returning its container id"""
+
+    @abstractmethod
+    def exec(self, container_id: str, command: str, environment: Dict[str, str],
+             timeout: float) -> AsyncIterator[Tuple[int, Any]]:
+        """Run a command, yielding (STDOUT|STDERR, bytes) chunks and finally (EXIT, exit_code)
+
+        Raises asyncio.TimeoutError if it runs longer than timeout seconds.
+        """
+
+    @abstractmethod
+    async def logs(self, container_id: str, tail: int) -> bytes:
+        """The last ``tail`` lines of the terminal's output, timestamped"""
+
+    @abstractmethod
+    async def destroy(self, container_id: str, force: bool, stop_timeout: int) -> bool:
+        """Stop (unless force) and remove a terminal; False if it was already gone"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Counters reported under ``backend`` in /health"""
+
+class DockerBackend(TerminalBackend):
+    """Terminals are containers; every docker-py call runs on the executor's pools"""
+
+    name = "docker"
+
+    def __init__(self, client, ops):
+        self.client = client
+        self.ops = ops
+
+    async def create(self, terminal_id, image, command, environment, volumes, labels, limits):
+        container = await self.ops.run(
+            "create",
+            self.client.containers.run,
+            image,
+            command=command,
+            environment=environment,
+            volumes=volumes,
+            detach=True,
+            name=f"mcp-terminal-{terminal_id}",
+            labels=labels,
+            network_mode="bridge",
+            remove=False,
+            **limits
+        )
+        return container.id
+
+    async def exec(self, container_id, command, environment, timeout):
+        # Read the exec's socket on the event loop, so a command that never
+        # finishes holds no worker thread, and have the container kill it
+        # (with its process group) just after our deadline
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        exec_info = await self.ops.run(
+            "exec",
+            self.client.api.exec_create,
+            container_id,
+            ["timeout", "-s", "KILL", f"{timeout + 1:g}"] + shlex.split(command),
+            stdout=True,
+            stderr=True,
+            environment=environment
+        )
+        raw = await self.ops.run("exec", self.client.api.exec_start, exec_info["Id"], socket=True)
+        sock = getattr(raw, "_sock", raw)
+        sock.setblocking(False)
+        pending = bytearray()
+        try:
+            while True:
+                frame = await asyncio.wait_for(read_frame(sock, pending), timeout=max(deadline - loop.time(), 0))
+                if frame is None:
+                    break
+                if frame[0] in (STDOUT, STDERR) and frame[1]:
+                    yield frame
+        finally:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        info = await self.ops.run("exec", self.client.api.exec_inspect, exec_info["Id"])
+        yield EXIT, info.get("ExitCode")
+
+    async def logs(self, container_id, tail):
+        return await self.ops.run("logs", self.client.api.logs, container_id, tail=tail, timestamps=True)
+
+    async def destroy(self, container_id, force, stop_timeout):
+        try:
+            if not force:
+                await self.ops.run("destroy", self.client.api.stop, container_id, timeout=stop_timeout)
+            await self.ops.run("destroy", self.client.api.remove_container, container_id, force=True)
+        except docker.errors.NotFound:
+            return False
+        return True
+
+    def stats(self):
+        return {"backend": self.name}
+
+def parse_latencies(value: str) -> Dict[str, Tuple[float, float]]:
+    """Parse ``op=base_ms[:jitter_ms],...`` into {op: (base seconds, jitter seconds)}"""
+    latencies = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        op, _, spec = item.partition("=")
+        base, _, jitter = spec.partition(":")
+        latencies[op.strip()] = (float(base) / 1000, float(jitter or 0) / 1000)
+    return latencies
+
+class _FakeTerminal:
+    __slots__ = ("terminal_id", "volumes", "environment", "output")
+
+    def __init__(self, terminal_id: str, volumes: Dict[str, Dict[str, str]], environment: Dict[str, str]):
+        self.terminal_id = terminal_id
+        self.volumes = volumes
+        self.environment = environment
+        self.output = []
+
+class FakeBackend(TerminalBackend):
+    """In-process stand-in for Docker, to measure the bridge's own throughput and latency
+
+    In ``echo`` mode nothing runs: a command's stdout is the command itself
+    and its exit code 0. In ``subprocess`` mode commands run as local shell
+    processes with the terminal's environment and its bind-mount targets
+    rewritten to the host paths, so they act on the host as the bridge's
+    user (benchmarking only). Each call first sleeps its operation's
+    injected latency, a base plus uniform jitter drawn from an RNG seeded
+    with ``seed``, so a sequential run sees the same delays every time.
+    Creating a terminal writes the ``session.log`` and ``.ready`` files a
+    container would.
+    """
+
+    name = "fake"
+
+    def __init__(self, mode: str = "echo", latencies: Optional[Dict[str, Tuple[float, float]]] = None, seed: int = 0):
+        if mode not in ("echo", "subprocess"):
+            raise ValueError(f"Unknown fake backend mode: {mode}")
+        self.mode = mode
+        self.latencies = latencies or {}
+        self._random = random.Random(seed)
+        self._terminals: Dict[str, _FakeTerminal] = {}
+        self.calls = {op: 0 for op in ("create", "exec", "logs", "destroy")}
+        self.injected_seconds = 0.0
+
+    async def _delay(self, op: str):
+        self.calls[op] += 1
+        base, jitter = self.latencies.get(op, (0.0, 0.0))
+        delay = base + (self._random.uniform(0, jitter) if jitter else 0.0)
+        self.injected_seconds += delay
+        await asyncio.sleep(delay)
+
+    async def create(self, terminal_id, image, command, environment, volumes, labels, limits):
+        await self._delay("create")
+        container_id = f"fake-{terminal_id}"
+        for host_path, mount in volumes.items():
+            if mount["bind"] == "/tmp/logs":
+                os.makedirs(host_path, exist_ok=True)
+                with open(os.path.join(host_path, "session.log"), "w") as f:
+                    f.write(f"{time.strftime('%Y-%m-%dT%H:%M:%S')}: Terminal {terminal_id} started\n")
+                open(os.path.join(host_path, ".ready"), "w").close()
+        terminal = _FakeTerminal(terminal_id, volumes, environment)
+        terminal.output.append(f"Terminal {terminal_id} ready for commands\n".encode())
+        self._terminals[container_id] = terminal
+        return container_id
+
+    async def exec(self, container_id, command, environment, timeout):
+        await self._delay("exec")
+        terminal = self._terminals[container_id]
+        if self.mode == "echo":
+            output = command.encode() + b"\n"
+            terminal.output.append(output)
+            yield STDOUT, output
+            yield EXIT, 0
+            return
+        for host_path, mount in terminal.volumes.items():
+            command = command.replace(mount["bind"], host_path)
+        process = await asyncio.create_subprocess_shell(
+            command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env={**os.environ, **environment},
+            start_new_session=True
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            # Kill the command's whole process group, as the Docker backend's timeout does
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await process.wait()
+            raise
+        terminal.output.append(stdout)
+        if stdout:
+            yield STDOUT, stdout
+        if stderr:
+            yield STDERR, stderr
+        yield EXIT, process.returncode
+
+    async def logs(self, container_id, tail):
+        await self._delay("logs")
+        terminal = self._terminals[container_id]
+        lines = b"".join(terminal.output).splitlines(keepends=True)[-tail:] if tail else []
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S.000000000Z", time.gmtime()).encode()
+        return b"".join(stamp + b" " + line for line in lines)
+
+    async def destroy(self, container_id, force, stop_timeout):
+        await self._delay("destroy")
+        return self._terminals.pop(container_id, None) is not None
+
+    def stats(self):
+        return {
+            "backend": self.name,
+            "mode": self.mode,
+            "terminals": len(self._terminals),
+            "calls": dict(self.calls),
+            "injected_seconds": round(self.injected_seconds, 3)
+        }
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Terminal Registry
+Indexed in-memory store of terminal records
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+# Statuses that hold a live container and count against per-agent limits
+LIVE_STATUSES = ("running", "paused")
+
+class TerminalRecord:
+    """State of one terminal
+
+    ``environment`` may hold an agent's secrets, so it stays in memory: it
+    is left out of ``to_dict``, which feeds both Redis and API listings.
+    """
+
+    __slots__ = (
+        "terminal_id", "agent_id", "container_id", "status", "created_at", "log_dir",
+        "command", "profile", "environment", "pooled", "expires_at", "deadline", "ttl_seconds",
+        "exit_code", "oom_killed", "workspace"
+    )
+
+    def __init__(self, terminal_id: str, agent_id: str, container_id: str, status: str, created_at: str,
+                 log_dir: str, command: str, profile: str = "default",
+                 environment: Optional[Dict[str, str]] = None, pooled: bool = False,
+                 expires_at: Optional[str] = None, deadline: Optional[float] = None,
+                 ttl_seconds: Optional[int] = None, exit_code: Optional[int] = None,
+                 oom_killed: bool = False, workspace: Optional[str] = None):
+        self.terminal_id = terminal_id
+        self.agent_id = agent_id
+        self.container_id = container_id
+        self.status = status
+        self.created_at = created_at
+        self.log_dir = log_dir
+        self.command = command
+        self.profile = profile
+        self.environment = environment or {}
+        self.pooled = pooled
+        self.expires_at = expires_at
+        self.deadline = deadline
+        self.ttl_seconds = ttl_seconds
+        self.exit_code = exit_code
+        self.oom_killed = oom_killed
+        self.workspace = workspace
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in PERSISTED_FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TerminalRecord":
+        return cls(**{name: data[name] for name in PERSISTED_FIELDS if name in data})
+
+PERSISTED_FIELDS = tuple(name for name in TerminalRecord.__slots__ if name != "environment")
+
+class TerminalRegistry:
+    """Terminal records indexed by agent, container and status
+
+    Per-agent running counts and per-status totals are maintained on every
+    status change, so limit checks and health reporting never scan the
+    fleet. Destroyed terminals stay visible as tombstones for
+    ``tombstone_ttl`` seconds (at most ``max_tombstones`` of them) and are
+    then evicted.
+    """
+
+    def __init__(self, tombstone_ttl: float = 3600, max_tombstones: int = 10000):
+        self._records: Dict[str, TerminalRecord] = {}
+        self._by_agent: Dict[str, Set[str]] = {}
+        self._by_container: Dict[str, str] = {}
+        self._by_status: Dict[str, Set[str]] = {}
+        self._running_by_agent: Dict[str, int] = {}
+        self._tombstones: "OrderedDict[str, float]" = OrderedDict()
+        self.tombstone_ttl = tombstone_ttl
+        self.max_tombstones = max_tombstones
+
+    def __contains__(self, terminal_id: str) -> bool:
+        return terminal_id in self._records
+
+    def __getitem__(self, terminal_id: str) -> TerminalRecord:
+        return self._records[terminal_id]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[TerminalRecord]:
+        return iter(list(self._records.values()))
+
+    def get(self, terminal_id: str) -> Optional[TerminalRecord]:
+        return self._records.get(terminal_id)
+
+    def _index(self, record: TerminalRecord):
+        self._by_status.setdefault(record.status, set()).add(record.terminal_id)
+        if record.status in LIVE_STATUSES:
+            self._running_by_agent[record.agent_id] = self._running_by_agent.get(record.agent_id, 0) + 1
+        elif record.status == "destroyed":
+            self._tombstones[record.terminal_id] = time.monotonic()
+
+    def _unindex(self, record: TerminalRecord):
+        ids = self._by_status.get(record.status)
+        if ids is not None:
+            ids.discard(record.terminal_id)
+            if not ids:
+                del self._by_status[record.status]
+        if record.status in LIVE_STATUSES:
+            remaining = self._running_by_agent[record.agent_id] - 1
+            if remaining:
+                self._running_by_agent[record.agent_id] = remaining
+            else:
+                del self._running_by_agent[record.agent_id]
+        elif record.status == "destroyed":
+            self._tombstones.pop(record.terminal_id, None)
+
+    def add(self, record: TerminalRecord):
+        if record.terminal_id in self._records:
+            self.remove(record.terminal_id)
+        self._records[record.terminal_id] = record
+        self._by_agent.setdefault(record.agent_id, set()).add(record.terminal_id)
+        self._by_container[record.container_id] = record.terminal_id
+        self._index(record)
+        self.evict_tombstones()
+
+    def set_status(self, terminal_id: str, status: str):
+        record = self._records[terminal_id]
+        if record.status == status:
+            return
+        self._unindex(record)
+        record.status = status
+        self._index(record)
+        self.evict_tombstones()
+
+    def remove(self, terminal_id: str) -> Optional[TerminalRecord]:
+        record = self._records.pop(terminal_id, None)
+        if record is None:
+            return None
+        self._unindex(record)
+        if self._by_container.get(record.container_id) == terminal_id:
+            del self._by_container[record.container_id]
+        ids = self._by_agent.get(record.agent_id)
+        if ids is not None:
+            ids.discard(terminal_id)
+            if not ids:
+                del self._by_agent[record.agent_id]
+        return record
+
+    def evict_tombstones(self):
+        """Drop destroyed terminals past their TTL or beyond the tombstone cap"""
+        cutoff = time.monotonic() - self.tombstone_ttl
+        while self._tombstones:
+            terminal_id, destroyed_at = next(iter(self._tombstones.items()))
+            if destroyed_at > cutoff and len(self._tombstones) <= self.max_tombstones:
+                break
+            self.remove(terminal_id)
+
+    def by_agent(self, agent_id: str) -> List[TerminalRecord]:
+        return [self._records[terminal_id] for terminal_id in self._by_agent.get(agent_id, ())]
+
+    def by_container(self, container_id: str) -> Optional[TerminalRecord]:
+        terminal_id = self._by_container.get(container_id)
+        return self._records[terminal_id] if terminal_id else None
+
+    def with_status(self, status: str) -> List[TerminalRecord]:
+        return [self._records[terminal_id] for terminal_id in self._by_status.get(status, ())]
+
+    def running_count(self, agent_id: Optional[str] = None) -> int:
+        """Live terminals, paused ones included"""
+        if agent_id is None:
+            return sum(len(self._by_status.get(status, ())) for status in LIVE_STATUSES)
+        return self._running_by_agent.get(agent_id, 0)
+
+    def status_counts(self) -> Dict[str, int]:
+        return {status: len(ids) for status, ids in self._by_status.items()}
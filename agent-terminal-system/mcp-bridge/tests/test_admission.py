@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from admission import COMMITTED_KEY, AdmissionController, AdmissionRejected, parse_memory, profile_demand
+
+GIB = 1024 ** 3
+
+def test_parse_memory():
+    assert parse_memory("512m") == 512 * 1024 ** 2
+    assert parse_memory("2g") == 2 * GIB
+    assert parse_memory("1.5G") == int(1.5 * GIB)
+    assert parse_memory("1024") == 1024
+    assert parse_memory(4096) == 4096
+
+def test_profile_demand():
+    assert profile_demand({"mem_limit": "1g", "nano_cpus": 500000000}) == (GIB, 0.5)
+    assert profile_demand({"mem_limit": "1g", "cpu_quota": 200000, "cpu_period": 100000}) == (GIB, 2.0)
+    assert profile_demand({}) == (0, 0.0)
+
+def test_admits_immediately_while_capacity_remains():
+    async def scenario():
+        admission = AdmissionController(4 * GIB, 4.0)
+        await admission.admit("t1", "a", 2 * GIB, 1.0, timeout=1)
+        await admission.admit("t2", "a", 2 * GIB, 1.0, timeout=1)
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.memory_committed == 4 * GIB
+    assert admission.cpus_committed == 2.0
+    assert admission.stats()["admitted_total"] == 2
+
+def test_release_admits_waiter_and_is_idempotent():
+    async def scenario():
+        admission = AdmissionController(2 * GIB, 4.0)
+        await admission.admit("t1", "a", 2 * GIB, 1.0, timeout=1)
+        waiter = asyncio.create_task(admission.admit("t2", "b", 2 * GIB, 1.0, timeout=1))
+        await asyncio.sleep(0)
+        assert admission.stats()["queued"] == 1
+        admission.release("t1")
+        admission.release("t1")
+        await waiter
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.memory_committed == 2 * GIB
+    assert admission.stats()["terminals"] == 1
+
+def test_agents_take_turns_in_the_queue():
+    async def scenario():
+        admission = AdmissionController(GIB, 4.0)
+        await admission.admit("t0", "a", GIB, 0.1, timeout=1)
+        order = []
+
+        async def admit(terminal_id, agent_id):
+            await admission.admit(terminal_id, agent_id, GIB, 0.1, timeout=1)
+            order.append(terminal_id)
+
+        tasks = [asyncio.create_task(admit(*args)) for args in (("a1", "a"), ("a2", "a"), ("b1", "b"))]
+        await asyncio.sleep(0)
+        previous = "t0"
+        for served in range(1, len(tasks) + 1):
+            admission.release(previous)
+            while len(order) < served:
+                await asyncio.sleep(0.001)
+            previous = order[-1]
+        await asyncio.gather(*tasks)
+        return order
+
+    # Agent b is served before agent a's second request
+    assert asyncio.run(scenario()) == ["a1", "b1", "a2"]
+
+def test_rejects_profiles_larger_than_the_host():
+    async def scenario():
+        await AdmissionController(GIB, 1.0).admit("t1", "a", 2 * GIB, 0.5, timeout=1)
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        asyncio.run(scenario())
+    assert excinfo.value.retry_after == 0
+
+def test_rejects_when_queue_full_or_wait_times_out():
+    async def scenario():
+        admission = AdmissionController(GIB, 1.0, queue_size=1)
+        await admission.admit("t1", "a", GIB, 0.5, timeout=1)
+        waiter = asyncio.create_task(admission.admit("t2", "a", GIB, 0.5, timeout=0.05))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected, match="queue full"):
+            await admission.admit("t3", "b", GIB, 0.5, timeout=1)
+        with pytest.raises(AdmissionRejected, match="Timed out"):
+            await waiter
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.stats()["queued"] == 0
+    assert admission.stats()["timed_out_total"] == 1
+    assert admission.memory_committed == GIB
+
+def test_reserve_commits_past_capacity():
+    admission = AdmissionController(GIB, 1.0)
+    admission.reserve("adopted", 2 * GIB, 2.0)
+    admission.reserve("adopted", 2 * GIB, 2.0)
+    assert admission.memory_committed == 2 * GIB
+    admission.release("adopted")
+    assert admission.memory_committed == 0
+
+def shared_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeRedis()
+
+def test_processes_admit_against_shared_totals():
+    redis_client = shared_redis()
+
+    async def scenario():
+        first = AdmissionController(GIB, 4.0, redis_client=redis_client, poll_interval=0.01)
+        second = AdmissionController(GIB, 4.0, redis_client=redis_client, poll_interval=0.01)
+        await first.admit("t1", "a", GIB, 1.0, timeout=1)
+        waiter = asyncio.create_task(second.admit("t2", "b", GIB, 1.0, timeout=1))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        first.release("t1")
+        # second notices the release on its next poll
+        await waiter
+        return second
+
+    second = asyncio.run(scenario())
+    assert second.memory_committed == GIB
+    assert redis_client.hkeys(COMMITTED_KEY) == [b"t2"]
+
+def test_reconcile_releases_commitments_of_terminals_that_are_gone():
+    redis_client = shared_redis()
+    previous = AdmissionController(4 * GIB, 4.0, redis_client=redis_client)
+    previous.reserve("crashed", GIB, 1.0)
+    redis_client.hset(COMMITTED_KEY, "crashed", f"{GIB} 1.0 0")
+    previous.reserve("adopted", GIB, 1.0)
+    # Committed by another process just now: may be a create in flight
+    AdmissionController(4 * GIB, 4.0, redis_client=redis_client).reserve("in-flight", GIB, 1.0)
+
+    restarted = AdmissionController(4 * GIB, 4.0, redis_client=redis_client)
+    restarted.reserve("adopted", GIB, 1.0)
+    assert restarted.reconcile({"adopted"}, grace=60) == 1
+    assert sorted(redis_client.hkeys(COMMITTED_KEY)) == [b"adopted", b"in-flight"]
+    assert restarted.memory_committed == 2 * GIB
+    assert restarted.cpus_committed == 2.0
+    assert AdmissionController(GIB, 1.0).reconcile(set(), grace=0) == 0
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("prometheus_client")
+pytest.importorskip("redis")
+
+from docker_governor import DockerBusy, DockerGovernor
+
+def governor(max_concurrent=1, class_limits=None, timeouts=None):
+    return DockerGovernor(
+        max_concurrent,
+        class_limits or {},
+        ["exec", "logs", "create"],
+        timeouts or {"exec": 1, "logs": 1, "create": 1}
+    )
+
+def test_freed_slots_go_to_the_most_urgent_class():
+    async def scenario():
+        gov = governor()
+        await gov.acquire("create")
+        order = []
+
+        async def call(op, name):
+            await gov.acquire(op)
+            order.append(name)
+            gov.release(op)
+
+        tasks = [
+            asyncio.create_task(call("create", "create-2")),
+            asyncio.create_task(call("logs", "logs-1")),
+            asyncio.create_task(call("exec", "exec-1")),
+        ]
+        await asyncio.sleep(0)
+        gov.release("create")
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["exec-1", "logs-1", "create-2"]
+
+def test_class_limit_leaves_room_for_other_classes():
+    async def scenario():
+        gov = governor(max_concurrent=3, class_limits={"create": 1})
+        await gov.acquire("create")
+        blocked = asyncio.create_task(gov.acquire("create"))
+        await gov.acquire("exec")
+        await asyncio.sleep(0)
+        stats = gov.stats()
+        blocked.cancel()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["create"] == {"active": 1, "limit": 1, "queued": 1, "queue_timeouts": 0}
+    assert stats["exec"]["active"] == 1
+
+def test_queue_timeout_raises_docker_busy():
+    async def scenario():
+        gov = governor(timeouts={"exec": 1, "logs": 1, "create": 0.05})
+        await gov.acquire("exec")
+        with pytest.raises(DockerBusy) as excinfo:
+            await gov.acquire("create")
+        return gov, excinfo.value
+
+    gov, error = asyncio.run(scenario())
+    assert error.op == "create"
+    assert gov.stats()["create"]["queue_timeouts"] == 1
+    assert gov.stats()["create"]["queued"] == 0
+
+def test_ungoverned_classes_pass_through():
+    async def scenario():
+        gov = governor()
+        await gov.acquire("exec")
+        await asyncio.wait_for(gov.acquire("stream"), timeout=0.1)
+        gov.release("stream")
+        return gov
+
+    assert not asyncio.run(scenario()).governs("stream")
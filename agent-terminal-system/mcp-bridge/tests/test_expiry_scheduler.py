@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+from expiry_scheduler import ExpiryScheduler
+
+def test_due_terminals_pop_in_deadline_order():
+    scheduler = ExpiryScheduler()
+    scheduler.schedule("b", 20)
+    scheduler.schedule("a", 10)
+    scheduler.schedule("c", 30)
+    assert scheduler.next_deadline() == 10
+    assert scheduler._pop_due(25) == ["a", "b"]
+    assert len(scheduler) == 1
+
+def test_extend_defers_expiry():
+    scheduler = ExpiryScheduler()
+    scheduler.schedule("a", 10)
+    scheduler.extend("a", 50)
+    assert scheduler._pop_due(20) == []
+    # The stale heap entry was re-pushed at the new deadline
+    assert scheduler.next_deadline() == 50
+    assert scheduler._pop_due(50) == ["a"]
+
+def test_extend_never_shortens_or_schedules():
+    scheduler = ExpiryScheduler()
+    scheduler.schedule("a", 50)
+    scheduler.extend("a", 10)
+    scheduler.extend("unknown", 10)
+    assert scheduler._pop_due(20) == []
+    assert len(scheduler) == 1
+
+def test_cancel_and_earlier_reschedule():
+    scheduler = ExpiryScheduler()
+    scheduler.schedule("a", 10)
+    scheduler.cancel("a")
+    assert scheduler._pop_due(100) == []
+    scheduler.schedule("b", 50)
+    scheduler.schedule("b", 5)
+    assert scheduler._pop_due(10) == ["b"]
+    assert scheduler._pop_due(100) == []
+
+def test_run_fires_callbacks_when_due():
+    async def scenario():
+        scheduler = ExpiryScheduler()
+        expired = []
+
+        async def on_expire(terminal_id):
+            expired.append(terminal_id)
+
+        runner = asyncio.create_task(scheduler.run(on_expire))
+        scheduler.schedule("late", time.time() + 0.1)
+        scheduler.schedule("soon", time.time() + 0.02)
+        await asyncio.sleep(0.2)
+        runner.cancel()
+        return expired
+
+    assert asyncio.run(scenario()) == ["soon", "late"]
+
+def test_failing_callback_does_not_stop_the_loop():
+    async def scenario():
+        scheduler = ExpiryScheduler()
+        expired = []
+
+        async def on_expire(terminal_id):
+            if terminal_id == "bad":
+                raise RuntimeError("teardown failed")
+            expired.append(terminal_id)
+
+        runner = asyncio.create_task(scheduler.run(on_expire))
+        scheduler.schedule("bad", time.time())
+        scheduler.schedule("good", time.time() + 0.02)
+        await asyncio.sleep(0.1)
+        runner.cancel()
+        return expired
+
+    assert asyncio.run(scenario()) == ["good"]
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import shutil
+import time
+
+import pytest
+
+pytest.importorskip("docker")
+
+from shell_session import EXIT, STDERR, STDOUT
+from terminal_backend import FakeBackend, TerminalBackend, parse_latencies
+
+def volumes(log_dir, workspace_dir=None):
+    mounts = {str(log_dir): {"bind": "/tmp/logs", "mode": "rw"}}
+    if workspace_dir:
+        mounts[str(workspace_dir)] = {"bind": "/workspace", "mode": "rw"}
+    return mounts
+
+async def create(backend, terminal_id, mounts, environment=None):
+    return await backend.create(terminal_id, "image", "bash", environment or {}, mounts, {}, {})
+
+async def collect(backend, container_id, command, environment=None, timeout=5):
+    return [item async for item in backend.exec(container_id, command, environment or {}, timeout)]
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        TerminalBackend()
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        FakeBackend(mode="docker")
+
+def test_parse_latencies():
+    assert parse_latencies("create=800:200, exec=5,,") == {"create": (0.8, 0.2), "exec": (0.005, 0.0)}
+    assert parse_latencies("") == {}
+
+def test_create_writes_the_files_a_container_would(tmp_path):
+    log_dir = tmp_path / "logs"
+    backend = FakeBackend()
+    assert asyncio.run(create(backend, "t1", volumes(log_dir))) == "fake-t1"
+    assert sorted(os.listdir(log_dir)) == [".ready", "session.log"]
+    assert "Terminal t1 started" in (log_dir / "session.log").read_text()
+
+def test_echo_mode_lifecycle(tmp_path):
+    async def scenario():
+        backend = FakeBackend()
+        container_id = await create(backend, "t1", volumes(tmp_path))
+        items = await collect(backend, container_id, "make test")
+        logs = await backend.logs(container_id, 1)
+        return backend, items, logs, [await backend.destroy(container_id, False, 10) for _ in range(2)]
+
+    backend, items, logs, destroyed = asyncio.run(scenario())
+    assert items == [(STDOUT, b"make test\n"), (EXIT, 0)]
+    stamp, _, line = logs.partition(b" ")
+    assert stamp.endswith(b"Z") and line == b"make test\n"
+    assert destroyed == [True, False]
+    stats = backend.stats()
+    assert (stats["mode"], stats["terminals"]) == ("echo", 0)
+    assert stats["calls"] == {"create": 1, "exec": 1, "logs": 1, "destroy": 2}
+
+@pytest.mark.skipif(not shutil.which("sh"), reason="needs sh")
+def test_subprocess_mode_runs_on_the_host(tmp_path):
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+
+    async def scenario():
+        backend = FakeBackend(mode="subprocess")
+        container_id = await create(backend, "t1", volumes(tmp_path / "logs", workspace))
+        items = await collect(backend, container_id, 'echo "$NAME" > /workspace/out; cat /workspace/out; echo err >&2; exit 3',
+                              {"NAME": "agent"})
+        started = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            await collect(backend, container_id, "sleep 5; true", timeout=0.1)
+        return items, time.monotonic() - started
+
+    items, timed_out_after = asyncio.run(scenario())
+    assert items == [(STDOUT, b"agent\n"), (STDERR, b"err\n"), (EXIT, 3)]
+    # The shell's children were killed with it rather than left holding its pipes
+    assert timed_out_after < 2
+    # /workspace was rewritten to the bind mount's host path
+    assert (workspace / "out").read_text() == "agent\n"
+
+def test_injected_latency_is_repeatable_with_a_seed(tmp_path):
+    async def run(seed):
+        backend = FakeBackend(latencies={"create": (0.001, 0.002), "exec": (0.001, 0.0)}, seed=seed)
+        for terminal_id in ("t1", "t2", "t3"):
+            await collect(backend, await create(backend, terminal_id, volumes(tmp_path)), "true")
+        return backend.injected_seconds
+
+    first, again, other = asyncio.run(run(1)), asyncio.run(run(1)), asyncio.run(run(2))
+    assert first == again != other
+    assert 0.006 <= first <= 0.012
@@ -0,0 +1,150 @@
+import asyncio
+
+from log_hub import LogHub
+
+class Source:
+    """Log source fed by the test: put lines on ``lines``, None to end the stream"""
+
+    def __init__(self):
+        self.calls = []
+        self.lines = asyncio.Queue()
+
+    def __call__(self, after):
+        self.calls.append(after)
+        return self._read()
+
+    async def _read(self):
+        while True:
+            line = await self.lines.get()
+            if line is None:
+                return
+            yield line
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+def drain(subscriber):
+    entries = []
+    while not subscriber.queue.empty():
+        entries.append(subscriber.queue.get_nowait())
+    return entries
+
+def test_one_reader_fans_out_to_every_subscriber():
+    async def scenario():
+        source = Source()
+        hub = LogHub(source)
+        first, _ = hub.subscribe()
+        second, _ = hub.subscribe()
+        for line in ("a\n", "b\n"):
+            source.lines.put_nowait(line)
+        await settle()
+        entries = drain(first), drain(second)
+        await hub.close()
+        return source, entries
+
+    source, (first, second) = asyncio.run(scenario())
+    assert source.calls == [None]
+    assert first == second == [(0, "a\n"), (1, "b\n")]
+
+def test_late_subscribers_replay_from_an_offset():
+    async def scenario():
+        source = Source()
+        hub = LogHub(source, buffer_lines=2)
+        hub.subscribe()
+        for line in ("a\n", "b\n", "c\n"):
+            source.lines.put_nowait(line)
+        await settle()
+        replays = hub.subscribe()[1], hub.subscribe(since=2)[1]
+        await hub.close()
+        return replays
+
+    everything, since = asyncio.run(scenario())
+    # "a" fell out of the two-line ring buffer
+    assert everything == [(1, "b\n"), (2, "c\n")]
+    assert since == [(2, "c\n")]
+
+def test_reader_stops_after_linger_and_resumes_after_the_last_line():
+    async def scenario():
+        source = Source()
+        hub = LogHub(source, linger=0.01)
+        subscriber, _ = hub.subscribe()
+        source.lines.put_nowait("a\n")
+        await settle()
+        hub.unsubscribe(subscriber)
+        await asyncio.sleep(0.05)
+        stopped = not hub.stats()["reader_running"]
+        subscriber, _ = hub.subscribe()
+        source.lines.put_nowait("b\n")
+        await settle()
+        entries = drain(subscriber)
+        await hub.close()
+        return source, stopped, entries
+
+    source, stopped, entries = asyncio.run(scenario())
+    assert stopped
+    assert source.calls == [None, "a\n"]
+    # Offsets continue across the restart
+    assert entries == [(1, "b\n")]
+
+def test_resubscribing_within_linger_keeps_the_reader():
+    async def scenario():
+        source = Source()
+        hub = LogHub(source, linger=0.01)
+        subscriber, _ = hub.subscribe()
+        await settle()
+        hub.unsubscribe(subscriber)
+        hub.subscribe()
+        await asyncio.sleep(0.05)
+        running = hub.stats()["reader_running"]
+        await hub.close()
+        return source, running
+
+    source, running = asyncio.run(scenario())
+    assert running
+    assert source.calls == [None]
+
+def test_slow_consumers_lose_oldest_entries_or_are_disconnected():
+    async def scenario():
+        results = {}
+        for policy in ("drop", "disconnect"):
+            source = Source()
+            hub = LogHub(source, queue_size=2, slow_consumer_policy=policy)
+            subscriber, _ = hub.subscribe()
+            for line in ("a\n", "b\n", "c\n"):
+                source.lines.put_nowait(line)
+            await settle()
+            results[policy] = drain(subscriber), subscriber.close_reason, hub.stats()
+            await hub.close()
+        return results
+
+    results = asyncio.run(scenario())
+    entries, reason, stats = results["drop"]
+    assert entries == [(1, "b\n"), (2, "c\n")]
+    assert (reason, stats["dropped"]) == (None, 1)
+    entries, reason, stats = results["disconnect"]
+    assert entries == [None]
+    assert (reason, stats["disconnected"], stats["subscribers"]) == ("slow consumer", 1, 0)
+
+def test_end_of_stream_and_close_end_subscriptions():
+    async def scenario():
+        source = Source()
+        hub = LogHub(source)
+        subscriber, _ = hub.subscribe()
+        source.lines.put_nowait("a\n")
+        source.lines.put_nowait(None)
+        await settle()
+        ended = drain(subscriber), subscriber.close_reason
+        late, replay = hub.subscribe()
+        late_entries = drain(late), late.close_reason, replay
+
+        hub = LogHub(Source())
+        subscriber, _ = hub.subscribe()
+        await hub.close()
+        return ended, late_entries, (drain(subscriber), subscriber.close_reason)
+
+    ended, late, closed = asyncio.run(scenario())
+    # Closing discards what was still queued; it can be replayed from the buffer
+    assert ended == ([None], "terminal exited")
+    assert late == ([None], "terminal exited", [(0, "a\n")])
+    assert closed == ([None], "terminal destroyed")
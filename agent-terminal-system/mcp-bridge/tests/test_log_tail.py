@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from log_tail import LogCursor, read_since, tail_lines
+
+@pytest.fixture
+def log(tmp_path):
+    path = tmp_path / "session.log"
+    path.write_bytes(b"".join(f"line {i}\n".encode() for i in range(1, 11)))
+    return str(path)
+
+def test_tail_returns_last_lines_and_end_cursor(log):
+    text, cursor = tail_lines(log, 3, 1024 * 1024)
+    assert text == "line 8\nline 9\nline 10\n"
+    assert cursor.offset == os.path.getsize(log)
+    assert cursor.inode == os.stat(log).st_ino
+
+def test_tail_without_trailing_newline_and_short_files(tmp_path):
+    path = tmp_path / "log"
+    path.write_bytes(b"a\nb\nc")
+    assert tail_lines(str(path), 2, 1024)[0] == "b\nc"
+    assert tail_lines(str(path), 10, 1024)[0] == "a\nb\nc"
+    assert tail_lines(str(path), 0, 1024)[0] == ""
+
+def test_tail_is_capped_at_max_bytes(log):
+    assert tail_lines(log, 10, 8)[0] == "\nline 10\n"[-8:]
+
+def test_tail_spans_blocks(tmp_path):
+    path = tmp_path / "log"
+    path.write_bytes(b"x" * 200000 + b"\nlast\n")
+    assert tail_lines(str(path), 1, 1024 * 1024)[0] == "last\n"
+
+def test_cursor_round_trip_and_invalid():
+    cursor = LogCursor(123, 456)
+    decoded = LogCursor.decode(cursor.encode())
+    assert (decoded.inode, decoded.offset) == (123, 456)
+    with pytest.raises(ValueError):
+        LogCursor.decode("not-a-cursor")
+
+def test_read_since_returns_only_appended_text(log):
+    _, cursor = tail_lines(log, 1, 1024)
+    with open(log, "ab") as f:
+        f.write(b"line 11\n")
+    text, cursor, reset, more = read_since(log, cursor, 1024)
+    assert (text, reset, more) == ("line 11\n", False, False)
+    assert read_since(log, cursor, 1024)[0] == ""
+
+def test_read_since_pages_with_more(log):
+    text, cursor, _, more = read_since(log, LogCursor(os.stat(log).st_ino, 0), 7)
+    assert (text, more) == ("line 1\n", True)
+    assert read_since(log, cursor, 7)[0] == "line 2\n"
+
+def test_read_since_resets_after_truncation_or_rotation(log):
+    _, cursor = tail_lines(log, 1, 1024)
+    with open(log, "wb") as f:
+        f.write(b"new\n")
+    text, _, reset, _ = read_since(log, cursor, 1024)
+    assert (text, reset) == ("new\n", True)
+    rotated = LogCursor(cursor.inode + 1, 0)
+    assert read_since(log, rotated, 1024)[2] is True
+
+def test_read_since_never_splits_utf8(tmp_path):
+    path = tmp_path / "log"
+    path.write_bytes("aé".encode())
+    text, cursor, _, more = read_since(str(path), None, 2)
+    assert (text, cursor.offset, more) == ("a", 1, True)
+    assert read_since(str(path), cursor, 2)[0] == "é"
+
+def test_refuses_symlinks_and_fifos(tmp_path, log):
+    link = tmp_path / "link"
+    link.symlink_to(log)
+    with pytest.raises(OSError):
+        tail_lines(str(link), 1, 1024)
+    fifo = tmp_path / "fifo"
+    os.mkfifo(fifo)
+    with pytest.raises(OSError):
+        tail_lines(str(fifo), 1, 1024)
+    with pytest.raises(OSError):
+        read_since(str(fifo), None, 1024)
@@ -0,0 +1,47 @@
+import os
+
+from output_spool import CommandOutput, OutputSpool, prune_spool_dir, read_spooled
+
+def test_small_output_stays_in_memory(tmp_path):
+    spool = OutputSpool(str(tmp_path / "out"), threshold=10, excerpt_bytes=4)
+    spool.write(b"hello")
+    spool.close()
+    assert not spool.spilled
+    assert spool.text() == "hello"
+    assert not os.path.exists(tmp_path / "out")
+
+def test_large_output_spills_and_keeps_head_and_tail(tmp_path):
+    path = tmp_path / "spool" / "out"
+    spool = OutputSpool(str(path), threshold=10, excerpt_bytes=4)
+    for chunk in (b"0123456789", b"abcdefghij", b"KLMNOPQRST"):
+        spool.write(chunk)
+    spool.close()
+    assert spool.spilled
+    assert spool.size == 30
+    assert path.read_bytes() == b"0123456789abcdefghijKLMNOPQRST"
+    assert spool.text() == "0123\n... [22 bytes omitted] ...\nQRST"
+
+def test_command_output_spills_both_streams_and_reads_by_range(tmp_path):
+    output = CommandOutput(str(tmp_path), threshold=4, excerpt_bytes=2, max_outputs=5)
+    output.streams["stdout"].write(b"0123456789")
+    output.streams["stderr"].write(b"err")
+    output.close()
+    assert output.spilled
+    assert read_spooled(str(tmp_path), output.output_id, "stdout", 2, 3) == (b"234", 10)
+    # The small stream is spilled too, so both can be paged
+    assert read_spooled(str(tmp_path), output.output_id, "stderr", 0, 100) == (b"err", 3)
+
+def test_read_spooled_rejects_unknown_and_unsafe_ids(tmp_path):
+    assert read_spooled(str(tmp_path), "missing", "stdout", 0, 10) is None
+    assert read_spooled(str(tmp_path), "../etc", "stdout", 0, 10) is None
+    assert read_spooled(str(tmp_path), "abc", "passwd", 0, 10) is None
+
+def test_prune_keeps_newest_outputs(tmp_path):
+    for i, output_id in enumerate(("old", "mid", "new")):
+        for stream in ("stdout", "stderr"):
+            path = tmp_path / f"{output_id}.{stream}"
+            path.write_bytes(b"x")
+            os.utime(path, (i, i))
+    prune_spool_dir(str(tmp_path), 2)
+    assert sorted(os.listdir(tmp_path)) == ["mid.stderr", "mid.stdout", "new.stderr", "new.stdout"]
+    prune_spool_dir(str(tmp_path / "missing"), 2)
@@ -0,0 +1,38 @@
+import pytest
+
+from rate_limiter import RateLimiter, TokenBucket
+
+def test_bucket_allows_burst_then_reports_wait():
+    bucket = TokenBucket(rate=2.0, burst=3, now=0.0)
+    assert [bucket.take(0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take(0.0) == pytest.approx(0.5)
+
+def test_bucket_refills_at_rate_up_to_burst():
+    bucket = TokenBucket(rate=1.0, burst=2, now=0.0)
+    bucket.take(0.0)
+    bucket.take(0.0)
+    assert bucket.take(1.0) == 0.0
+    assert bucket.take(1.0) > 0
+    assert not bucket.idle(1.0)
+    assert bucket.idle(100.0)
+    # Refill is capped at burst
+    assert [bucket.take(100.0) for _ in range(3)][2] > 0
+
+def test_limiter_keeps_buckets_per_agent_and_class():
+    limiter = RateLimiter({"default": (60, 1), "exec": (60, 2)})
+    assert limiter.check("a", "exec") == 0
+    assert limiter.check("a", "exec") == 0
+    assert limiter.check("a", "exec") > 0
+    # Other agents and classes have their own buckets
+    assert limiter.check("b", "exec") == 0
+    assert limiter.check("a", "logs") == 0
+    assert limiter.check("a", "logs") > 0
+
+def test_limiter_prunes_idle_buckets():
+    limiter = RateLimiter({"default": (60000, 1)}, max_buckets=2)
+    limiter.check("a", "default")
+    limiter.check("b", "default")
+    limiter._buckets[("a", "default")].updated -= 10
+    limiter._buckets[("b", "default")].updated -= 10
+    limiter.check("c", "default")
+    assert set(limiter._buckets) == {("c", "default")}
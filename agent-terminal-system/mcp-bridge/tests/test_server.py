@@ -0,0 +1,196 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+for module in ("docker", "fakeredis", "fastapi", "jwt", "prometheus_client", "redis", "uvicorn", "websockets"):
+    pytest.importorskip(module)
+
+import docker
+import fakeredis
+from fastapi import HTTPException
+
+import server
+from admission import COMMITTED_KEY, AdmissionController
+from expiry_scheduler import ExpiryScheduler
+from shared_state import EXPIRY_KEY, SharedTerminalState
+from terminal_registry import TerminalRecord, TerminalRegistry
+
+GIB = 1024 ** 3
+
+def record(terminal_id="t1", agent_id="a"):
+    return TerminalRecord(terminal_id, agent_id, f"c-{terminal_id}", "running", "2024-01-01T00:00:00", "/logs", "bash")
+
+@pytest.fixture
+def unready_terminal(monkeypatch):
+    """A created terminal whose readiness probe raises the given error; returns the terminals destroyed"""
+    destroyed = []
+
+    async def create_agent_terminal(*args):
+        return record()
+
+    async def destroy_terminal(terminal_id, force=False):
+        destroyed.append((terminal_id, force))
+        return True
+
+    monkeypatch.setattr(server, "create_agent_terminal", create_agent_terminal)
+    monkeypatch.setattr(server, "destroy_terminal", destroy_terminal)
+
+    def probe_raises(error):
+        async def stream_command_output(*args, **kwargs):
+            raise error
+            yield
+        monkeypatch.setattr(server, "stream_command_output", stream_command_output)
+        return destroyed
+    return probe_raises
+
+@pytest.mark.parametrize("error, status_code", [
+    (asyncio.TimeoutError(), 504),
+    (docker.errors.NotFound("container died"), 500),
+    (server.DockerBusy("exec", 10), 503),
+])
+def test_unready_terminal_is_destroyed(unready_terminal, error, status_code):
+    destroyed = unready_terminal(error)
+    request = server.TerminalCreateRequest(agent_id="a", wait_ready=True)
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(server.create_terminal(request, {"agent_id": "a"}))
+    assert excinfo.value.status_code == status_code
+    assert "t1" in excinfo.value.detail
+    assert destroyed == [("t1", True)]
+
+class InlineOps:
+    async def run(self, op, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+class Docker:
+    """The docker-py calls recover_terminals makes, over a fixed container list"""
+
+    def __init__(self):
+        self.listed = []
+        self.removed = []
+        self.containers = SimpleNamespace(list=lambda **kwargs: list(self.listed))
+        self.api = SimpleNamespace(remove_container=lambda container_id, force: self.removed.append(container_id))
+
+    def add(self, name, state="running", age=3600, labels=None):
+        self.listed.append(SimpleNamespace(id=f"id-{name}", attrs={
+            "Names": [f"/{name}"], "State": state, "Created": time.time() - age, "Labels": labels or {}
+        }))
+
+@pytest.fixture
+def restart(monkeypatch):
+    """A bridge starting up against a stand-in Docker and a fakeredis that a previous run left state in"""
+    redis_client = fakeredis.FakeRedis()
+    client = Docker()
+    monkeypatch.setattr(server, "docker_ops", InlineOps())
+    monkeypatch.setattr(server, "docker_client", client)
+    monkeypatch.setattr(server, "redis_client", redis_client)
+    monkeypatch.setattr(server, "terminals", TerminalRegistry())
+    monkeypatch.setattr(server, "expiry", ExpiryScheduler())
+    monkeypatch.setattr(server, "admission", AdmissionController(64 * GIB, 64.0, redis_client=redis_client))
+    monkeypatch.setattr(server, "shared_state", None)
+
+    def persist(terminal_id, agent_id="a"):
+        terminal = record(terminal_id, agent_id)
+        server.set_deadline(terminal, time.time() + 3600)
+        redis_client.set(f"terminal:{terminal_id}", json.dumps(terminal.to_dict()))
+    return SimpleNamespace(redis=redis_client, docker=client, persist=persist)
+
+def test_recovery_releases_capacity_of_terminals_it_does_not_adopt(restart):
+    previous_run = AdmissionController(64 * GIB, 64.0, redis_client=restart.redis)
+    for terminal_id in ("live", "exited", "orphan", "expired", "vanished"):
+        previous_run.reserve(terminal_id, GIB, 1.0)
+    # Committed before the grace period; its record expired and its container is gone
+    restart.redis.hset(COMMITTED_KEY, "expired", f"{GIB} 1.0 0")
+    restart.persist("live")
+    restart.docker.add("mcp-terminal-live")
+    restart.persist("exited")
+    restart.docker.add("mcp-terminal-exited", state="exited")
+    restart.docker.add("mcp-terminal-orphan")
+    restart.persist("vanished")
+
+    asyncio.run(server.recover_terminals())
+    assert server.terminals.get("live").status == "running"
+    assert sorted(restart.docker.removed) == ["id-mcp-terminal-exited", "id-mcp-terminal-orphan"]
+    assert restart.redis.hkeys(COMMITTED_KEY) == [b"live"]
+    assert server.admission.memory_committed == GIB
+
+def test_shared_recovery_frees_slots_of_terminals_without_records(restart, monkeypatch):
+    monkeypatch.setattr(server, "shared_state", SharedTerminalState(restart.redis, "node"))
+    restart.persist("live")
+    restart.docker.add("mcp-terminal-live")
+    # Its record expired while the bridge was down
+    restart.docker.add("mcp-terminal-reaped")
+    restart.redis.sadd("agent:a:terminals", "live", "reaped", "gone", "creating")
+    restart.redis.sadd("agent:b:terminals", "gone")
+    restart.redis.zadd(EXPIRY_KEY, {"live": 1, "reaped": 1, "gone": 1})
+
+    asyncio.run(server.recover_terminals())
+    assert restart.docker.removed == ["id-mcp-terminal-reaped"]
+    # A reserved slot without an expiry entry may be a create in flight elsewhere
+    assert restart.redis.smembers("agent:a:terminals") == {b"live", b"creating"}
+    assert restart.redis.smembers("agent:b:terminals") == set()
+    assert restart.redis.zrange(EXPIRY_KEY, 0, -1) == [b"live"]
+    assert server.shared_state.running_count() == 1
+
+def test_invalidations_from_other_workers_update_the_local_cache(monkeypatch):
+    monkeypatch.setattr(server, "terminals", TerminalRegistry())
+    monkeypatch.setattr(server, "expiry", ExpiryScheduler())
+    monkeypatch.setattr(server, "token_cache", server.TokenCache())
+    for terminal_id in ("t1", "t2", "t3"):
+        server.terminals.add(record(terminal_id))
+        server.expiry.schedule(terminal_id, 100)
+
+    async def scenario():
+        await server.handle_invalidation({"op": "delete", "terminal_id": "t1", "origin": server.node_id})
+        await server.handle_invalidation({"op": "delete", "terminal_id": "t2", "origin": "other"})
+        await server.handle_invalidation({"op": "update", "terminal_id": "t3", "deadline": 200, "origin": "other"})
+        await server.handle_invalidation({"op": "revoke_token", "digest": "d", "until": time.time() + 60, "origin": "other"})
+
+    asyncio.run(scenario())
+    # Our own messages are ignored; others' drop the record so it is re-read from Redis
+    assert "t1" in server.terminals
+    assert "t2" not in server.terminals and "t3" not in server.terminals
+    assert len(server.expiry) == 2
+    assert server.token_cache.is_revoked("d")
+
+def test_recovery_spares_young_pool_containers_without_liveness(restart):
+    restart.docker.add("mcp-terminal-pool-old", labels={"mcp-bridge.node": "gone"})
+    restart.docker.add("mcp-terminal-pool-new", age=5, labels={"mcp-bridge.node": "other-worker"})
+    asyncio.run(server.recover_terminals())
+    assert restart.docker.removed == ["id-mcp-terminal-pool-old"]
+
+def test_shared_recovery_reaps_pool_containers_of_dead_nodes(restart, monkeypatch):
+    monkeypatch.setattr(server, "shared_state", SharedTerminalState(restart.redis, "node"))
+    SharedTerminalState(restart.redis, "alive").heartbeat(30)
+    restart.docker.add("mcp-terminal-pool-alive", labels={"mcp-bridge.node": "alive"})
+    restart.docker.add("mcp-terminal-pool-dead", age=5, labels={"mcp-bridge.node": "dead"})
+    asyncio.run(server.recover_terminals())
+    assert restart.docker.removed == ["id-mcp-terminal-pool-dead"]
+
+@pytest.fixture
+def batch_commands(monkeypatch):
+    async def execute_command_in_terminal(terminal_id, command, timeout, session):
+        if command == "busy":
+            raise server.DockerBusy("exec", 10)
+        if command == "crash":
+            raise RuntimeError("socket closed")
+        if command == "slow":
+            raise HTTPException(status_code=504, detail="Command timed out after 1s")
+        return server.ExecuteResponse(output=f"{command}\n", error="", exit_code=0 if command != "false" else 1,
+                                      execution_time=0.0)
+    monkeypatch.setattr(server, "execute_command_in_terminal", execute_command_in_terminal)
+
+@pytest.mark.parametrize("mode", ["sequential", "parallel"])
+def test_batch_reports_each_failed_command_and_keeps_the_rest(batch_commands, mode):
+    commands = ["echo", "busy", "crash", "slow", "false", "echo"]
+    response = asyncio.run(server.execute_batch_in_terminal("t1", commands, mode, stop_on_error=False))
+    assert [result.status for result in response.results] == ["ok", "error", "error", "timeout", "failed", "ok"]
+    assert "Docker API busy" in response.results[1].error
+    assert response.results[2].error == "socket closed"
+    assert (response.succeeded, response.failed, response.skipped) == (2, 4, 0)
+
+def test_batch_stops_after_an_unexpected_error(batch_commands):
+    response = asyncio.run(server.execute_batch_in_terminal("t1", ["echo", "busy", "echo"], stop_on_error=True))
+    assert [result.status for result in response.results] == ["ok", "error", "skipped"]
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from shared_state import EXPIRY_KEY, INVALIDATION_CHANNEL, SharedTerminalState
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+@pytest.fixture
+def state(redis_client):
+    return SharedTerminalState(redis_client, "node-1")
+
+def test_reserve_enforces_the_per_agent_limit(state, redis_client):
+    assert state.reserve("a", "t1", 2)
+    assert state.reserve("a", "t2", 2)
+    assert not state.reserve("a", "t3", 2)
+    assert state.reserve("b", "t4", 2)
+    state.release("a", "t1")
+    assert state.reserve("a", "t3", 2)
+    assert redis_client.smembers("agent:a:terminals") == {b"t2", b"t3"}
+
+def test_list_agent_skips_terminals_without_a_record(state, redis_client):
+    for terminal_id in ("t2", "t1", "t3"):
+        state.reserve("a", terminal_id, 5)
+    redis_client.set("terminal:t1", json.dumps({"terminal_id": "t1"}))
+    redis_client.set("terminal:t3", json.dumps({"terminal_id": "t3"}))
+    assert [record["terminal_id"] for record in state.list_agent("a")] == ["t1", "t3"]
+    assert state.list_agent("nobody") == []
+    assert state.load("t1") == {"terminal_id": "t1"}
+    assert state.load("t2") is None
+
+def test_exactly_one_worker_claims_an_expiry(redis_client):
+    first = SharedTerminalState(redis_client, "node-1")
+    second = SharedTerminalState(redis_client, "node-2")
+    first.schedule_expiry("t1", 100)
+    assert first.claim_expiry("t1", 100) == 0
+    assert second.claim_expiry("t1", 100) == -1
+    assert first.running_count() == 0
+
+def test_extended_expiry_is_not_claimed_early(state):
+    state.schedule_expiry("t1", 100)
+    state.extend_expiry("t1", 200)
+    # Extensions never move a deadline earlier, nor schedule a cancelled one
+    state.extend_expiry("t1", 150)
+    state.extend_expiry("t2", 150)
+    assert state.claim_expiry("t1", 120) == 200
+    state.schedule_expiry("t1", 300, only_new=True)
+    assert state.claim_expiry("t1", 200) == 0
+    state.schedule_expiry("t1", 100)
+    state.cancel_expiry("t1")
+    assert state.claim_expiry("t1", 200) == -1
+    assert state.running_count() == 0
+
+def test_node_liveness_follows_heartbeats(redis_client, state):
+    state.heartbeat(30)
+    assert state.node_alive("node-1")
+    assert not state.node_alive("node-2")
+    assert 0 < redis_client.ttl("mcp-bridge:node:node-1") <= 30
+
+def test_changes_and_revocations_are_published(redis_client, state):
+    pubsub = redis_client.pubsub()
+    pubsub.subscribe(INVALIDATION_CHANNEL)
+    pubsub.get_message(timeout=1)
+    state.publish("update", "t1", 123.0)
+    state.publish("delete", "t1")
+    state.publish_revocation("digest", 456.0)
+    messages = []
+    while len(messages) < 3:
+        message = pubsub.get_message(timeout=1)
+        assert message is not None
+        messages.append(json.loads(message["data"]))
+    assert messages == [
+        {"op": "update", "terminal_id": "t1", "deadline": 123.0, "origin": "node-1"},
+        {"op": "delete", "terminal_id": "t1", "deadline": None, "origin": "node-1"},
+        {"op": "revoke_token", "digest": "digest", "until": 456.0, "origin": "node-1"},
+    ]
+
+def test_forget_orphaned_terminals(redis_client, state):
+    state.reserve("a", "live", 5)
+    state.reserve("a", "gone", 5)
+    state.reserve("b", "gone", 5)
+    for terminal_id in ("live", "gone", "recorded"):
+        state.schedule_expiry(terminal_id, 100)
+    redis_client.set("terminal:recorded", "{}")
+    orphaned = state.orphaned_expiries({"live"})
+    assert orphaned == ["gone"]
+    state.forget(orphaned)
+    state.forget([])
+    assert redis_client.smembers("agent:a:terminals") == {b"live"}
+    assert redis_client.smembers("agent:b:terminals") == set()
+    assert sorted(redis_client.zrange(EXPIRY_KEY, 0, -1)) == [b"live", b"recorded"]
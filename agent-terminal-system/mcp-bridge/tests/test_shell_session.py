@@ -0,0 +1,185 @@
+import asyncio
+import functools
+import os
+import shutil
+import socket
+import struct
+import subprocess
+import threading
+
+import pytest
+
+from shell_session import EXIT, STDERR, STDOUT, ShellSession
+
+pytestmark = pytest.mark.skipif(not (shutil.which("bash") and shutil.which("setsid")), reason="needs bash and setsid")
+
+# exec_start's socket argument shadows the module
+_socketpair = socket.socketpair
+_SHUT_WR = socket.SHUT_WR
+
+class LocalExecApi:
+    """The docker-py exec calls a ShellSession makes, run as local processes
+
+    ``exec_start(socket=True)`` returns one end of a socketpair carrying the
+    process's stdin, and its stdout and stderr in Docker's multiplexed frames.
+    """
+
+    def __init__(self):
+        self.execs = {}
+
+    def exec_create(self, container_id, cmd, environment=None, **kwargs):
+        exec_id = str(len(self.execs))
+        self.execs[exec_id] = {"cmd": cmd, "environment": environment or {}}
+        return {"Id": exec_id}
+
+    def exec_start(self, exec_id, socket=False):
+        info = self.execs[exec_id]
+        env = {**os.environ, **info["environment"]}
+        if not socket:
+            subprocess.run(info["cmd"], env=env)
+            return b""
+        ours, theirs = _socketpair()
+        process = info["process"] = subprocess.Popen(
+            info["cmd"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env
+        )
+        send_lock = threading.Lock()
+
+        def forward_stdin():
+            while True:
+                data = theirs.recv(65536)
+                if not data:
+                    break
+                try:
+                    process.stdin.write(data)
+                    process.stdin.flush()
+                except BrokenPipeError:
+                    break
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+        def forward_output(pipe, stream):
+            while True:
+                data = os.read(pipe.fileno(), 65536)
+                if not data:
+                    break
+                with send_lock:
+                    try:
+                        theirs.sendall(struct.pack(">BxxxL", stream, len(data)) + data)
+                    except OSError:
+                        break
+
+        def finish(stdin_thread, output_threads):
+            for thread in output_threads:
+                thread.join()
+            process.wait()
+            theirs.shutdown(_SHUT_WR)
+            stdin_thread.join()
+            theirs.close()
+
+        stdin_thread = threading.Thread(target=forward_stdin, daemon=True)
+        output_threads = [
+            threading.Thread(target=forward_output, args=(process.stdout, STDOUT), daemon=True),
+            threading.Thread(target=forward_output, args=(process.stderr, STDERR), daemon=True),
+        ]
+        for thread in [stdin_thread] + output_threads:
+            thread.start()
+        threading.Thread(target=finish, args=(stdin_thread, output_threads), daemon=True).start()
+        return ours
+
+    def exec_inspect(self, exec_id):
+        process = self.execs[exec_id]["process"]
+        process.wait(timeout=5)
+        return {"ExitCode": process.returncode}
+
+async def run_blocking(func, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+def session(environment=None):
+    return ShellSession(LocalExecApi(), "container", environment, run_blocking)
+
+def test_shell_state_carries_over_between_commands():
+    async def scenario():
+        shell = session({"GREETING": "hi"})
+        try:
+            assert await shell.run("cd /tmp && export NAME=agent") == (b"", b"", 0)
+            return await shell.run('pwd; echo "$GREETING $NAME"')
+        finally:
+            await shell.kill()
+
+    assert asyncio.run(scenario()) == (b"/tmp\nhi agent\n", b"", 0)
+
+def test_streams_and_exit_codes_are_framed_per_command():
+    async def scenario():
+        shell = session()
+        try:
+            results = [
+                await shell.run("echo out; echo err >&2; false"),
+                await shell.run("printf 'no trailing newline'"),
+                # Output that looks like the start of a sentinel is passed through
+                await shell.run("printf '\\n__MCP_DONE_x'; (exit 7)"),
+            ]
+            return results, shell.commands_run
+        finally:
+            await shell.kill()
+
+    results, commands_run = asyncio.run(scenario())
+    assert results == [
+        (b"out\n", b"err\n", 1),
+        (b"no trailing newline", b"", 0),
+        (b"\n__MCP_DONE_x", b"", 7),
+    ]
+    # One more for the "echo $$" that finds the shell's pid
+    assert commands_run == 4
+
+def test_output_is_streamed_before_the_command_ends():
+    async def scenario():
+        shell = session()
+        try:
+            items = []
+            async for stream, data in shell.stream("echo first; sleep 0.2; echo second"):
+                items.append((stream, data, asyncio.get_running_loop().time()))
+            return items
+        finally:
+            await shell.kill()
+
+    items = asyncio.run(scenario())
+    assert b"".join(data for stream, data, _ in items if stream == STDOUT) == b"first\nsecond\n"
+    assert items[-1][:2] == (EXIT, 0)
+    first = next(at for stream, data, at in items if stream == STDOUT)
+    assert items[-1][2] - first >= 0.15
+
+def test_timeout_kills_the_session_and_the_next_command_restarts_it():
+    async def scenario():
+        shell = session()
+        await shell.run("true")
+        first_pid = shell.pid
+        with pytest.raises(asyncio.TimeoutError):
+            await shell.run("sleep 5", timeout=0.3)
+        assert not shell.alive
+        try:
+            assert await shell.run("echo back") == (b"back\n", b"", 0)
+            return shell.api, first_pid, shell.pid
+        finally:
+            await shell.kill()
+
+    api, first_pid, second_pid = asyncio.run(scenario())
+    assert first_pid != second_pid
+    # The first shell was killed, not left running
+    assert api.execs["0"]["process"].wait(timeout=5) == -9
+
+def test_command_that_exits_the_shell_reports_its_exit_code():
+    async def scenario():
+        shell = session()
+        try:
+            result = await shell.run("echo bye; exit 3")
+            alive = shell.alive
+            return result, alive, await shell.run("echo again")
+        finally:
+            await shell.kill()
+
+    result, alive, again = asyncio.run(scenario())
+    assert result == (b"bye\n", b"", 3)
+    assert not alive
+    assert again == (b"again\n", b"", 0)
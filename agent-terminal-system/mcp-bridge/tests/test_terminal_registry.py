@@ -0,0 +1,36 @@
+from terminal_registry import TerminalRecord, TerminalRegistry
+
+def record(terminal_id, agent_id="a", status="running"):
+    return TerminalRecord(terminal_id, agent_id, f"c-{terminal_id}", status, "2024-01-01T00:00:00", "/logs", "bash")
+
+def test_counts_follow_status_changes():
+    registry = TerminalRegistry()
+    registry.add(record("t1"))
+    registry.add(record("t2"))
+    registry.add(record("t3", agent_id="b"))
+    registry.set_status("t2", "paused")
+    assert registry.running_count("a") == 2
+    assert registry.running_count() == 3
+    registry.set_status("t1", "stopping")
+    assert registry.running_count("a") == 1
+    assert registry.status_counts() == {"stopping": 1, "paused": 1, "running": 1}
+    assert registry.by_container("c-t3").terminal_id == "t3"
+
+def test_tombstones_are_capped():
+    registry = TerminalRegistry(max_tombstones=1)
+    registry.add(record("t1"))
+    registry.add(record("t2"))
+    registry.set_status("t1", "destroyed")
+    registry.set_status("t2", "destroyed")
+    assert "t1" not in registry
+    assert registry.get("t2").status == "destroyed"
+    assert registry.by_agent("a") == [registry.get("t2")]
+
+def test_environment_is_not_serialized():
+    terminal = record("t1")
+    terminal.environment = {"API_KEY": "secret"}
+    data = terminal.to_dict()
+    assert "environment" not in data
+    restored = TerminalRecord.from_dict({**data, "environment": {"API_KEY": "secret"}})
+    assert restored.environment == {}
+    assert restored.container_id == "c-t1"
@@ -0,0 +1,83 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import token_cache
+from token_cache import TokenCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(token_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+def test_entries_expire_after_max_ttl(clock):
+    cache = TokenCache(max_ttl=300)
+    cache.put("d", {"agent_id": "a", "exp": 5000})
+    clock[0] += 299
+    assert cache.get("d") == {"agent_id": "a", "exp": 5000}
+    clock[0] += 1
+    assert cache.get("d") is None
+    assert cache.stats()["size"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_entries_never_outlive_the_token(clock):
+    cache = TokenCache(max_ttl=300)
+    cache.put("d", {"exp": 1010})
+    clock[0] = 1009
+    assert cache.get("d") is not None
+    clock[0] = 1010
+    assert cache.get("d") is None
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TokenCache(max_size=2)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    cache.get("a")
+    cache.put("c", {"n": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.get("c") == {"n": 3}
+
+def test_revoked_tokens_are_dropped_until_they_expire(clock):
+    cache = TokenCache()
+    cache.put("d", {"exp": 2000})
+    cache.revoke("d", 2000)
+    assert cache.get("d") is None
+    assert cache.is_revoked("d")
+    clock[0] = 2000
+    assert not cache.is_revoked("d")
+    cache.revoke("other", 3000)
+    assert cache.stats()["revoked"] == 1
+
+def test_concurrent_readers_of_an_expired_entry(monkeypatch):
+    cache = TokenCache()
+    cache.put("d", {"exp": 0})
+    # Both readers check the clock before either drops the entry, unless
+    # the cache serializes them (then the first one waits out the barrier)
+    barrier = threading.Barrier(2, timeout=0.2)
+
+    def time():
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        return 1000.0
+
+    monkeypatch.setattr(token_cache, "time", SimpleNamespace(time=time))
+    errors = []
+
+    def reader():
+        try:
+            cache.get("d")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert cache.misses == 2
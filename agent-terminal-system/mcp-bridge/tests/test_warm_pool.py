@@ -0,0 +1,157 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+for module in ("docker", "fakeredis", "fastapi", "jwt", "prometheus_client", "redis", "uvicorn", "websockets"):
+    pytest.importorskip(module)
+
+import docker
+import fakeredis
+from prometheus_client import REGISTRY
+
+import server
+from expiry_scheduler import ExpiryScheduler
+from terminal_backend import FakeBackend
+from terminal_registry import TerminalRegistry
+
+class Container:
+    def __init__(self, name):
+        self.id = f"id-{name}"
+        self.name = name
+        self.removed = False
+
+    def rename(self, name):
+        self.name = name
+
+    def remove(self, force=False):
+        self.removed = True
+
+class Containers:
+    def __init__(self):
+        self.started = []
+        self.error = None
+
+    def run(self, image, name, **kwargs):
+        if self.error:
+            raise self.error
+        container = Container(name)
+        self.started.append(container)
+        return container
+
+class InlineOps:
+    async def run(self, op, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+@pytest.fixture
+def bridge(monkeypatch, tmp_path):
+    """server with Docker calls run inline against a stand-in client, FakeBackend creates and fakeredis"""
+    client = SimpleNamespace(containers=Containers())
+    monkeypatch.setattr(server.config, "LOG_BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(server, "docker_ops", InlineOps())
+    monkeypatch.setattr(server, "docker_client", client)
+    monkeypatch.setattr(server, "backend", FakeBackend())
+    monkeypatch.setattr(server, "redis_client", fakeredis.FakeRedis())
+    monkeypatch.setattr(server, "terminals", TerminalRegistry())
+    monkeypatch.setattr(server, "expiry", ExpiryScheduler())
+    monkeypatch.setattr(server, "warm_pools", {})
+    for name in ("admission", "shared_state", "dependency_cache", "workspaces"):
+        monkeypatch.setattr(server, name, None)
+    return client
+
+async def until(condition):
+    for _ in range(1000):
+        if condition():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("condition not met")
+
+def claims(profile, result):
+    return REGISTRY.get_sample_value("mcp_bridge_warm_pool_claims_total", {"profile": profile, "result": result}) or 0
+
+def test_claim_counts_hits_and_misses_and_asks_for_refill_at_low_watermark():
+    pool = server.WarmPool("image", "claim-test", 1, 3)
+    pool._idle = [{"container": name} for name in ("a", "b", "c")]
+    assert pool.claim()["container"] == "c"
+    assert not pool._refill_needed.is_set()
+    assert pool.claim()["container"] == "b"
+    assert pool._refill_needed.is_set()
+    pool.claim()
+    assert pool.claim() is None
+    stats = pool.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (3, 1, 0.75)
+    assert (claims("claim-test", "hit"), claims("claim-test", "miss")) == (3, 1)
+
+def test_refills_to_high_watermark_after_dropping_to_low(bridge):
+    async def scenario():
+        pool = server.WarmPool("image", "default", 1, 3)
+        task = asyncio.create_task(pool.run())
+        await until(lambda: pool.stats()["idle"] == 3)
+        pool.claim()
+        await asyncio.sleep(0)
+        # Above the low watermark: no refill yet
+        assert pool.stats()["created"] == 3
+        pool.claim()
+        await until(lambda: pool.stats()["idle"] == 3)
+        task.cancel()
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert pool.stats()["created"] == 5
+    container = bridge.containers.started[0]
+    assert container.name.startswith("mcp-terminal-pool-")
+    assert os.path.isdir(os.path.join(server.config.LOG_BASE_DIR, ".pool", container.name[len("mcp-terminal-pool-"):]))
+
+def test_refill_failure_is_counted(bridge):
+    bridge.containers.error = docker.errors.APIError("no space left")
+
+    async def scenario():
+        pool = server.WarmPool("image", "default", 1, 3)
+        task = asyncio.create_task(pool.run())
+        await until(lambda: pool.stats()["failures"] == 1)
+        task.cancel()
+        return pool
+
+    assert asyncio.run(scenario()).stats()["idle"] == 0
+
+def test_drain_removes_every_idle_container(bridge):
+    pool = server.WarmPool("image", "default", 1, 3)
+    containers = [Container("a"), Container("b")]
+    pool._idle = [{"container": container} for container in containers]
+    asyncio.run(pool.drain())
+    assert all(container.removed for container in containers)
+    assert pool.stats()["idle"] == 0
+
+def test_create_claims_a_pooled_container(bridge, tmp_path):
+    pool = server.WarmPool(server.config.TERMINAL_IMAGE, "default", 1, 3)
+    pool_dir = tmp_path / ".pool" / "p1"
+    pool_dir.mkdir(parents=True)
+    container = Container("mcp-terminal-pool-p1")
+    pool._idle = [{"container": container, "pool_dir": str(pool_dir)}]
+    server.warm_pools[(server.config.TERMINAL_IMAGE, "default")] = pool
+
+    record = asyncio.run(server.start_agent_terminal("t1", "a", "bash", {}, "default", 3600, False))
+    assert record.pooled
+    assert record.container_id == container.id
+    assert container.name == "mcp-terminal-t1"
+    assert not pool_dir.exists()
+    assert sorted(os.listdir(record.log_dir)) == [".ready", "session.log"]
+    assert server.terminals.get("t1") is record
+
+def test_create_falls_back_to_a_new_container_on_a_miss(bridge):
+    pool = server.WarmPool(server.config.TERMINAL_IMAGE, "default", 1, 3)
+    server.warm_pools[(server.config.TERMINAL_IMAGE, "default")] = pool
+
+    record = asyncio.run(server.start_agent_terminal("t1", "a", "bash", {}, "default", 3600, False))
+    assert not record.pooled
+    assert record.container_id == "fake-t1"
+    assert pool.stats()["misses"] == 1
+
+def test_custom_environment_skips_the_pool(bridge):
+    pool = server.WarmPool(server.config.TERMINAL_IMAGE, "default", 1, 3)
+    server.warm_pools[(server.config.TERMINAL_IMAGE, "default")] = pool
+
+    record = asyncio.run(server.start_agent_terminal("t1", "a", "bash", {"API_KEY": "x"}, "default", 3600, False))
+    assert not record.pooled
+    assert pool.stats()["hits"] + pool.stats()["misses"] == 0
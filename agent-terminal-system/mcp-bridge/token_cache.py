@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Verified Token Cache
+LRU cache of verified JWT payloads so repeat requests skip signature checks
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+class TokenCache:
+    """Verified JWT payloads keyed by the SHA-256 digest of the token
+
+    An entry lives until the token's ``exp`` or ``max_ttl`` seconds after it
+    was verified, whichever comes first, and at most ``max_size`` entries
+    are kept (least recently used evicted first). Revoked digests are
+    remembered until the token would have expired anyway, so a revoked
+    token is refused even if it is presented again.
+
+    ``verify_token`` runs on FastAPI's threadpool, so every method takes a
+    lock.
+    """
+
+    def __init__(self, max_size: int = 10000, max_ttl: float = 300):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.time():
+                self._entries.pop(digest, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, digest: str, payload: Dict[str, Any]):
+        expires_at = min(payload.get("exp", float("inf")), time.time() + self.max_ttl)
+        with self._lock:
+            self._entries[digest] = (expires_at, payload)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def revoke(self, digest: str, until: float):
+        """Drop a token and refuse it until ``until`` (epoch seconds)"""
+        now = time.time()
+        with self._lock:
+            self._entries.pop(digest, None)
+            self._revoked = {key: expiry for key, expiry in self._revoked.items() if expiry > now}
+            self._revoked[digest] = until
+
+    def is_revoked(self, digest: str) -> bool:
+        with self._lock:
+            return self._revoked.get(digest, 0) > time.time()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "revoked": len(self._revoked)
+            }
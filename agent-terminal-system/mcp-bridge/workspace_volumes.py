@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Agent Workspace Volumes
+Named Docker volumes that keep an agent's workspace across its terminals
+"""
+
+import hashlib
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import docker
+
+logger = logging.getLogger(__name__)
+
+# Volume name -> last use (epoch seconds), and volume name -> measured bytes
+LAST_USED_KEY = "workspaces:last_used"
+SIZES_KEY = "workspaces:size_bytes"
+
+class WorkspaceQuotaExceeded(Exception):
+    """An agent's workspace was last measured above the size quota"""
+
+class WorkspaceManager:
+    """One named volume per agent, mounted at the same path in each of its terminals
+
+    Last use and measured size of every volume are kept in Redis, so all
+    workers share them. Docker's local volume driver cannot cap a volume's
+    size, so the quota applies to measured usage: a workspace is measured
+    with ``du`` when a terminal using it is destroyed, and one over quota
+    is not mounted again until the agent deletes it. Whenever a new volume
+    is created, volumes unused for ``evict_after`` seconds and the least
+    recently used beyond ``max_volumes`` are removed. Docker refuses to
+    remove a volume that is still mounted, so those are skipped.
+    """
+
+    def __init__(self, api, redis_client, run: Callable[..., Awaitable[Any]], mount_path: str,
+                 quota_bytes: int, max_volumes: int, evict_after: float):
+        self.api = api
+        self.redis = redis_client
+        self.run = run
+        self.mount_path = mount_path
+        self.quota_bytes = quota_bytes
+        self.max_volumes = max_volumes
+        self.evict_after = evict_after
+        self.evicted_total = 0
+
+    @staticmethod
+    def volume_name(agent_id: str) -> str:
+        """Docker-safe volume name; the hash keeps agent ids that sanitize alike apart"""
+        slug = re.sub(r"[^a-zA-Z0-9_.-]", "-", agent_id)[:40]
+        digest = hashlib.sha256(agent_id.encode("utf-8")).hexdigest()[:12]
+        return f"mcp-workspace-{slug}-{digest}"
+
+    async def acquire(self, agent_id: str) -> Dict[str, Dict[str, str]]:
+        """Create the agent's volume if needed and return its ``volumes`` entry for containers.run"""
+        name = self.volume_name(agent_id)
+        size = self.redis.hget(SIZES_KEY, name)
+        if size is not None and int(size) > self.quota_bytes:
+            raise WorkspaceQuotaExceeded(
+                f"Workspace uses {int(size)} bytes, over its {self.quota_bytes} byte quota; delete it to start over"
+            )
+        is_new = self.redis.zscore(LAST_USED_KEY, name) is None
+        # Returns the existing volume if there is one
+        await self.run(
+            self.api.create_volume, name, labels={"mcp-bridge.workspace": "true", "mcp-bridge.agent": agent_id}
+        )
+        self.touch(name)
+        if is_new:
+            await self.evict(keep=name)
+        return {name: {"bind": self.mount_path, "mode": "rw"}}
+
+    def touch(self, name: str):
+        self.redis.zadd(LAST_USED_KEY, {name: time.time()})
+
+    async def measure(self, name: str, container_id: str) -> Optional[int]:
+        """Record a workspace's size by running ``du`` in a container that mounts it"""
+        exec_info = await self.run(
+            self.api.exec_create, container_id, ["timeout", "10", "du", "-sb", self.mount_path], user="root"
+        )
+        output = await self.run(self.api.exec_start, exec_info["Id"])
+        try:
+            size = int(output.split()[0])
+        except (IndexError, ValueError):
+            logger.warning(f"Could not measure workspace {name}: {output[:200]!r}")
+            return None
+        self.redis.hset(SIZES_KEY, name, size)
+        self.touch(name)
+        return size
+
+    async def evict(self, keep: Optional[str] = None):
+        """Remove stale volumes and the least recently used ones beyond max_volumes"""
+        entries = self.redis.zrange(LAST_USED_KEY, 0, -1, withscores=True)
+        excess = len(entries) - self.max_volumes
+        cutoff = time.time() - self.evict_after
+        for name, last_used in entries:
+            name = name.decode() if isinstance(name, bytes) else name
+            if excess <= 0 and last_used >= cutoff:
+                # Oldest first: nothing after this is stale either
+                break
+            if name == keep:
+                continue
+            try:
+                await self.run(self.api.remove_volume, name)
+            except docker.errors.NotFound:
+                pass
+            except docker.errors.APIError as e:
+                if e.status_code != 409:
+                    logger.error(f"Failed to evict workspace {name}: {e}")
+                # 409: still mounted by a terminal
+                continue
+            self.redis.zrem(LAST_USED_KEY, name)
+            self.redis.hdel(SIZES_KEY, name)
+            excess -= 1
+            self.evicted_total += 1
+            logger.info(f"Evicted workspace volume {name}")
+
+    async def delete(self, agent_id: str):
+        """Remove an agent's volume; raises docker.errors.APIError (409) while it is mounted"""
+        name = self.volume_name(agent_id)
+        try:
+            await self.run(self.api.remove_volume, name)
+        except docker.errors.NotFound:
+            pass
+        self.redis.zrem(LAST_USED_KEY, name)
+        self.redis.hdel(SIZES_KEY, name)
+
+    def usage(self, agent_id: str) -> Dict[str, Any]:
+        name = self.volume_name(agent_id)
+        size = self.redis.hget(SIZES_KEY, name)
+        last_used = self.redis.zscore(LAST_USED_KEY, name)
+        return {
+            "volume": name,
+            "mount_path": self.mount_path,
+            "exists": last_used is not None,
+            "size_bytes": int(size) if size is not None else None,
+            "quota_bytes": self.quota_bytes,
+            "last_used": last_used
+        }
+
+    def stats(self) -> dict:
+        return {
+            "volumes": self.redis.zcard(LAST_USED_KEY),
+            "max_volumes": self.max_volumes,
+            "quota_bytes": self.quota_bytes,
+            "evicted_total": self.evicted_total
+        }
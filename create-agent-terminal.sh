@@ -9,6 +9,7 @@ echo "Creating terminal for agent: $AGENT_ID"
 # Create agent-specific log directory
 LOG_DIR="/tmp/agent-logs/$AGENT_ID"
 mkdir -p "$LOG_DIR"
+rm -f "$LOG_DIR/.ready"
 
 # Run the agent terminal container
 CONTAINER_ID=$(docker run -d \
@@ -36,6 +37,7 @@ CONTAINER_ID=$(docker run -d \
         echo 'Agent $AGENT_ID terminal is ready!'
         echo 'Session log: /tmp/logs/session.log'
         echo '$(date): Agent $AGENT_ID session started' > /tmp/logs/session.log
+        touch /tmp/logs/.ready
         
         # Keep container running for demonstration
         tail -f /dev/null
@@ -44,8 +46,23 @@ CONTAINER_ID=$(docker run -d \
 echo "Container ID: $CONTAINER_ID"
 echo "Log directory: $LOG_DIR"
 
+# Wait for the terminal to signal it is ready (up to 30s)
+READY=false
+for _ in $(seq 1 300); do
+    if [ -e "$LOG_DIR/.ready" ]; then
+        READY=true
+        break
+    fi
+    sleep 0.1
+done
+
+if [ "$READY" != true ]; then
+    echo "Terminal for agent $AGENT_ID did not become ready within 30s" >&2
+    docker logs "agent-terminal-$AGENT_ID" >&2
+    exit 1
+fi
+
 # Show the output
-sleep 2
 echo "=== Terminal Output ==="
 docker logs "agent-terminal-$AGENT_ID"
 